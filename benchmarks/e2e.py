@@ -0,0 +1,387 @@
+"""End-to-end throughput benchmark for ``POST /extract-bill-data``.
+
+Generates a synthetic bill corpus (clean and noisy scanned PDFs, noisy JPEG
+scans) at several DPIs and page counts, serves it from a local HTTP server
+that also stands in for an OpenAI-compatible LLM, starts the API in a
+subprocess per scenario and drives it at a fixed concurrency.
+
+    python benchmarks/e2e.py                                    # all scenarios
+    python benchmarks/e2e.py --scenarios dummy rapidocr --concurrency 8 --requests 64
+    python benchmarks/e2e.py --save-baseline benchmarks/baseline.json
+    python benchmarks/e2e.py --baseline benchmarks/baseline.json --tolerance 0.2
+
+Scenarios:
+  dummy     dummy OCR engine and regex parser (fetch, render and enhance only)
+  rapidocr  RapidOCR and regex parser
+  llm       RapidOCR and the LLM parser against the local stub LLM
+
+Reports p50/p95/p99 latency, pages/sec, the server's peak RSS and seconds per
+request spent in each stage (from the response ``timings`` block; pages run
+concurrently, so stage seconds can exceed latency). Result, page and LLM
+caches are disabled so repeated documents are not free. With ``--baseline``
+the run exits non-zero when latency or RSS grows, or pages/sec drops, by more
+than ``--tolerance``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+ITEMS = [
+    "Consultation Charges", "Room Rent - General Ward", "Nursing Charges", "CBC Test",
+    "Paracetamol 500mg", "X-Ray Chest PA", "Injection Ceftriaxone 1g", "IV Fluids NS 500ml",
+    "ECG", "Dressing Charges", "Pantoprazole 40mg", "Ultrasound Abdomen",
+]
+
+SCENARIOS: Dict[str, Dict[str, str]] = {
+    "dummy": {"OCR_BACKEND": "dummy", "PARSER_BACKEND": "regex"},
+    "rapidocr": {"OCR_BACKEND": "rapidocr", "PARSER_BACKEND": "regex"},
+    "llm": {
+        "OCR_BACKEND": "rapidocr",
+        "PARSER_BACKEND": "llm",
+        "LLM_PROVIDER": "local",
+        "LLM_MODEL": "stub",
+    },
+}
+
+# Higher is better for pages_per_sec; lower is better for everything else.
+COMPARED = ("p50_seconds", "p95_seconds", "p99_seconds", "pages_per_sec", "peak_rss_mb")
+
+
+@dataclass(frozen=True)
+class CorpusDocument:
+    name: str
+    kind: str
+    dpi: int
+    pages: int
+
+
+def _bill_page(rng: random.Random, page_no: int, pages: int, dpi: int, rows: int = 18) -> Image.Image:
+    scale = dpi / 200
+    width, height = int(1654 * scale), int(2339 * scale)  # A4
+    font = ImageFont.load_default(size=max(10, int(26 * scale)))
+    small = ImageFont.load_default(size=max(8, int(20 * scale)))
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+
+    def at(x: float, y: float) -> tuple[int, int]:
+        return int(x * scale), int(y * scale)
+
+    draw.text(at(560, 60), "CITY CARE MULTISPECIALITY HOSPITAL", fill="black", font=font)
+    draw.text(at(80, 180), f"Patient: R. Kumar   Bill No: IP/{rng.randint(1000, 9999)}", fill="black", font=small)
+    for x, title in ((80, "Description"), (900, "Qty"), (1100, "Rate"), (1350, "Amount")):
+        draw.text(at(x, 260), title, fill="black", font=font)
+    for row in range(rows):
+        y = 330 + row * 60
+        quantity = rng.randint(1, 5)
+        rate = rng.choice([120.0, 250.0, 450.0, 1200.0, 1950.0])
+        draw.text(at(80, y), rng.choice(ITEMS), fill="black", font=font)
+        draw.text(at(900, y), str(quantity), fill="black", font=font)
+        draw.text(at(1100, y), f"{rate:.2f}", fill="black", font=font)
+        draw.text(at(1350, y), f"{quantity * rate:.2f}", fill="black", font=font)
+    draw.text(at(1400, 2250), f"Page {page_no} of {pages}", fill="black", font=small)
+    return image
+
+
+def _scanned(image: Image.Image, rng: random.Random) -> Image.Image:
+    """Make a clean page look like a phone or flatbed scan: skew, blur, noise, grey paper."""
+    image = image.rotate(rng.uniform(-1.5, 1.5), expand=False, fillcolor="white", resample=Image.BICUBIC)
+    image = image.filter(ImageFilter.GaussianBlur(radius=0.8))
+    pixels = np.asarray(image, dtype=np.int16)
+    noise = np.random.default_rng(rng.randint(0, 2**32 - 1)).normal(0, 12, pixels.shape[:2])
+    pixels = pixels - 18 + noise[..., None].astype(np.int16)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def build_corpus(
+    root: Path, kinds: List[str], dpis: List[int], page_counts: List[int], seed: int
+) -> List[CorpusDocument]:
+    rng = random.Random(seed)
+    documents = []
+    for kind in kinds:
+        for dpi in dpis:
+            for pages in page_counts if kind != "scan-jpg" else [1]:
+                images = [_bill_page(rng, page_no, pages, dpi) for page_no in range(1, pages + 1)]
+                if kind != "pdf":
+                    images = [_scanned(image, rng) for image in images]
+                if kind == "scan-jpg":
+                    name = f"{kind}-{dpi}dpi.jpg"
+                    images[0].save(root / name, quality=85)
+                else:
+                    name = f"{kind}-{dpi}dpi-{pages}p.pdf"
+                    images[0].save(root / name, save_all=True, append_images=images[1:], resolution=dpi)
+                documents.append(CorpusDocument(name=name, kind=kind, dpi=dpi, pages=pages))
+    return documents
+
+
+def _completion(items: int) -> bytes:
+    content = {
+        "page_type": "Bill Detail",
+        "bill_items": [
+            {"item_name": ITEMS[i % len(ITEMS)], "item_amount": 250.0, "item_rate": 250.0, "item_quantity": 1}
+            for i in range(items)
+        ],
+    }
+    return json.dumps(
+        {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "stub",
+            "choices": [
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": json.dumps(content)}}
+            ],
+            "usage": {"prompt_tokens": 600, "completion_tokens": 40 * items, "total_tokens": 600 + 40 * items},
+        }
+    ).encode()
+
+
+class CorpusServer:
+    """Serves the corpus over GET and answers POST /v1/chat/completions like an LLM."""
+
+    def __init__(self, root: Path, llm_latency: float) -> None:
+        body = _completion(items=18)
+
+        class Handler(SimpleHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(llm_latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=str(root)))
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ApiServer:
+    """The API under test, run by uvicorn in its own process so its RSS is isolated."""
+
+    def __init__(self, scenario: str, corpus_url: str, concurrency: int, workers: str | None) -> None:
+        env = dict(os.environ)
+        overrides = {
+            **SCENARIOS[scenario],
+            "LLM_BASE_URL": f"{corpus_url}/v1",
+            "RESULT_CACHE_BACKEND": "none",
+            "PAGE_OCR_CACHE_ENTRIES": "0",
+            "LLM_CACHE_BACKEND": "none",
+            "MAX_PENDING_DOCUMENTS": str(max(16, concurrency * 2)),
+            "METRICS_ENABLED": "true",
+        }
+        if workers:
+            overrides["WORKER_MODE"] = workers
+        env.update({f"BILL_API_{name}": value for name, value in overrides.items()})
+        port = _free_port()
+        self.url = f"http://127.0.0.1:{port}"
+        self._proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "bill_extraction_api.app.main:app",
+                "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+            ],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+
+    def wait_ready(self, timeout: float = 120.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                raise RuntimeError(f"API exited: {self._proc.stderr.read().decode()[-2000:]}")
+            try:
+                if httpx.get(f"{self.url}/metrics", timeout=1).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.25)
+        raise RuntimeError("API did not start in time")
+
+    def stop(self) -> float:
+        """Stop the server and return its peak RSS in MB."""
+        self._proc.terminate()
+        try:
+            _, _, usage = os.wait4(self._proc.pid, 0)
+        except ChildProcessError:
+            return 0.0
+        self._proc.returncode = 0
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return usage.ru_maxrss / divisor
+
+
+async def drive(
+    api_url: str, corpus_url: str, documents: List[CorpusDocument], requests: int, concurrency: int
+) -> dict:
+    latencies: List[float] = []
+    stages: Dict[str, float] = {}
+    pages = 0
+    errors = 0
+    queue: asyncio.Queue[CorpusDocument] = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(documents[index % len(documents)])
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal pages, errors
+        while not queue.empty():
+            document = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.post(
+                f"{api_url}/extract-bill-data",
+                params={"timings": "true"},
+                json={"document": f"{corpus_url}/{document.name}"},
+            )
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                errors += 1
+                continue
+            latencies.append(elapsed)
+            pages += document.pages
+            for stage, timing in (response.json().get("timings") or {}).get("stages", {}).items():
+                stages[stage] = stages.get(stage, 0.0) + timing["seconds"]
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=600) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    ok = len(latencies)
+    quantiles = np.percentile(latencies, [50, 95, 99]) if latencies else [0.0, 0.0, 0.0]
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_seconds": round(float(quantiles[0]), 4),
+        "p95_seconds": round(float(quantiles[1]), 4),
+        "p99_seconds": round(float(quantiles[2]), 4),
+        "pages_per_sec": round(pages / wall, 3) if wall else 0.0,
+        "stage_seconds_per_request": {
+            stage: round(total / ok, 4) for stage, total in sorted(stages.items())
+        } if ok else {},
+    }
+
+
+def run_scenario(scenario: str, corpus: CorpusServer, documents: List[CorpusDocument], args) -> dict:
+    api = ApiServer(scenario, corpus.url, args.concurrency, args.worker_mode)
+    try:
+        api.wait_ready()
+        if args.warmup:
+            asyncio.run(drive(api.url, corpus.url, documents, args.warmup, 1))
+        result = asyncio.run(drive(api.url, corpus.url, documents, args.requests, args.concurrency))
+    finally:
+        peak_rss_mb = api.stop()
+    result["peak_rss_mb"] = round(peak_rss_mb, 1)
+    return result
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    regressions = []
+    for scenario, result in results.items():
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        for key in COMPARED:
+            old, new = previous.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change < -tolerance if key == "pages_per_sec" else change > tolerance
+            if worse:
+                regressions.append(f"{scenario}: {key} {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--kinds", nargs="+", default=["pdf", "scan-pdf", "scan-jpg"],
+                        choices=["pdf", "scan-pdf", "scan-jpg"])
+    parser.add_argument("--dpis", nargs="+", type=int, default=[150, 300])
+    parser.add_argument("--pages", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--requests", type=int, default=24, help="Timed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed requests before measuring")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub LLM response delay (s)")
+    parser.add_argument("--worker-mode", choices=["thread", "process", "inline"])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare against a stored baseline JSON")
+    parser.add_argument("--save-baseline", type=Path, help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        documents = build_corpus(Path(tmp), args.kinds, args.dpis, args.pages, args.seed)
+        print(f"Corpus: {len(documents)} document(s), {sum(d.pages for d in documents)} page(s)")
+        corpus = CorpusServer(Path(tmp), args.llm_latency)
+        try:
+            for scenario in args.scenarios:
+                results[scenario] = run_scenario(scenario, corpus, documents, args)
+        finally:
+            corpus.close()
+
+    print(
+        f"\n{'scenario':<9} {'ok':>4} {'err':>4} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+        f"{'pages/s':>8} {'peak RSS MB':>12}"
+    )
+    for scenario, result in results.items():
+        print(
+            f"{scenario:<9} {result['requests'] - result['errors']:>4} {result['errors']:>4} "
+            f"{result['p50_seconds']:>7.3f} {result['p95_seconds']:>7.3f} {result['p99_seconds']:>7.3f} "
+            f"{result['pages_per_sec']:>8.2f} {result['peak_rss_mb']:>12.1f}"
+        )
+    for scenario, result in results.items():
+        breakdown = ", ".join(f"{stage} {seconds:.3f}" for stage, seconds in result["stage_seconds_per_request"].items())
+        print(f"\n{scenario} stage seconds/request: {breakdown or 'n/a'}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nBaseline written to {args.save_baseline}")
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
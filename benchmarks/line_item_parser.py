@@ -0,0 +1,141 @@
+"""Micro-benchmark LineItemParser on large synthetic pages.
+
+Builds dense pharmacy-style pages (thousands of OCR lines in shuffled order,
+with section headings, thousands separators and description-only lines) and
+times the current parser, on line objects and on an ``OCRPage``, against the
+previous line-by-line implementation, checking that all return identical items.
+
+    python benchmarks/line_item_parser.py
+    python benchmarks/line_item_parser.py --lines 500 5000 20000 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import statistics
+import time
+from typing import Callable, List, Sequence
+
+from bill_extraction_api.app.schemas import BillItem
+from bill_extraction_api.services.ocr import OCRLine, OCRPage
+from bill_extraction_api.services.parser import LineItemParser
+
+DRUGS = [
+    "Paracetamol 500mg Tab", "Pantoprazole 40mg Inj", "Ceftriaxone 1g Inj", "NS 500ml IV",
+    "Ondansetron 4mg Tab", "Insulin Glargine 100IU", "Syringe 5ml", "Cotton Roll 100g",
+]
+SECTIONS = ["Pharmacy Charges", "Room Charges", "Investigation Services", "Surgery Summary"]
+
+
+def make_page(line_count: int, seed: int = 11) -> List[OCRLine]:
+    rng = random.Random(seed)
+    lines = []
+    for row in range(line_count):
+        y = 40.0 + row * 22.5
+        if row % 50 == 0:
+            text = rng.choice(SECTIONS)
+        elif row % 17 == 0:
+            text = "Batch No. B-" + "".join(rng.choice("ABCDEFX") for _ in range(4))
+        else:
+            quantity = rng.randint(1, 30)
+            rate = rng.choice([12.5, 48.0, 150.0, 1250.0, 2450.75])
+            text = f"{rng.choice(DRUGS)}  {quantity}  {rate:,.2f}  {quantity * rate:,.2f}"
+        jitter = rng.uniform(-0.4, 0.4)
+        bbox = [[60.0, y + jitter], [900.0, y + jitter], [900.0, y + 18 + jitter], [60.0, y + 18 + jitter]]
+        lines.append(OCRLine(text=text, bbox=bbox, confidence=rng.uniform(0.7, 0.99)))
+    rng.shuffle(lines)
+    return lines
+
+
+# Previous implementation, kept here as the reference for speed and output.
+_AMOUNT_RE = re.compile(r"(?<!\d)(\d{1,3}(?:,\d{3})*(?:\.\d+)?|\d+\.\d+)(?!\d)")
+_SECTION_HINTS = {"charges", "services", "fee", "room", "surgery", "pharmacy", "summary"}
+
+
+def _to_float(token: str) -> float:
+    try:
+        return float(token.replace(",", ""))
+    except ValueError:
+        return 0.0
+
+
+def _strip_numbers(text: str, matches: Sequence[re.Match[str]]) -> str:
+    cleaned = text
+    for match in reversed(matches):
+        cleaned = cleaned[: match.start()] + cleaned[match.end() :]
+    return " ".join(cleaned.split()).strip("-|: ")
+
+
+def legacy_parse(lines: Sequence[OCRLine]) -> List[BillItem]:
+    sorted_lines = sorted(lines, key=lambda line: sum(pt[1] for pt in line.bbox) / len(line.bbox))
+    section_prefix = ""
+    items: List[BillItem] = []
+    for line in sorted_lines:
+        text = line.text.strip()
+        if not text:
+            continue
+        matches = list(_AMOUNT_RE.finditer(text))
+        if not matches:
+            lower = text.lower()
+            if any(hint in lower for hint in _SECTION_HINTS) and not _AMOUNT_RE.search(text):
+                section_prefix = text.strip()
+            continue
+        amount = _to_float(matches[-1].group())
+        rate = _to_float(matches[-2].group()) if len(matches) >= 2 else None
+        quantity = _to_float(matches[-3].group()) if len(matches) >= 3 else None
+        if quantity is not None and quantity == 0:
+            quantity = None
+        if rate is not None and rate == 0:
+            rate = None
+        descriptor = _strip_numbers(text, matches).strip() or "Line Item"
+        if section_prefix:
+            descriptor = f"{section_prefix} | {descriptor}"
+        items.append(
+            BillItem(
+                item_name=descriptor,
+                item_amount=round(amount, 2),
+                item_rate=round(rate, 2) if rate is not None else None,
+                item_quantity=round(quantity, 2) if quantity is not None else None,
+            )
+        )
+    return items
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) if repeat < 3 else statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", nargs="+", type=int, default=[200, 2000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    current = LineItemParser()
+    print(
+        f"{'lines':>7} {'items':>7} {'legacy ms':>10} {'lines ms':>9} {'page ms':>8} "
+        f"{'speedup':>8}  identical"
+    )
+    for count in args.lines:
+        # Round-trip through OCRPage so every variant sees float32 coordinates.
+        page = OCRPage.from_lines(make_page(count))
+        lines = list(page)
+        expected = legacy_parse(lines)
+        identical = current.parse(lines) == expected and current.parse(page) == expected
+        legacy = best_of(lambda: legacy_parse(lines), args.repeat)
+        from_lines = best_of(lambda: current.parse(lines), args.repeat)
+        from_page = best_of(lambda: current.parse(page), args.repeat)
+        print(
+            f"{count:>7} {len(expected):>7} {legacy * 1000:>10.2f} {from_lines * 1000:>9.2f} "
+            f"{from_page * 1000:>8.2f} {legacy / from_page:>7.2f}x  {identical}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Compare PDF rasterizer backends: pages/sec and peak RSS.
+
+Each backend runs in a fresh subprocess so peak RSS is measured in isolation.
+
+    python benchmarks/rasterizers.py                      # synthetic 20-page PDF
+    python benchmarks/rasterizers.py --pdf bill.pdf --dpi 200 --processes 4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+from pypdf import PdfReader
+
+from bill_extraction_api.services.document_fetcher import Document
+from bill_extraction_api.services.preprocess import (
+    Pdf2ImageRasterizer,
+    PdfiumRasterizer,
+    PdfRasterizer,
+)
+
+BACKENDS = {"pdf2image": Pdf2ImageRasterizer, "pdfium": PdfiumRasterizer}
+
+
+def make_synthetic_pdf(path: Path, pages: int) -> None:
+    images = []
+    for page_no in range(1, pages + 1):
+        image = Image.new("RGB", (1240, 1754), "white")  # A4 at 150 dpi
+        draw = ImageDraw.Draw(image)
+        for row in range(40):
+            y = 80 + row * 40
+            draw.text((60, y), f"Page {page_no} item {row}  Consultation charge", fill="black")
+            draw.text((900, y), f"{row + 1}   {150.0 * (row + 1):.2f}", fill="black")
+        images.append(image)
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=150)
+
+
+def _render_range(backend: str, pdf: str, dpi: int, first: int, last: int) -> int:
+    rasterizer: PdfRasterizer = BACKENDS[backend]()
+    document = Document.from_path(Path(pdf))
+    rendered = 0
+    for page_no in range(first, last + 1):
+        rendered += len(rasterizer.render(document, page_no, page_no, dpi))
+    return rendered
+
+
+def run_child(backend: str, pdf: str, dpi: int, pages: int, processes: int) -> dict:
+    started = time.perf_counter()
+    if processes <= 1:
+        rendered = _render_range(backend, pdf, dpi, 1, pages)
+    else:
+        chunk = -(-pages // processes)
+        ranges = [(first, min(first + chunk - 1, pages)) for first in range(1, pages + 1, chunk)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(_render_range, backend, pdf, dpi, a, b) for a, b in ranges]
+            rendered = sum(future.result() for future in futures)
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if processes > 1:
+        peak_kb = max(peak_kb, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {
+        "backend": backend,
+        "pages": rendered,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(rendered / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=Path, help="PDF to render (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=20, help="Pages in the synthetic PDF")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=1, help="Render page ranges in parallel")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.pdf.as_posix(), args.dpi, args.pages, args.processes)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = args.pdf
+        if pdf is None:
+            pdf = Path(tmp) / "synthetic.pdf"
+            make_synthetic_pdf(pdf, args.pages)
+        page_count = len(PdfReader(pdf.as_posix()).pages)
+
+        print(f"{'backend':<10} {'pages':>6} {'seconds':>8} {'pages/s':>8} {'peak RSS MB':>12}")
+        for backend in args.backends:
+            command = [
+                sys.executable, __file__, "--child", backend, "--pdf", pdf.as_posix(),
+                "--dpi", str(args.dpi), "--pages", str(page_count),
+                "--processes", str(args.processes),
+            ]
+            proc = subprocess.run(command, capture_output=True, text=True)
+            if proc.returncode != 0:
+                error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+                print(f"{backend:<10} error: {error}")
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(
+                f"{result['backend']:<10} {result['pages']:>6} {result['seconds']:>8} "
+                f"{result['pages_per_sec']:>8} {result['peak_rss_mb']:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Compare LLM input size for plain vs compact OCR text.
+
+OCRs sample bills once, then formats every page both ways and reports input
+tokens and formatting time. With ``--llm`` each format is also sent to the
+configured provider (BILL_API_* settings) to compare latency and billed tokens.
+
+    python benchmarks/token_count.py                        # synthetic 3-page bill
+    python benchmarks/token_count.py --documents bill.pdf scan.png --llm
+
+Token counts use tiktoken's cl100k_base when installed, otherwise an estimate
+of four characters per token.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from PIL import Image, ImageDraw, ImageFont
+
+from bill_extraction_api.services.document_fetcher import Document
+from bill_extraction_api.services.layout import BoilerplateFilter
+from bill_extraction_api.services.llm_parser import LLMParser, usage_scope
+from bill_extraction_api.services.ocr import OCRLine, resolve_engine
+from bill_extraction_api.services.preprocess import DocumentPreprocessor, resolve_rasterizer
+from bill_extraction_api.settings import AppSettings
+
+ITEMS = [
+    "Consultation Charges", "Room Rent - General Ward", "Nursing Charges", "CBC Test",
+    "Paracetamol 500mg", "X-Ray Chest PA", "Injection Ceftriaxone 1g", "IV Fluids NS 500ml",
+    "ECG", "Dressing Charges", "Pantoprazole 40mg", "Ultrasound Abdomen",
+]
+
+
+def make_synthetic_bill(path: Path, pages: int, rows: int = 18, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    font = ImageFont.load_default(size=26)
+    small = ImageFont.load_default(size=20)
+    images = []
+    for page_no in range(1, pages + 1):
+        image = Image.new("RGB", (1654, 2339), "white")  # A4 at 200 dpi
+        draw = ImageDraw.Draw(image)
+        draw.text((560, 60), "CITY CARE MULTISPECIALITY HOSPITAL", fill="black", font=font)
+        draw.text((520, 100), "12 Park Street, Hyderabad  Ph: 040-2345678", fill="black", font=small)
+        draw.text((80, 180), "Patient: R. Kumar   UHID: 00451   Bill No: IP/2291", fill="black", font=small)
+        header_y = 260
+        for x, title in ((80, "Description"), (900, "Qty"), (1100, "Rate"), (1350, "Amount")):
+            draw.text((x, header_y), title, fill="black", font=font)
+        for row in range(rows):
+            y = header_y + 70 + row * 60
+            quantity = rng.randint(1, 5)
+            rate = rng.choice([120.0, 250.0, 450.0, 1200.0, 1950.0])
+            draw.text((80, y), rng.choice(ITEMS), fill="black", font=font)
+            # Some rows leave quantity and rate blank, as real bills do.
+            if row % 4:
+                draw.text((900, y), str(quantity), fill="black", font=font)
+                draw.text((1100, y), f"{rate:.2f}", fill="black", font=font)
+            draw.text((1350, y), f"{quantity * rate:.2f}", fill="black", font=font)
+        draw.text((600, 2200), "This is a computer generated bill", fill="black", font=small)
+        draw.text((1400, 2250), f"Page {page_no} of {pages}", fill="black", font=small)
+        images.append(image)
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=200)
+
+
+def token_counter() -> tuple[str, Callable[[str], int]]:
+    try:
+        import tiktoken  # type: ignore
+    except ImportError:
+        return "estimate (chars/4)", lambda text: (len(text) + 3) // 4
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return "tiktoken cl100k_base", lambda text: len(encoding.encode(text))
+
+
+def ocr_document(path: Path, settings: AppSettings) -> List[List[OCRLine]]:
+    preprocessor = DocumentPreprocessor(
+        dpi=settings.render_dpi, rasterizer=resolve_rasterizer(settings.pdf_renderer)
+    )
+    engine = resolve_engine(settings)
+    return [engine.extract(image) for image in preprocessor.iter_images(Document.from_path(path))]
+
+
+def drop_boilerplate(pages: List[List[OCRLine]], fmt: str, settings: AppSettings) -> List[List[OCRLine]]:
+    if fmt != "compact" or not settings.llm_drop_boilerplate or not pages:
+        return pages
+    boilerplate = BoilerplateFilter()
+    boilerplate.observe(1, pages[0])
+    return [pages[0]] + [boilerplate.drop_repeats(lines) for lines in pages[1:]]
+
+
+def format_pages(pages: List[List[OCRLine]], fmt: str, settings: AppSettings) -> tuple[List[str], float]:
+    parser = LLMParser(settings.model_copy(update={"llm_text_format": fmt, "parser_backend": "regex"}))
+    started = time.perf_counter()
+    texts = [parser._format_ocr_text(lines) for lines in drop_boilerplate(pages, fmt, settings)]
+    return texts, time.perf_counter() - started
+
+
+async def run_llm(pages: List[List[OCRLine]], fmt: str, settings: AppSettings) -> Dict[str, float]:
+    parser = LLMParser(settings.model_copy(update={"llm_text_format": fmt, "llm_cache_backend": "none"}))
+    latencies = []
+    items = 0
+    with usage_scope() as usage:
+        for page_no, lines in enumerate(drop_boilerplate(pages, fmt, settings), start=1):
+            started = time.perf_counter()
+            bill_items, _ = await parser.parse(lines, page_number=page_no)
+            latencies.append(time.perf_counter() - started)
+            items += len(bill_items)
+    return {
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "seconds_per_page": sum(latencies) / len(latencies) if latencies else 0.0,
+        "items": items,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", nargs="+", type=Path, help="Bills to OCR (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=3, help="Pages in the synthetic bill")
+    parser.add_argument("--llm", action="store_true", help="Also call the configured LLM provider")
+    parser.add_argument("--show", action="store_true", help="Print the first page in each format")
+    args = parser.parse_args()
+
+    settings = AppSettings()
+    counter_name, count_tokens = token_counter()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        documents = args.documents
+        if not documents:
+            synthetic = Path(tmp) / "synthetic-bill.pdf"
+            make_synthetic_bill(synthetic, args.pages)
+            documents = [synthetic]
+        pages = [page for path in documents for page in ocr_document(path, settings)]
+
+    print(f"{len(pages)} page(s), tokens counted with {counter_name}\n")
+    print(f"{'format':<8} {'input tokens':>12} {'vs plain':>9} {'format ms':>10}")
+    baseline = None
+    for fmt in ("plain", "compact"):
+        texts, elapsed = format_pages(pages, fmt, settings)
+        tokens = sum(count_tokens(text) for text in texts)
+        baseline = baseline or tokens
+        print(f"{fmt:<8} {tokens:>12} {tokens / baseline:>8.0%} {elapsed * 1000:>10.2f}")
+        if args.show and texts:
+            print(f"\n--- {fmt} page 1 ---\n{texts[0]}\n")
+
+    if args.llm:
+        print(f"\n{'format':<8} {'in tokens':>10} {'out tokens':>11} {'s/page':>8} {'items':>6}")
+        for fmt in ("plain", "compact"):
+            result = asyncio.run(run_llm(pages, fmt, settings))
+            print(
+                f"{fmt:<8} {result['input_tokens']:>10} {result['output_tokens']:>11} "
+                f"{result['seconds_per_page']:>8.2f} {result['items']:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
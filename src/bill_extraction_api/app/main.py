@@ -1,13 +1,55 @@
 from __future__ import annotations
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Literal, Tuple
+
 from loguru import logger
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from bill_extraction_api.app.schemas import ExtractionRequest, ExtractionResponse, TokenUsage
+from bill_extraction_api.app.schemas import (
+    BatchExtractionRequest,
+    BatchExtractionResponse,
+    BatchItemResult,
+    ExtractionRequest,
+    ExtractionData,
+    ExtractionResponse,
+    JobStatus,
+    PageLineItems,
+    StreamErrorEvent,
+    StreamPageEvent,
+    StreamSummaryEvent,
+    Timings,
+    TokenUsage,
+)
+from bill_extraction_api.services.executor import WorkerPoolSaturated
+from bill_extraction_api.services.jobs import Job, JobManager, JobQueueFull
+from bill_extraction_api.services.llm_parser import usage_scope
+from bill_extraction_api.services.metrics import metrics, timing_scope
 from bill_extraction_api.services.summarizer import ExtractionService
 from bill_extraction_api.settings import AppSettings, get_settings
 
-app = FastAPI(title="Bill Extraction API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    settings = get_settings()
+    service = ExtractionService(settings)
+    if settings.warmup_on_startup:
+        service.warm_up()
+    app.state.service = service
+    app.state.batch_limiter = asyncio.Semaphore(max(1, settings.batch_max_concurrency))
+    app.state.job_manager = JobManager(service, settings)
+    app.state.job_manager.start()
+    yield
+    await app.state.job_manager.stop()
+    app.state.job_manager = None
+    await service.aclose()
+    app.state.service = None
+
+
+app = FastAPI(title="Bill Extraction API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,23 +60,65 @@ app.add_middleware(
 )
 
 
-def get_service(settings: AppSettings = Depends(get_settings)) -> ExtractionService:
-    return ExtractionService(settings)
+def get_service(request: Request) -> ExtractionService:
+    service = getattr(request.app.state, "service", None)
+    if service is None:
+        # Lifespan did not run (e.g. a bare TestClient); build the shared service lazily.
+        service = ExtractionService(get_settings())
+        request.app.state.service = service
+    return service
+
+
+@app.get("/metrics")
+async def get_metrics(
+    output: Literal["prometheus", "json"] = Query("prometheus", alias="format"),
+):
+    """Counters, histograms and gauges in Prometheus text format, or JSON with ``?format=json``."""
+    if output == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def _request_timings(
+    timings: bool = False, settings: AppSettings = Depends(get_settings)
+) -> bool:
+    """Whether to attach per-stage timings (``?timings=true`` or ``response_timings``)."""
+    return timings or settings.response_timings
+
+
+@app.get("/debug/routing")
+async def get_routing_decisions(
+    service: ExtractionService = Depends(get_service),
+    settings: AppSettings = Depends(get_settings),
+) -> dict:
+    """Recent hybrid routing decisions with their signals, for tuning the threshold."""
+    if not settings.enable_debug_artifacts:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {
+        "threshold": settings.hybrid_llm_threshold,
+        "decisions": [decision.to_dict() for decision in service.routing_decisions()],
+    }
 
 
 @app.post("/extract-bill-data", response_model=ExtractionResponse)
 async def extract_bill_data(
-    payload: ExtractionRequest, service: ExtractionService = Depends(get_service)
+    payload: ExtractionRequest,
+    service: ExtractionService = Depends(get_service),
+    with_timings: bool = Depends(_request_timings),
 ) -> ExtractionResponse:
     try:
-        data = await service.extract(str(payload.document))
-        token_usage_dict = service.get_token_usage()
-        token_usage = TokenUsage.from_dict(token_usage_dict)
+        with usage_scope() as usage, (timing_scope() if with_timings else nullcontext()) as timings:
+            data = await service.extract(str(payload.document))
+        token_usage = TokenUsage.from_dict(usage.to_dict())
         return ExtractionResponse(
             is_success=True,
             data=data,
             token_usage=token_usage,
+            llm_cache_hits=usage.cache_hits,
+            timings=Timings(**timings.to_dict()) if timings is not None else None,
         )
+    except WorkerPoolSaturated as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"}) from exc
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:  # pragma: no cover - defensive path
@@ -46,7 +130,9 @@ async def extract_bill_data(
 
 @app.post("/api/v1/hackrx/run", response_model=ExtractionResponse)
 async def hackrx_webhook(
-    payload: ExtractionRequest, service: ExtractionService = Depends(get_service)
+    payload: ExtractionRequest,
+    service: ExtractionService = Depends(get_service),
+    with_timings: bool = Depends(_request_timings),
 ) -> ExtractionResponse:
     """
     Webhook endpoint for HackRx platform.
@@ -54,14 +140,19 @@ async def hackrx_webhook(
     """
     try:
         logger.info(f"HackRx webhook called with document: {payload.document}")
-        data = await service.extract(str(payload.document))
-        token_usage_dict = service.get_token_usage()
-        token_usage = TokenUsage.from_dict(token_usage_dict)
+        with usage_scope() as usage, (timing_scope() if with_timings else nullcontext()) as timings:
+            data = await service.extract(str(payload.document))
+        token_usage = TokenUsage.from_dict(usage.to_dict())
         return ExtractionResponse(
             is_success=True,
             data=data,
             token_usage=token_usage,
+            llm_cache_hits=usage.cache_hits,
+            timings=Timings(**timings.to_dict()) if timings is not None else None,
         )
+    except WorkerPoolSaturated as exc:
+        logger.warning(f"HackRx webhook rejected, server busy: {exc}")
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"}) from exc
     except ValueError as exc:
         logger.error(f"HackRx webhook validation error: {exc}")
         raise HTTPException(status_code=400, detail=str(exc)) from exc
@@ -70,3 +161,239 @@ async def hackrx_webhook(
         error_detail = str(exc)
         logger.error(f"HackRx webhook failed: {error_detail}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Extraction failed: {error_detail}") from exc
+
+
+def get_batch_limiter(
+    request: Request, settings: AppSettings = Depends(get_settings)
+) -> asyncio.Semaphore:
+    """Concurrency limit shared by every batch in flight."""
+    limiter = getattr(request.app.state, "batch_limiter", None)
+    if limiter is None:
+        limiter = asyncio.Semaphore(max(1, settings.batch_max_concurrency))
+        request.app.state.batch_limiter = limiter
+    return limiter
+
+
+async def _extract_batch_item(
+    service: ExtractionService, limiter: asyncio.Semaphore, index: int, document: str
+) -> BatchItemResult:
+    async with limiter:
+        try:
+            with usage_scope() as usage:
+                data = await service.extract(document)
+        except WorkerPoolSaturated as exc:
+            return BatchItemResult(index=index, document=document, status_code=503, error=str(exc))
+        except ValueError as exc:
+            return BatchItemResult(index=index, document=document, status_code=400, error=str(exc))
+        except Exception as exc:
+            logger.error(f"Batch extraction failed for {document}: {exc}")
+            return BatchItemResult(
+                index=index,
+                document=document,
+                status_code=500,
+                error=f"Extraction failed: {exc}",
+            )
+    return BatchItemResult(
+        index=index,
+        document=document,
+        status_code=200,
+        response=ExtractionResponse(
+            is_success=True,
+            data=data,
+            token_usage=TokenUsage.from_dict(usage.to_dict()),
+            llm_cache_hits=usage.cache_hits,
+        ),
+    )
+
+
+@app.post("/extract-bill-data/batch", response_model=BatchExtractionResponse)
+async def extract_bill_data_batch(
+    payload: BatchExtractionRequest,
+    stream: bool = False,
+    service: ExtractionService = Depends(get_service),
+    limiter: asyncio.Semaphore = Depends(get_batch_limiter),
+    settings: AppSettings = Depends(get_settings),
+):
+    """
+    Extract several documents with shared resources under a global concurrency limit.
+    A failing document is reported in its own result instead of failing the batch.
+    With ``?stream=true`` results are sent as NDJSON lines in completion order.
+    """
+    if len(payload.documents) > settings.batch_max_documents:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch exceeds {settings.batch_max_documents} documents",
+        )
+    tasks: List[asyncio.Task[BatchItemResult]] = [
+        asyncio.create_task(_extract_batch_item(service, limiter, index, str(item.document)))
+        for index, item in enumerate(payload.documents)
+    ]
+
+    if stream:
+
+        async def ndjson() -> AsyncIterator[str]:
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    result = await next_done
+                    yield result.model_dump_json() + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    succeeded = sum(1 for result in results if result.status_code == 200)
+    return BatchExtractionResponse(
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=list(results),
+    )
+
+
+_STREAM_DONE = object()
+
+
+def _stream_error(exc: BaseException) -> Tuple[int, str]:
+    if isinstance(exc, WorkerPoolSaturated):
+        return 503, str(exc)
+    if isinstance(exc, ValueError):
+        return 400, str(exc)
+    return 500, f"Extraction failed: {exc}"
+
+
+@app.post("/extract-bill-data/stream")
+async def extract_bill_data_stream(
+    payload: ExtractionRequest,
+    request: Request,
+    service: ExtractionService = Depends(get_service),
+):
+    """
+    Stream each page's line items as soon as it is parsed, then a summary.
+    Events are NDJSON lines, or server-sent events when the client accepts
+    ``text/event-stream``. Errors before the first page use normal HTTP status
+    codes; later ones arrive as an ``error`` event.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_page(page_no: int, total_pages: int, page: PageLineItems | None) -> None:
+        events.put_nowait((page_no, total_pages, page))
+
+    # The task copies the current context, so it records into this usage tracker.
+    with usage_scope() as usage:
+        task = asyncio.create_task(service.extract(str(payload.document), on_page=on_page))
+    task.add_done_callback(lambda _: events.put_nowait(_STREAM_DONE))
+
+    try:
+        first = await events.get()
+    except BaseException:
+        task.cancel()
+        raise
+    if first is _STREAM_DONE and task.exception() is not None:
+        exc = task.exception()
+        status_code, detail = _stream_error(exc)
+        if status_code == 500:
+            logger.error(f"Streaming extraction failed: {exc}")
+        headers = {"Retry-After": "5"} if status_code == 503 else None
+        raise HTTPException(status_code=status_code, detail=detail, headers=headers) from exc
+
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    def encode(event: StreamPageEvent | StreamSummaryEvent | StreamErrorEvent) -> str:
+        if sse:
+            return f"event: {event.event}\ndata: {event.model_dump_json()}\n\n"
+        return event.model_dump_json() + "\n"
+
+    async def stream_events() -> AsyncIterator[str]:
+        item = first
+        try:
+            while item is not _STREAM_DONE:
+                page_no, total_pages, page = item
+                yield encode(
+                    StreamPageEvent(
+                        page_no=page_no,
+                        total_pages=total_pages,
+                        page=page,
+                        token_usage=TokenUsage.from_dict(usage.to_dict()),
+                    )
+                )
+                item = await events.get()
+
+            if task.exception() is not None:
+                status_code, detail = _stream_error(task.exception())
+                yield encode(StreamErrorEvent(status_code=status_code, error=detail))
+                return
+            data = task.result()
+            yield encode(
+                StreamSummaryEvent(
+                    total_item_count=data.total_item_count,
+                    token_usage=TokenUsage.from_dict(usage.to_dict()),
+                    llm_cache_hits=usage.cache_hits,
+                )
+            )
+        finally:
+            task.cancel()
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(stream_events(), media_type=media_type)
+
+
+async def get_job_manager(
+    request: Request, service: ExtractionService = Depends(get_service)
+) -> JobManager:
+    manager = getattr(request.app.state, "job_manager", None)
+    if manager is None:
+        manager = JobManager(service, get_settings())
+        request.app.state.job_manager = manager
+    manager.start()
+    return manager
+
+
+def _job_status(job: Job) -> JobStatus:
+    result = None
+    if job.result is not None:
+        result = ExtractionResponse(
+            is_success=True,
+            data=ExtractionData.model_validate_json(job.result),
+            token_usage=TokenUsage.from_dict(job.token_usage),
+            llm_cache_hits=job.token_usage.get("cache_hits", 0),
+        )
+    return JobStatus(
+        id=job.id,
+        status=job.status,
+        document=job.document,
+        created_at=datetime.fromtimestamp(job.created_at, tz=timezone.utc),
+        updated_at=datetime.fromtimestamp(job.updated_at, tz=timezone.utc),
+        total_pages=job.total_pages,
+        completed_pages=len(job.completed_pages),
+        status_code=job.status_code,
+        result=result,
+        error=job.error,
+    )
+
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(
+    payload: ExtractionRequest, manager: JobManager = Depends(get_job_manager)
+) -> JobStatus:
+    """
+    Queue a document for extraction and return immediately.
+    Poll ``GET /jobs/{id}`` for progress and the result.
+    """
+    try:
+        job = await manager.submit(str(payload.document))
+    except JobQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"}) from exc
+    return _job_status(job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, manager: JobManager = Depends(get_job_manager)) -> JobStatus:
+    job = await manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return _job_status(job)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Literal
 
 from pydantic import BaseModel, Field, HttpUrl
 
@@ -9,7 +10,8 @@ class TokenUsage(BaseModel):
     total_tokens: int = 0
     input_tokens: int = 0
     output_tokens: int = 0
-    
+    cached_input_tokens: int = Field(0, description="Input tokens served from the provider's prompt cache")
+
     @classmethod
     def from_dict(cls, data: dict) -> "TokenUsage":
         """Create TokenUsage from dictionary."""
@@ -17,6 +19,7 @@ class TokenUsage(BaseModel):
             total_tokens=data.get("total_tokens", 0),
             input_tokens=data.get("input_tokens", 0),
             output_tokens=data.get("output_tokens", 0),
+            cached_input_tokens=data.get("cached_input_tokens", 0),
         )
 
 
@@ -38,11 +41,81 @@ class ExtractionData(BaseModel):
     total_item_count: int
 
 
+class StageTiming(BaseModel):
+    count: int
+    seconds: float
+
+
+class Timings(BaseModel):
+    total_seconds: float
+    stages: Dict[str, StageTiming] = Field(default_factory=dict)
+    pages: Dict[str, Dict[str, float]] = Field(
+        default_factory=dict, description="Seconds per stage, keyed by page number"
+    )
+
+
 class ExtractionResponse(BaseModel):
     is_success: bool = True
     token_usage: TokenUsage = Field(default_factory=TokenUsage)
+    llm_cache_hits: int = Field(
+        0, description="LLM responses reused from the response cache or a concurrent identical call"
+    )
     data: ExtractionData
+    timings: Timings | None = Field(None, description="Per-stage timings, when requested")
 
 
 class ExtractionRequest(BaseModel):
     document: HttpUrl = Field(..., description="Publicly accessible document URL")
+
+
+class BatchExtractionRequest(BaseModel):
+    documents: List[ExtractionRequest] = Field(..., min_length=1)
+
+
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the document in the request")
+    document: str
+    status_code: int = Field(..., description="HTTP status the single-document endpoint would return")
+    response: ExtractionResponse | None = None
+    error: str | None = None
+
+
+class BatchExtractionResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    document: str
+    created_at: datetime
+    updated_at: datetime
+    total_pages: int | None = None
+    completed_pages: int = 0
+    status_code: int | None = Field(None, description="HTTP status the single-document endpoint would return")
+    result: ExtractionResponse | None = None
+    error: str | None = None
+
+
+class StreamPageEvent(BaseModel):
+    event: Literal["page"] = "page"
+    page_no: int
+    total_pages: int
+    page: PageLineItems | None = Field(None, description="None when the page has no line items")
+    token_usage: TokenUsage = Field(..., description="Usage so far for the whole document")
+
+
+class StreamSummaryEvent(BaseModel):
+    event: Literal["summary"] = "summary"
+    is_success: bool = True
+    total_item_count: int
+    token_usage: TokenUsage
+    llm_cache_hits: int = 0
+
+
+class StreamErrorEvent(BaseModel):
+    event: Literal["error"] = "error"
+    status_code: int
+    error: str
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Protocol
+
+# Recency updates from reads are written in batches of this many.
+_TOUCH_BATCH = 256
+
+
+class CacheBackend(Protocol):
+    # True when get/set may block on disk; callers on the event loop then
+    # use cache_get/cache_set, which run them in a thread.
+    blocking: bool
+
+    def get(self, key: str) -> bytes | None:
+        ...
+
+    def set(self, key: str, value: bytes) -> None:
+        ...
+
+
+class MemoryCache:
+    """Thread-safe LRU cache bounded by entry count, total bytes and TTL."""
+
+    blocking = False
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_bytes: int | None = None,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        self._max_entries = max(1, max_entries)
+        self._max_bytes = max_bytes
+        self._ttl = ttl_seconds
+        self._entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if self._max_bytes is not None and len(value) > self._max_bytes:
+            return
+        expires_at = time.monotonic() + self._ttl if self._ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, expires_at)
+            self._bytes += len(value)
+            while len(self._entries) > self._max_entries or (
+                self._max_bytes is not None and self._bytes > self._max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+class SQLiteCache:
+    """On-disk cache that survives restarts; evicts least recently used rows.
+
+    Reads only select: the access times they update are kept in memory and
+    written with the next write (or every ``_TOUCH_BATCH`` reads), and
+    expired rows are deleted on writes too, so a hit never commits.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int = 10_000,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path.as_posix(), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A cache can lose its last writes on power loss; skip the fsync per commit.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+            " expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+        self._conn.commit()
+        self._touched: Dict[str, float] = {}
+
+    def get(self, key: str) -> bytes | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= _TOUCH_BATCH:
+                self._write_touches()
+                self._conn.commit()
+            return bytes(value)
+
+    def set(self, key: str, value: bytes) -> None:
+        now = time.time()
+        expires_at = now + self._ttl if self._ttl else None
+        with self._lock:
+            self._write_touches()
+            self._touched.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+            self._conn.close()
+
+    def _write_touches(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()],
+            )
+            self._touched.clear()
+
+
+class TieredCache:
+    """Memory cache in front of a slower persistent cache."""
+
+    def __init__(self, memory: CacheBackend, disk: CacheBackend) -> None:
+        self._memory = memory
+        self._disk = disk
+        self.blocking = memory.blocking or disk.blocking
+
+    def get(self, key: str) -> bytes | None:
+        value = self._memory.get(key)
+        if value is None:
+            value = self._disk.get(key)
+            if value is not None:
+                self._memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        self._memory.set(key, value)
+        self._disk.set(key, value)
+
+
+async def cache_get(cache: CacheBackend, key: str) -> bytes | None:
+    """``cache.get`` from the event loop, in a thread for disk-backed caches."""
+    if cache.blocking:
+        return await asyncio.to_thread(cache.get, key)
+    return cache.get(key)
+
+
+async def cache_set(cache: CacheBackend, key: str, value: bytes) -> None:
+    """``cache.set`` from the event loop, in a thread for disk-backed caches."""
+    if cache.blocking:
+        await asyncio.to_thread(cache.set, key, value)
+    else:
+        cache.set(key, value)
+
+
+def build_cache(
+    backend: str,
+    max_entries: int,
+    ttl_seconds: float | None,
+    max_bytes: int | None = None,
+    path: str | Path | None = None,
+) -> CacheBackend | None:
+    """Create the configured cache backend, or ``None`` when caching is off."""
+    if backend == "memory":
+        return MemoryCache(max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+    if backend == "sqlite":
+        if path is None:
+            raise ValueError("A path is required for the sqlite cache backend")
+        return SQLiteCache(path, max_entries=max_entries, ttl_seconds=ttl_seconds)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
+import io
 import mimetypes
 import os
 import tempfile
+from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO
 
 import httpx
+from loguru import logger
 
 from bill_extraction_api.settings import AppSettings
 
@@ -17,39 +23,177 @@ SUPPORTED_MIME_TYPES = {
     "image/webp": ".webp",
 }
 
+# Bytes needed to recognise every supported format from its signature.
+_SNIFF_BYTES = 12
+
+
+@dataclass
+class Document:
+    """A fetched document held in memory, or on disk once it is too large.
+
+    Exactly one of ``data`` and ``path`` is set.
+    """
+
+    mime_type: str
+    data: bytes | None = None
+    path: Path | None = None
+
+    @classmethod
+    def from_path(cls, path: Path) -> "Document":
+        mime_type = next(
+            (mime for mime, ext in SUPPORTED_MIME_TYPES.items() if ext == path.suffix.lower()),
+            mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+        )
+        return cls(mime_type=mime_type, path=path)
+
+    @property
+    def is_pdf(self) -> bool:
+        return self.mime_type == "application/pdf"
+
+    @property
+    def size(self) -> int:
+        if self.data is not None:
+            return len(self.data)
+        return self.path.stat().st_size if self.path else 0
+
+    def open(self) -> BinaryIO:
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return self.path.open("rb")
+
+    def read_bytes(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        return self.path.read_bytes()
+
+
+def sniff_mime_type(head: bytes) -> str | None:
+    """Identify a supported document type from its leading bytes."""
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
 
 class DocumentFetcher:
-    """Download user-supplied documents to a temp file."""
+    """Stream user-supplied documents over a shared connection pool.
+
+    Documents stay in memory up to ``spill_to_disk_mb`` and are written to a
+    temp file beyond that.
+    """
 
     def __init__(self, settings: AppSettings) -> None:
         self._settings = settings
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
 
-    async def fetch(self, url: str) -> Path:
+    def _get_client(self) -> httpx.AsyncClient:
+        # Pooled connections belong to the loop that opened them.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            http2 = self._settings.fetch_http2 and _http2_available()
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self._settings.request_timeout_seconds),
+                follow_redirects=True,
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=self._settings.fetch_max_connections,
+                    max_keepalive_connections=self._settings.fetch_max_connections,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def fetch(self, url: str) -> Document:
         # Convert to string in case it's a Pydantic Url object
         url_str = str(url)
-        timeout = httpx.Timeout(self._settings.request_timeout_seconds)
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-            response = await client.get(url_str)
+        max_bytes = self._settings.max_document_size_mb * 1024 * 1024
+        client = self._get_client()
+
+        async with client.stream("GET", url_str) as response:
             response.raise_for_status()
 
-        content_type = response.headers.get("Content-Type") or mimetypes.guess_type(url_str)[0]
-        if content_type not in SUPPORTED_MIME_TYPES:
-            raise ValueError(f"Unsupported document type: {content_type}")
+            declared_length = response.headers.get("Content-Length")
+            if declared_length and declared_length.isdigit() and int(declared_length) > max_bytes:
+                raise ValueError("Document exceeds allowed size")
 
-        max_bytes = self._settings.max_document_size_mb * 1024 * 1024
-        if len(response.content) > max_bytes:
-            raise ValueError("Document exceeds allowed size")
+            chunks = response.aiter_bytes(self._settings.fetch_chunk_size)
+            head = b""
+            async for chunk in chunks:
+                head += chunk
+                if len(head) >= _SNIFF_BYTES:
+                    break
+
+            content_type = sniff_mime_type(head)
+            if content_type is None:
+                header_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+                content_type = header_type or mimetypes.guess_type(url_str)[0]
+            if content_type not in SUPPORTED_MIME_TYPES:
+                raise ValueError(f"Unsupported document type: {content_type}")
+
+            spill_bytes = self._settings.spill_to_disk_mb * 1024 * 1024
+            buffer = bytearray(head)
+            handle: BinaryIO | None = None
+            tmp_path: Path | None = None
+            received = len(buffer)
+            try:
+                if received > max_bytes:
+                    raise ValueError("Document exceeds allowed size")
+                async for chunk in chunks:
+                    received += len(chunk)
+                    if received > max_bytes:
+                        raise ValueError("Document exceeds allowed size")
+                    if handle is not None:
+                        handle.write(chunk)
+                        continue
+                    buffer += chunk
+                    if len(buffer) > spill_bytes:
+                        # Large documents go to disk so they are not held in memory.
+                        tmp_path = self._temp_path(content_type)
+                        handle = tmp_path.open("wb")
+                        handle.write(buffer)
+                        buffer = bytearray()
+            except BaseException:
+                if handle is not None:
+                    handle.close()
+                if tmp_path is not None:
+                    self.cleanup(Document(mime_type=content_type, path=tmp_path))
+                raise
+        if handle is not None:
+            handle.close()
+            return Document(mime_type=content_type, path=tmp_path)
+        return Document(mime_type=content_type, data=bytes(buffer))
 
+    @staticmethod
+    def _temp_path(content_type: str) -> Path:
         suffix = SUPPORTED_MIME_TYPES[content_type]
         tmp_dir = Path(tempfile.mkdtemp(prefix="bill-api-"))
-        tmp_path = tmp_dir / f"document{suffix}"
-        tmp_path.write_bytes(response.content)
-        return tmp_path
+        return tmp_dir / f"document{suffix}"
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            try:
+                await self._client.aclose()
+            except Exception as exc:  # pragma: no cover - shutdown is best effort
+                logger.warning(f"Failed to close HTTP client: {exc}")
+            self._client = None
+            self._client_loop = None
 
     @staticmethod
-    def cleanup(path: Path) -> None:
+    def cleanup(document: Document) -> None:
+        if document.path is None:
+            return
         try:
-            os.remove(path)
-            os.rmdir(path.parent)
+            os.remove(document.path)
+            os.rmdir(document.path.parent)
         except OSError:
             pass
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+from loguru import logger
+from PIL import Image
+
+from bill_extraction_api.services.ocr import OCREngine, resolve_engine
+from bill_extraction_api.settings import AppSettings
+
+
+class OCREnginePool:
+    """Fixed-size pool of preloaded OCR engines shared across requests.
+
+    Loading the RapidOCR ONNX sessions is expensive, so engines are built once
+    and checked out per page. A checkout waits until an engine is free.
+    """
+
+    def __init__(self, settings: AppSettings, size: int | None = None) -> None:
+        self._settings = settings
+        self._size = max(1, size if size is not None else settings.ocr_pool_size)
+        self._engines: List[OCREngine] = [resolve_engine(settings) for _ in range(self._size)]
+        self._available: asyncio.Queue[OCREngine] | None = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def available(self) -> int:
+        """Engines not checked out right now."""
+        return self._available.qsize() if self._available is not None else self._size
+
+    def _queue(self) -> asyncio.Queue[OCREngine]:
+        # Created lazily so the pool can be built outside a running event loop.
+        if self._available is None:
+            self._available = asyncio.Queue()
+            for engine in self._engines:
+                self._available.put_nowait(engine)
+        return self._available
+
+    @asynccontextmanager
+    async def checkout(self) -> AsyncIterator[OCREngine]:
+        queue = self._queue()
+        engine = await queue.get()
+        try:
+            yield engine
+        finally:
+            queue.put_nowait(engine)
+
+    def warm_up(self) -> None:
+        """Run a tiny image through every engine so the first request is not slow."""
+
+        blank = Image.new("RGB", (64, 64), "white")
+        for engine in self._engines:
+            try:
+                engine.extract(blank)
+            except Exception as exc:  # pragma: no cover - warm-up is best effort
+                logger.warning(f"OCR engine warm-up failed: {exc}")
+        logger.info(f"Warmed up {self._size} OCR engine(s)")
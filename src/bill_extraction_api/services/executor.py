@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Iterator, TypeVar
+
+from PIL import Image
+
+from bill_extraction_api.services.ocr import OCREngine, OCRPage, resolve_engine
+from bill_extraction_api.settings import AppSettings
+
+T = TypeVar("T")
+
+# Per-process OCR engine used when CPU work runs in a process pool.
+_worker_engine: OCREngine | None = None
+
+
+class WorkerPoolSaturated(RuntimeError):
+    """Raised when too many documents are already queued for CPU work."""
+
+
+def _init_worker(settings_data: dict) -> None:
+    global _worker_engine
+    _worker_engine = resolve_engine(AppSettings(**settings_data))
+
+
+def ocr_in_worker(image: Image.Image) -> OCRPage:
+    """Run OCR with the engine owned by the current worker process.
+
+    The page pickles as three arrays, so results cross the process boundary
+    without one object per line.
+    """
+    if _worker_engine is None:
+        raise RuntimeError("OCR worker process was not initialised")
+    return _worker_engine.extract(image)
+
+
+def _warm_up_worker() -> None:
+    if _worker_engine is not None:
+        _worker_engine.extract(Image.new("RGB", (64, 64), "white"))
+
+
+class WorkerPool:
+    """Runs CPU-bound pipeline stages off the event loop.
+
+    ``worker_mode`` selects a thread pool (shares the OCR engine pool), a
+    process pool (each worker owns its own OCR engine) or inline execution.
+    Admission is bounded by ``max_pending_documents`` so callers can shed load
+    instead of queueing without limit.
+    """
+
+    def __init__(self, settings: AppSettings) -> None:
+        self._settings = settings
+        self._mode = settings.worker_mode
+        self._workers = max(1, settings.worker_count or min(4, os.cpu_count() or 1))
+        self._max_pending = max(1, settings.max_pending_documents)
+        self._pending = 0
+        self._executor: Executor | None = None
+        if self._mode == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix="bill-api-cpu"
+            )
+        elif self._mode == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                initializer=_init_worker,
+                initargs=(settings.model_dump(),),
+            )
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @contextmanager
+    def admission(self) -> Iterator[None]:
+        """Reserve a document slot or raise :class:`WorkerPoolSaturated`."""
+        if self._pending >= self._max_pending:
+            raise WorkerPoolSaturated(
+                f"Server busy: {self._pending} documents already in progress"
+            )
+        self._pending += 1
+        try:
+            yield
+        finally:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self._executor is None:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        if self._mode == "thread":
+            # Carry the request's context (timings, usage) into the worker thread.
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._executor, partial(context.run, fn, *args))
+        return await loop.run_in_executor(self._executor, partial(fn, *args))
+
+    def warm_up(self) -> None:
+        if self._mode != "process" or self._executor is None:
+            return
+        futures = [self._executor.submit(_warm_up_worker) for _ in range(self._workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Protocol, Set
+
+from loguru import logger
+
+from bill_extraction_api.app.schemas import PageLineItems
+from bill_extraction_api.services.executor import WorkerPoolSaturated
+from bill_extraction_api.services.llm_parser import usage_scope
+from bill_extraction_api.services.metrics import metrics
+from bill_extraction_api.services.summarizer import ExtractionService
+from bill_extraction_api.settings import AppSettings
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when ``job_max_queued`` jobs are already waiting to start."""
+
+
+@dataclass
+class Job:
+    id: str
+    document: str
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    total_pages: int | None = None
+    completed_pages: List[int] = field(default_factory=list)
+    result: str | None = None  # ExtractionData as JSON
+    token_usage: Dict[str, int] = field(default_factory=dict)
+    error: str | None = None
+    status_code: int | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+
+class JobStore(Protocol):
+    async def save(self, job: Job) -> None:
+        ...
+
+    async def load(self, job_id: str) -> Job | None:
+        ...
+
+
+class JobQueue(Protocol):
+    async def put(self, job_id: str) -> None:
+        ...
+
+    async def get(self) -> str:
+        ...
+
+    async def ack(self, job_id: str) -> None:
+        """Mark a job taken with ``get`` as fully handled."""
+        ...
+
+    async def depth(self) -> int:
+        """Number of jobs waiting to be taken with ``get``."""
+        ...
+
+
+class MemoryJobStore:
+    """Job records kept in memory; finished jobs expire after ``ttl_seconds``."""
+
+    def __init__(self, max_jobs: int = 1000, ttl_seconds: float = 3600) -> None:
+        self._max_jobs = max(1, max_jobs)
+        self._ttl = ttl_seconds
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def save(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._purge()
+
+    async def load(self, job_id: str) -> Job | None:
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self._ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.updated_at < cutoff]:
+            del self._jobs[job_id]
+        # Over capacity: drop the oldest finished jobs; queued work is never dropped.
+        if len(self._jobs) > self._max_jobs:
+            for job_id in [j.id for j in self._jobs.values() if j.finished]:
+                del self._jobs[job_id]
+                if len(self._jobs) <= self._max_jobs:
+                    break
+
+
+class SQLiteJobStore:
+    """Job records persisted in SQLite so status survives restarts.
+
+    Queries run in a thread to keep commits off the event loop. A write
+    never replaces a newer ``updated_at``, so progress updates that finish
+    out of order cannot overwrite a later state.
+    """
+
+    def __init__(self, path: str | Path, max_jobs: int = 1000, ttl_seconds: float = 3600) -> None:
+        self._max_jobs = max(1, max_jobs)
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, data TEXT NOT NULL, finished INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    async def save(self, job: Job) -> None:
+        # Snapshot on the loop, where the job is mutated.
+        row = (job.id, json.dumps(asdict(job)), int(job.finished), job.updated_at)
+        await asyncio.to_thread(self._write, row)
+
+    async def load(self, job_id: str) -> Job | None:
+        return await asyncio.to_thread(self._read, job_id)
+
+    def _write(self, row: tuple) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, data, finished, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET data = excluded.data,"
+                " finished = excluded.finished, updated_at = excluded.updated_at"
+                " WHERE excluded.updated_at >= jobs.updated_at",
+                row,
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE finished = 1 AND updated_at < ?",
+                (time.time() - self._ttl,),
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE id IN ("
+                " SELECT id FROM jobs WHERE finished = 1 ORDER BY updated_at DESC"
+                " LIMIT -1 OFFSET ?)",
+                (self._max_jobs,),
+            )
+            self._conn.commit()
+
+    def _read(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, finished, updated_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        data, finished, updated_at = row
+        if finished and updated_at < time.time() - self._ttl:
+            return None
+        return Job(**json.loads(data))
+
+
+class AsyncioJobQueue:
+    """In-process queue; pending jobs are lost on restart."""
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue[str] | None = None
+
+    def _get_queue(self) -> asyncio.Queue[str]:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def put(self, job_id: str) -> None:
+        await self._get_queue().put(job_id)
+
+    async def get(self) -> str:
+        return await self._get_queue().get()
+
+    async def ack(self, job_id: str) -> None:
+        pass
+
+    async def depth(self) -> int:
+        return self._get_queue().qsize()
+
+
+class SQLiteJobQueue:
+    """Durable queue: claimed but unacknowledged jobs are re-queued on startup.
+
+    Jobs are claimed atomically, but the re-queue on startup assumes the
+    queue has a single consumer process: a process restarting next to
+    another one sharing ``job_db_path`` would re-queue that one's running
+    jobs. Queries run in a thread to keep commits off the event loop.
+    """
+
+    def __init__(self, path: str | Path, poll_interval: float = 0.5) -> None:
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_queue ("
+            " job_id TEXT PRIMARY KEY, enqueued_at REAL NOT NULL, claimed INTEGER NOT NULL)"
+        )
+        self._conn.execute("UPDATE job_queue SET claimed = 0")
+        self._conn.commit()
+
+    async def put(self, job_id: str) -> None:
+        await asyncio.to_thread(self._put, job_id)
+
+    async def get(self) -> str:
+        while True:
+            job_id = await asyncio.to_thread(self._claim)
+            if job_id is not None:
+                return job_id
+            await asyncio.sleep(self._poll_interval)
+
+    async def ack(self, job_id: str) -> None:
+        await asyncio.to_thread(self._ack, job_id)
+
+    async def depth(self) -> int:
+        return await asyncio.to_thread(self._depth)
+
+    def _put(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_queue (job_id, enqueued_at, claimed) VALUES (?, ?, 0)",
+                (job_id, time.time()),
+            )
+            self._conn.commit()
+
+    def _ack(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM job_queue WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+
+    def _depth(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM job_queue WHERE claimed = 0"
+            ).fetchone()
+        return count
+
+    def _claim(self) -> str | None:
+        # One statement, so connections from other processes cannot claim
+        # the same job between picking it and marking it claimed.
+        with self._lock:
+            rows = self._conn.execute(
+                "UPDATE job_queue SET claimed = 1 WHERE job_id = ("
+                " SELECT job_id FROM job_queue WHERE claimed = 0 ORDER BY enqueued_at LIMIT 1"
+                ") RETURNING job_id"
+            ).fetchall()
+            self._conn.commit()
+        return rows[0][0] if rows else None
+
+
+def _connect(path: str | Path) -> sqlite3.Connection:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path.as_posix(), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class JobManager:
+    """Runs extraction jobs from a queue on a fixed number of worker tasks."""
+
+    def __init__(self, service: ExtractionService, settings: AppSettings) -> None:
+        self._service = service
+        self._settings = settings
+        if settings.job_queue_backend == "sqlite":
+            self._store: JobStore = SQLiteJobStore(
+                settings.job_db_path,
+                max_jobs=settings.job_max_retained,
+                ttl_seconds=settings.job_result_ttl_seconds,
+            )
+            self._queue: JobQueue = SQLiteJobQueue(settings.job_db_path)
+        else:
+            self._store = MemoryJobStore(
+                max_jobs=settings.job_max_retained,
+                ttl_seconds=settings.job_result_ttl_seconds,
+            )
+            self._queue = AsyncioJobQueue()
+        self._workers: List[asyncio.Task[None]] = []
+        # Progress saves started from synchronous page callbacks.
+        self._saves: Set[asyncio.Task[None]] = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"bill-api-job-worker-{n}")
+            for n in range(max(1, self._settings.job_workers))
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await asyncio.gather(*self._saves, return_exceptions=True)
+
+    async def submit(self, document: str) -> Job:
+        """Queue ``document``; raises :class:`JobQueueFull` at ``job_max_queued``.
+
+        The limit is checked before the job is queued, so concurrent
+        submissions can overshoot it slightly.
+        """
+        if await self._queue.depth() >= self._settings.job_max_queued:
+            metrics.inc("jobs_rejected_total")
+            raise JobQueueFull(
+                f"{self._settings.job_max_queued} jobs are already queued; retry later"
+            )
+        job = Job(id=uuid.uuid4().hex, document=document)
+        await self._store.save(job)
+        await self._queue.put(job.id)
+        metrics.inc("jobs_submitted_total")
+        return job
+
+    async def get(self, job_id: str) -> Job | None:
+        return await self._store.load(job_id)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = await self._store.load(job_id)
+            if job is None or job.finished:
+                await self._queue.ack(job_id)
+                continue
+            try:
+                await self._run(job)
+            except WorkerPoolSaturated:
+                # Interactive traffic has the CPU; retry the job shortly.
+                job.status = QUEUED
+                await self._touch(job)
+                await asyncio.sleep(1.0)
+                await self._queue.put(job_id)
+                continue
+            await self._queue.ack(job_id)
+
+    async def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.completed_pages = []
+        await self._touch(job)
+
+        def on_page(page_no: int, total_pages: int, page: PageLineItems | None) -> None:
+            job.total_pages = total_pages
+            job.completed_pages.append(page_no)
+            save = asyncio.create_task(self._touch(job))
+            self._saves.add(save)
+            save.add_done_callback(self._saves.discard)
+
+        try:
+            with usage_scope() as usage:
+                data = await self._service.extract(job.document, on_page=on_page)
+        except WorkerPoolSaturated:
+            raise
+        except ValueError as exc:
+            await self._fail(job, 400, str(exc))
+        except Exception as exc:
+            logger.error(f"Job {job.id} failed: {exc}")
+            await self._fail(job, 500, f"Extraction failed: {exc}")
+        else:
+            job.status = SUCCEEDED
+            job.status_code = 200
+            job.result = data.model_dump_json()
+            job.token_usage = usage.to_dict()
+            if job.total_pages is not None:
+                job.completed_pages = list(range(1, job.total_pages + 1))
+            await self._touch(job)
+            metrics.inc("jobs_succeeded_total")
+
+    async def _fail(self, job: Job, status_code: int, error: str) -> None:
+        job.status = FAILED
+        job.status_code = status_code
+        job.error = error
+        await self._touch(job)
+        metrics.inc("jobs_failed_total")
+
+    async def _touch(self, job: Job) -> None:
+        # Strictly increasing, so the store can tell later states apart.
+        job.updated_at = max(time.time(), job.updated_at + 1e-6)
+        await self._store.save(job)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from statistics import median
+from typing import List, Sequence, Set
+
+import numpy as np
+
+from bill_extraction_api.services.ocr import OCRLine, OCRPage, line_texts
+from bill_extraction_api.services.parser import has_amount
+
+# Share of the page height at the top and bottom treated as header/footer.
+_MARGIN_FRACTION = 0.08
+
+
+@dataclass
+class _Cell:
+    text: str
+    left: float
+    center_y: float
+    height: float
+
+
+def _cell(line: OCRLine) -> _Cell:
+    xs = [pt[0] for pt in line.bbox]
+    ys = [pt[1] for pt in line.bbox]
+    return _Cell(
+        text=" ".join(line.text.split()),
+        left=min(xs),
+        center_y=sum(ys) / len(ys),
+        height=max(max(ys) - min(ys), 1.0),
+    )
+
+
+def _cells(lines: Sequence[OCRLine], min_confidence: float) -> List[_Cell]:
+    if not isinstance(lines, OCRPage):
+        return [
+            _cell(line)
+            for line in lines
+            if line.text.strip() and line.confidence >= min_confidence
+        ]
+    # Same geometry as _cell, computed for the whole page at once.
+    xs = lines.boxes[:, :, 0].astype(np.float64)
+    ys = lines.boxes[:, :, 1].astype(np.float64)
+    centers = ys[:, 0].copy()
+    for point in range(1, ys.shape[1]):
+        centers += ys[:, point]
+    centers /= ys.shape[1]
+    heights = np.maximum(ys.max(axis=1) - ys.min(axis=1), 1.0)
+    keep = (lines.confidences.astype(np.float64) >= min_confidence).tolist()
+    return [
+        _Cell(text=" ".join(text.split()), left=left, center_y=center_y, height=height)
+        for text, left, center_y, height, ok in zip(
+            lines.texts, xs.min(axis=1).tolist(), centers.tolist(), heights.tolist(), keep
+        )
+        if ok and text.strip()
+    ]
+
+
+def _group_rows(cells: List[_Cell], tolerance: float) -> List[List[_Cell]]:
+    """Group cells whose vertical centres are within ``tolerance`` of a row's centre."""
+    rows: List[List[_Cell]] = []
+    row_center = 0.0
+    for cell in sorted(cells, key=lambda c: c.center_y):
+        if rows and abs(cell.center_y - row_center) <= tolerance:
+            rows[-1].append(cell)
+            row_center = sum(c.center_y for c in rows[-1]) / len(rows[-1])
+        else:
+            rows.append([cell])
+            row_center = cell.center_y
+    for row in rows:
+        row.sort(key=lambda c: c.left)
+    return rows
+
+
+def _column_anchors(rows: List[List[_Cell]], gap: float) -> List[float]:
+    """Cluster left edges of cells in multi-cell rows into column positions."""
+    lefts = sorted(cell.left for row in rows if len(row) > 1 for cell in row)
+    clusters: List[List[float]] = []
+    for left in lefts:
+        if clusters and left - clusters[-1][-1] <= gap:
+            clusters[-1].append(left)
+        else:
+            clusters.append([left])
+    return [sum(cluster) / len(cluster) for cluster in clusters]
+
+
+def compact_text(lines: Sequence[OCRLine], min_confidence: float = 0.0) -> str:
+    """Render OCR lines as rows, with table rows as ``|``-delimited cells.
+
+    Lines on the same visual row are merged left to right and each cell is
+    placed in a column shared across the page, so a missing quantity or rate
+    shows up as an empty cell instead of shifting the remaining values.
+    Lines below ``min_confidence`` are dropped.
+    """
+    cells = _cells(lines, min_confidence)
+    if not cells:
+        return ""
+
+    line_height = median(cell.height for cell in cells)
+    rows = _group_rows(cells, tolerance=line_height / 2)
+    anchors = _column_anchors(rows, gap=line_height * 1.5)
+
+    out: List[str] = []
+    for row in rows:
+        if len(row) == 1 or len(anchors) < 2:
+            out.append(" ".join(cell.text for cell in row))
+            continue
+        columns: List[str] = []
+        for cell in row:
+            column = min(range(len(anchors)), key=lambda i: abs(anchors[i] - cell.left))
+            # Never place a cell left of one already placed; merge instead.
+            column = max(column, len(columns) - 1)
+            while len(columns) <= column:
+                columns.append("")
+            columns[column] = f"{columns[column]} {cell.text}".strip()
+        out.append("|".join(columns))
+    return "\n".join(out)
+
+
+class BoilerplateFilter:
+    """Drops header/footer lines that repeat page 1's header/footer verbatim.
+
+    Every page is compared with page 1 only, so the result does not depend
+    on the order pages finish OCR: page 1 is passed through unchanged and
+    later pages wait for it to be observed. Margins are a share of the page
+    height (lines of a page whose height is unknown are all kept). Only exact
+    repeats are dropped, and never lines containing an amount, so items that
+    happen to sit at the top or bottom of a page still reach the parser.
+    """
+
+    def __init__(self, margin_fraction: float = _MARGIN_FRACTION) -> None:
+        self._margin_fraction = margin_fraction
+        self._reference: Set[str] | None = None
+        self._ready: asyncio.Event | None = None
+
+    def observe(self, page_no: int, lines: Sequence[OCRLine]) -> None:
+        """Record page 1's margin lines; other pages are ignored."""
+        if page_no != 1 or self._reference is not None:
+            return
+        texts = line_texts(lines)
+        self._reference = {_normalise(texts[index]) for index in self._margin_indices(lines)}
+        if self._ready is not None:
+            self._ready.set()
+
+    async def filter(self, lines: Sequence[OCRLine], page_no: int) -> Sequence[OCRLine]:
+        if page_no == 1:
+            return lines
+        if self._reference is None:
+            if self._ready is None:
+                self._ready = asyncio.Event()
+            await self._ready.wait()
+        return self.drop_repeats(lines)
+
+    def drop_repeats(self, lines: Sequence[OCRLine]) -> Sequence[OCRLine]:
+        """Drop margin lines of ``lines`` that repeat page 1's; page 1 must be observed."""
+        reference = self._reference or set()
+        texts = line_texts(lines)
+        dropped = {
+            index
+            for index in self._margin_indices(lines)
+            if _normalise(texts[index]) in reference and not has_amount(texts[index])
+        }
+        if not dropped:
+            return lines
+        kept = [index for index in range(len(texts)) if index not in dropped]
+        if isinstance(lines, OCRPage):
+            return lines.select(kept)
+        return [lines[index] for index in kept]
+
+    def _margin_indices(self, lines: Sequence[OCRLine]) -> List[int]:
+        height = getattr(lines, "height", None)
+        if not lines or not height:
+            return []
+        if isinstance(lines, OCRPage):
+            ys = lines.boxes[:, :, 1].astype(np.float64)
+            tops, bottoms = ys.min(axis=1).tolist(), ys.max(axis=1).tolist()
+        else:
+            tops = [min(pt[1] for pt in line.bbox) for line in lines]
+            bottoms = [max(pt[1] for pt in line.bbox) for line in lines]
+        margin = height * self._margin_fraction
+        return [
+            index
+            for index, (top, bottom) in enumerate(zip(tops, bottoms))
+            if top <= margin or bottom >= height - margin
+        ]
+
+
+def _normalise(text: str) -> str:
+    return " ".join(text.split())
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Mapping, Tuple, TypeVar
+
+import httpx
+from dateutil.parser import isoparse
+from loguru import logger
+
+from bill_extraction_api.services.metrics import metrics
+from bill_extraction_api.settings import AppSettings
+
+T = TypeVar("T")
+
+# A provider call returns its result plus the HTTP response headers.
+ProviderCall = Callable[[], Awaitable[Tuple[T, Mapping[str, str]]]]
+
+# 529 is Anthropic's "overloaded".
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _status_code(exc: BaseException) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _error_headers(exc: BaseException) -> Mapping[str, str]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    return headers if headers is not None else {}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, connection failures, throttling and server errors are worth retrying."""
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    # SDK connection/timeout errors; matched by name so neither SDK is required.
+    if any(cls.__name__ == "APIConnectionError" for cls in type(exc).__mro__):
+        return True
+    return _status_code(exc) in _RETRYABLE_STATUS
+
+
+def is_client_error(exc: BaseException) -> bool:
+    """A 4xx the provider will keep returning for the same request (not throttling)."""
+    status = _status_code(exc)
+    return status is not None and 400 <= status < 500 and status not in _RETRYABLE_STATUS
+
+
+def parse_reset(value: str | None) -> float | None:
+    """Seconds until a rate-limit window resets.
+
+    Accepts plain seconds ("2"), OpenAI durations ("1m30s", "250ms") and
+    Anthropic RFC 3339 timestamps.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    parts = _DURATION_PART_RE.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+    try:
+        return max(isoparse(value).timestamp() - time.time(), 0.0)
+    except ValueError:
+        return None
+
+
+def _header(headers: Mapping[str, str], *names: str) -> str | None:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for LLM calls that adapts to provider throttling.
+
+    The limit grows by one per ``limit`` successful calls and halves on a
+    429 (additive increase, multiplicative decrease). Rate-limit headers that
+    report an exhausted window, or a ``Retry-After``, pause new calls until the
+    window resets.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1) -> None:
+        self._max_limit = max(1, max_limit)
+        self._min_limit = max(1, min(min_limit, self._max_limit))
+        self._limit = float(self._max_limit)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._waiters: Deque[asyncio.Future[None]] = deque()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Waiters belong to the loop that created them; start fresh on a new loop.
+            self._loop = loop
+            self._in_flight = 0
+            self._waiters.clear()
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            if self._in_flight < self.limit:
+                self._in_flight += 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    # Woken but leaving anyway; pass the wakeup on.
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        self._wake()
+
+    def on_success(self, headers: Mapping[str, str]) -> None:
+        self._limit = min(float(self._max_limit), self._limit + 1 / self._limit)
+        self._observe_headers(headers)
+        self._wake()
+
+    def on_throttled(self, headers: Mapping[str, str]) -> None:
+        self._limit = max(float(self._min_limit), self._limit / 2)
+        metrics.observe("llm_concurrency_limit", self._limit)
+        retry_after = parse_reset(_header(headers, "retry-after"))
+        if retry_after is not None:
+            self._pause(retry_after)
+        self._observe_headers(headers)
+
+    def _observe_headers(self, headers: Mapping[str, str]) -> None:
+        for remaining_names, reset_names in (
+            (
+                ("x-ratelimit-remaining-requests", "anthropic-ratelimit-requests-remaining"),
+                ("x-ratelimit-reset-requests", "anthropic-ratelimit-requests-reset"),
+            ),
+            (
+                ("x-ratelimit-remaining-tokens", "anthropic-ratelimit-tokens-remaining"),
+                ("x-ratelimit-reset-tokens", "anthropic-ratelimit-tokens-reset"),
+            ),
+        ):
+            remaining = _header(headers, *remaining_names)
+            if remaining is None or not remaining.strip().isdigit() or int(remaining) > 0:
+                continue
+            reset = parse_reset(_header(headers, *reset_names))
+            if reset is not None:
+                self._pause(reset)
+
+    def _pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _wake(self) -> None:
+        for _ in range(max(0, self.limit - self._in_flight)):
+            while self._waiters and self._waiters[0].done():
+                self._waiters.popleft()
+            if not self._waiters:
+                return
+            self._waiters.popleft().set_result(None)
+
+
+class ResilientCaller:
+    """Runs provider calls with deadlines, jittered retries, adaptive
+    concurrency and optional hedging.
+
+    ``llm_timeout_seconds`` bounds each request and ``llm_deadline_seconds``
+    the whole call, including time queued on the limiter and backoff. With ``llm_hedge_after_seconds`` > 0 a
+    duplicate request is started when an attempt is that slow, and the first
+    answer wins.
+    """
+
+    def __init__(self, settings: AppSettings) -> None:
+        self._timeout = settings.llm_timeout_seconds
+        self._deadline = settings.llm_deadline_seconds
+        self._max_retries = max(0, settings.llm_max_retries)
+        self._retry_base = settings.llm_retry_base_seconds
+        self._retry_max = settings.llm_retry_max_seconds
+        self._hedge_after = settings.llm_hedge_after_seconds
+        self.limiter = AdaptiveLimiter(settings.llm_global_concurrency)
+
+    async def call(self, fn: ProviderCall[T]) -> T:
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = self._deadline - (time.monotonic() - started)
+            try:
+                return await self._attempt(fn, remaining)
+            except Exception as exc:
+                if isinstance(exc, asyncio.TimeoutError):
+                    metrics.inc("llm_timeouts_total")
+                if not is_retryable(exc) or attempt >= self._max_retries:
+                    raise
+                delay = random.uniform(0, min(self._retry_max, self._retry_base * 2**attempt))
+                retry_after = parse_reset(_header(_error_headers(exc), "retry-after"))
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if time.monotonic() - started + delay >= self._deadline:
+                    raise
+                attempt += 1
+                metrics.inc("llm_retries_total")
+                logger.warning(
+                    f"LLM call failed ({type(exc).__name__}: {exc}); "
+                    f"retry {attempt}/{self._max_retries} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, fn: ProviderCall[T], remaining: float) -> T:
+        if remaining <= 0:
+            raise asyncio.TimeoutError("LLM call deadline exceeded")
+        deadline = asyncio.get_running_loop().time() + remaining
+        if self._hedge_after <= 0 or self._hedge_after >= min(self._timeout, remaining):
+            return await self._limited(fn, deadline)
+
+        sent = asyncio.Event()
+        tasks = [asyncio.create_task(self._limited(fn, deadline, sent))]
+        try:
+            # Only requests that are slow upstream are hedged, not ones
+            # still queued on the limiter.
+            waiting = asyncio.create_task(sent.wait())
+            await asyncio.wait([tasks[0], waiting], return_when=asyncio.FIRST_COMPLETED)
+            waiting.cancel()
+            if not tasks[0].done():
+                done, _ = await asyncio.wait(tasks, timeout=self._hedge_after)
+                if not done:
+                    metrics.inc("llm_hedged_requests_total")
+                    tasks.append(asyncio.create_task(self._limited(fn, deadline)))
+            error: BaseException | None = None
+            pending = set(tasks)
+            while pending:
+                # Each task is bounded by its own attempt timeout and the deadline.
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            metrics.inc("llm_hedge_wins_total")
+                        return task.result()
+                    error = task.exception()
+            if error is not None:
+                raise error
+            raise asyncio.TimeoutError("LLM call timed out")
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let the losers release their limiter slots before returning.
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _limited(
+        self, fn: ProviderCall[T], deadline: float, sent: asyncio.Event | None = None
+    ) -> T:
+        """Wait for a limiter slot until ``deadline``, then make one request.
+
+        Only the request counts against the per-attempt timeout; time spent
+        queued on the limiter is bounded by the call's overall deadline.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(self.limiter.acquire(), max(deadline - loop.time(), 0.0))
+        except asyncio.TimeoutError:
+            metrics.inc("llm_limiter_timeouts_total")
+            raise asyncio.TimeoutError(
+                "LLM call deadline exceeded waiting for a concurrency slot"
+            ) from None
+        if sent is not None:
+            sent.set()
+        try:
+            timeout = min(self._timeout, deadline - loop.time())
+            if timeout <= 0:
+                raise asyncio.TimeoutError("LLM call deadline exceeded")
+            result, headers = await asyncio.wait_for(fn(), timeout)
+        except Exception as exc:
+            if _status_code(exc) == 429:
+                metrics.inc("llm_throttled_total")
+                self.limiter.on_throttled(_error_headers(exc))
+            raise
+        finally:
+            self.limiter.release()
+        self.limiter.on_success(headers)
+        return result
@@ -1,16 +1,32 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
-from typing import List
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, Iterator, List, Mapping, Sequence
 
+import httpx
 from loguru import logger
 
 from bill_extraction_api.app.schemas import BillItem
-from bill_extraction_api.services.ocr import OCRLine
+from bill_extraction_api.services.cache import build_cache, cache_get, cache_set
+from bill_extraction_api.services.layout import compact_text
+from bill_extraction_api.services.llm_client import (
+    AdaptiveLimiter,
+    ResilientCaller,
+    is_client_error,
+)
+from bill_extraction_api.services.metrics import metrics, span
+from bill_extraction_api.services.ocr import OCRLine, line_texts, reading_order
 from bill_extraction_api.settings import AppSettings
 
-# The expert prompt for medical bill extraction
-LLM_PROMPT_TEMPLATE = """You are an expert document understanding system trained for medical bill extraction.
+# The expert prompt for medical bill extraction. Instructions are static and sent
+# ahead of the OCR text so providers can cache them as a prompt prefix.
+_EXTRACTION_RULES = """You are an expert document understanding system trained for medical bill extraction.
 
 Your job is to convert OCR text from a bill page into structured line items.
 
@@ -34,27 +50,62 @@ Your job is to convert OCR text from a bill page into structured line items.
 
 - Preserve ordering from top to bottom.
 
+- Table rows may be given as cells separated by "|"; an empty cell means that column is blank on that row."""
+
+LLM_PAGE_INSTRUCTIONS = _EXTRACTION_RULES + """
+
 Your output MUST strictly follow this JSON format:
 
-{{
+{
   "page_type": "Bill Detail",
   "bill_items": [
-    {{
+    {
       "item_name": "",
       "item_quantity": null,
       "item_rate": null,
       "item_amount": null
-    }}
+    }
+  ]
+}
+
+Do not add any explanation outside the JSON.
+
+Return ONLY the JSON object."""
+
+LLM_BATCH_INSTRUCTIONS = _EXTRACTION_RULES + """
+
+You will receive several pages, each starting with a line "=== PAGE <number> ===".
+Treat every page independently and never move items between pages.
+
+Your output MUST strictly follow this JSON format, with one entry per page:
+
+{
+  "pages": [
+    {
+      "page_no": 1,
+      "page_type": "Bill Detail",
+      "bill_items": [
+        {
+          "item_name": "",
+          "item_quantity": null,
+          "item_rate": null,
+          "item_amount": null
+        }
+      ]
+    }
   ]
-}}
+}
 
 Do not add any explanation outside the JSON.
 
-Return ONLY the JSON object.
+Return ONLY the JSON object."""
+
+LLM_PAGE_CONTENT = "OCR Text from bill page:\n{ocr_text}\n"
 
-OCR Text from bill page:
-{ocr_text}
-"""
+_PAGE_DELIMITER = "=== PAGE {page_no} ==="
+
+# vLLM's default; llama.cpp (8080) and Ollama (11434) need llm_base_url.
+_LOCAL_BASE_URL = "http://127.0.0.1:8000/v1"
 
 
 class TokenUsage:
@@ -64,27 +115,104 @@ class TokenUsage:
         self.total_tokens = 0
         self.input_tokens = 0
         self.output_tokens = 0
+        # Input tokens served from the provider's prompt cache (billed at a discount).
+        self.cached_input_tokens = 0
+        # Responses reused from the cache or a coalesced call; no tokens billed.
+        self.cache_hits = 0
 
-    def add(self, input_tokens: int, output_tokens: int) -> None:
+    def add(self, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0) -> None:
         self.input_tokens += input_tokens
         self.output_tokens += output_tokens
+        self.cached_input_tokens += cached_input_tokens
         self.total_tokens += input_tokens + output_tokens
 
+    def add_cache_hit(self) -> None:
+        self.cache_hits += 1
+
     def to_dict(self) -> dict:
         return {
             "total_tokens": self.total_tokens,
             "input_tokens": self.input_tokens,
             "output_tokens": self.output_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "cache_hits": self.cache_hits,
         }
 
 
+# Token usage is per request while the parser (and its client) is shared, so the
+# active tracker lives in a context variable rather than on the parser.
+_current_usage: ContextVar[TokenUsage | None] = ContextVar("llm_token_usage", default=None)
+
+
+def current_usage() -> TokenUsage:
+    """Return the tracker for the active request, creating one if needed."""
+    usage = _current_usage.get()
+    if usage is None:
+        usage = TokenUsage()
+        _current_usage.set(usage)
+    return usage
+
+
+@contextmanager
+def usage_scope() -> Iterator[TokenUsage]:
+    """Collect token usage for everything awaited inside the block."""
+    usage = TokenUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+def _load_json(response_text: str) -> dict:
+    """Parse a JSON response, tolerating markdown code fences around it."""
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse LLM JSON response: {e}\nResponse: {response_text[:500]}")
+        # Try to extract JSON from markdown code blocks
+        if "```json" in response_text:
+            start = response_text.find("```json") + 7
+            end = response_text.find("```", start)
+            if end > start:
+                return json.loads(response_text[start:end].strip())
+        elif "```" in response_text:
+            start = response_text.find("```") + 3
+            end = response_text.find("```", start)
+            if end > start:
+                return json.loads(response_text[start:end].strip())
+        raise
+
+
+@dataclass
+class _SharedCall:
+    """An upstream call shared by concurrent identical prompts."""
+
+    task: asyncio.Task[tuple[str, dict]]
+    billed: bool = False
+
+
 class LLMParser:
     """LLM-based parser that uses AI to extract structured line items from OCR text."""
 
     def __init__(self, settings: AppSettings) -> None:
         self._settings = settings
-        self._token_usage = TokenUsage()
         self._client = self._create_client()
+        self._response_cache = build_cache(
+            settings.llm_cache_backend,
+            max_entries=settings.llm_cache_max_entries,
+            ttl_seconds=settings.llm_cache_ttl_seconds,
+            path=settings.llm_cache_path,
+        )
+        self._inflight: Dict[str, _SharedCall] = {}
+        self._caller = ResilientCaller(settings)
+        # Cleared when an OpenAI-compatible server rejects response_format.
+        self._response_format = settings.llm_response_format == "json_object"
+
+    @property
+    def limiter(self) -> AdaptiveLimiter:
+        """Adaptive concurrency limit shared by every call this parser makes."""
+        return self._caller.limiter
 
     def _create_client(self):
         """Create the appropriate LLM client based on provider."""
@@ -102,7 +230,13 @@ class LLMParser:
                     raise ValueError(
                         "BILL_API_OPENAI_API_KEY environment variable is required for OpenAI provider"
                     )
-                return AsyncOpenAI(api_key=api_key)
+                # Retries and timeouts are handled by ResilientCaller.
+                return AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=self._settings.llm_base_url,
+                    max_retries=0,
+                    timeout=self._settings.llm_timeout_seconds,
+                )
             except ImportError:
                 raise RuntimeError(
                     "openai package is required. Install with: pip install openai"
@@ -117,66 +251,206 @@ class LLMParser:
                     raise ValueError(
                         "BILL_API_ANTHROPIC_API_KEY environment variable is required for Anthropic provider"
                     )
-                return AsyncAnthropic(api_key=api_key)
+                return AsyncAnthropic(
+                    api_key=api_key,
+                    max_retries=0,
+                    timeout=self._settings.llm_timeout_seconds,
+                )
             except ImportError:
                 raise RuntimeError(
                     "anthropic package is required. Install with: pip install anthropic"
                 )
 
         elif provider == "local":
-            # For local models, you'd integrate with Ollama, vLLM, etc.
-            raise NotImplementedError("Local model support not yet implemented")
+            # llama.cpp, vLLM, Ollama and similar servers speak the OpenAI API.
+            try:
+                from openai import AsyncOpenAI
+            except ImportError:
+                raise RuntimeError(
+                    "openai package is required for the local provider. Install with: pip install openai"
+                )
+            pool_size = max(self._settings.llm_global_concurrency, self._settings.llm_local_parallel_requests)
+            http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self._settings.llm_timeout_seconds),
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+            return AsyncOpenAI(
+                api_key=self._settings.openai_api_key or "local",
+                base_url=self._settings.llm_base_url or _LOCAL_BASE_URL,
+                max_retries=0,
+                timeout=self._settings.llm_timeout_seconds,
+                http_client=http_client,
+            )
 
         else:
             raise ValueError(f"Unknown LLM provider: {provider}")
 
-    def _format_ocr_text(self, lines: List[OCRLine]) -> str:
+    def _format_ocr_text(self, lines: Sequence[OCRLine]) -> str:
         """Format OCR lines into a readable text block, preserving order."""
-        sorted_lines = sorted(
-            lines, key=lambda line: sum(pt[1] for pt in line.bbox) / len(line.bbox)
-        )
-        return "\n".join(line.text.strip() for line in sorted_lines if line.text.strip())
-
-    async def _call_openai(self, prompt: str) -> tuple[str, dict]:
-        """Call OpenAI API and return response with token usage."""
-        response = await self._client.chat.completions.create(
-            model=self._settings.llm_model,
-            messages=[
-                {"role": "system", "content": "You are a medical bill extraction expert."},
-                {"role": "user", "content": prompt},
+        if self._settings.llm_text_format == "compact":
+            return compact_text(lines, min_confidence=self._settings.llm_min_line_confidence)
+        texts = line_texts(lines)
+        ordered = (texts[index].strip() for index in reading_order(lines).tolist())
+        return "\n".join(text for text in ordered if text)
+
+    async def _call_openai(
+        self, instructions: str, content: str, max_tokens: int
+    ) -> tuple[str, dict, Mapping[str, str]]:
+        """Call OpenAI API and return response, token usage and response headers."""
+        # OpenAI (and prefix-caching local servers) cache long shared prompt
+        # prefixes automatically; keeping the static instructions first is all
+        # that is needed to benefit.
+        request = {
+            "model": self._settings.llm_model,
+            "messages": [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": content},
             ],
-            temperature=self._settings.llm_temperature,
-            max_tokens=self._settings.llm_max_tokens,
-            response_format={"type": "json_object"},
-        )
+            "temperature": self._settings.llm_temperature,
+            "max_tokens": max_tokens,
+        }
+        use_response_format = self._response_format
+        if use_response_format:
+            request["response_format"] = {"type": "json_object"}
+        try:
+            raw = await self._client.chat.completions.with_raw_response.create(**request)
+        except Exception as exc:
+            if not (use_response_format and _rejects_response_format(exc)):
+                raise
+            # Some OpenAI-compatible servers do not implement JSON mode; the
+            # prompt already asks for JSON, so carry on without it.
+            logger.warning("LLM server rejected response_format; sending requests without it")
+            self._response_format = False
+            request.pop("response_format")
+            raw = await self._client.chat.completions.with_raw_response.create(**request)
+        response = raw.parse()
 
         content = response.choices[0].message.content or "{}"
         usage = response.usage
+        details = getattr(usage, "prompt_tokens_details", None) if usage else None
         token_info = {
             "input_tokens": usage.prompt_tokens if usage else 0,
             "output_tokens": usage.completion_tokens if usage else 0,
+            "cached_input_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0,
         }
-        return content, token_info
-
-    async def _call_anthropic(self, prompt: str) -> tuple[str, dict]:
-        """Call Anthropic API and return response with token usage."""
-        response = await self._client.messages.create(
+        return content, token_info, raw.headers
+
+    async def _call_anthropic(
+        self, instructions: str, content: str, max_tokens: int
+    ) -> tuple[str, dict, Mapping[str, str]]:
+        """Call Anthropic API and return response, token usage and response headers."""
+        system: dict = {"type": "text", "text": instructions}
+        if self._settings.llm_prompt_caching:
+            # Below the model's minimum cacheable length this is silently ignored.
+            system["cache_control"] = {"type": "ephemeral"}
+        raw = await self._client.messages.with_raw_response.create(
             model=self._settings.llm_model,
-            max_tokens=self._settings.llm_max_tokens,
+            max_tokens=max_tokens,
             temperature=self._settings.llm_temperature,
+            system=[system],
             messages=[
-                {"role": "user", "content": prompt},
+                {"role": "user", "content": content},
             ],
         )
+        response = raw.parse()
 
         content = response.content[0].text if response.content else "{}"
+        usage = response.usage
+        # Anthropic reports cache reads and writes separately from input_tokens.
+        cache_read = (getattr(usage, "cache_read_input_tokens", None) or 0) if usage else 0
+        cache_write = (getattr(usage, "cache_creation_input_tokens", None) or 0) if usage else 0
         token_info = {
-            "input_tokens": response.usage.input_tokens if response.usage else 0,
-            "output_tokens": response.usage.output_tokens if response.usage else 0,
+            "input_tokens": (usage.input_tokens + cache_read + cache_write) if usage else 0,
+            "output_tokens": usage.output_tokens if usage else 0,
+            "cached_input_tokens": cache_read,
         }
-        return content, token_info
+        return content, token_info, raw.headers
 
-    async def parse(self, lines: List[OCRLine], page_number: int = 1) -> tuple[List[BillItem], str]:
+    async def _call_provider(
+        self, instructions: str, content: str, max_tokens: int
+    ) -> tuple[str, dict]:
+        provider = self._settings.llm_provider
+        if provider in ("openai", "local"):
+            call = self._call_openai
+        elif provider == "anthropic":
+            call = self._call_anthropic
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+
+        async def attempt() -> tuple[tuple[str, dict], Mapping[str, str]]:
+            content_text, token_info, headers = await call(instructions, content, max_tokens)
+            return (content_text, token_info), headers
+
+        return await self._caller.call(attempt)
+
+    def _cache_key(self, instructions: str, content: str, max_tokens: int) -> str:
+        digest = hashlib.sha256(f"{instructions}\0{content}".encode()).hexdigest()
+        settings = self._settings
+        return (
+            f"{settings.llm_provider}:{settings.llm_base_url or ''}:{settings.llm_model}:"
+            f"{settings.llm_temperature}:{max_tokens}:{digest}"
+        )
+
+    async def _complete(
+        self, instructions: str, content: str, cache_key: str, max_tokens: int
+    ) -> tuple[str, dict | None]:
+        """Return the response text and token usage, or ``None`` usage when reused.
+
+        Responses come from the cache when possible, and concurrent identical
+        prompts share a single upstream call. Reused responses are counted as
+        cache hits rather than tokens so usage reflects what was billed.
+        """
+        if self._response_cache is not None:
+            cached = await cache_get(self._response_cache, cache_key)
+            if cached is not None:
+                metrics.inc("llm_cache_hits_total")
+                current_usage().add_cache_hit()
+                return cached.decode(), None
+
+        shared = self._inflight.get(cache_key)
+        if shared is None:
+            if self._response_cache is not None:
+                metrics.inc("llm_cache_misses_total")
+            # The call runs in its own task so a cancelled caller does not
+            # cancel it for the callers sharing it.
+            shared = _SharedCall(
+                asyncio.create_task(self._call_provider(instructions, content, max_tokens))
+            )
+            self._inflight[cache_key] = shared
+            shared.task.add_done_callback(partial(self._forget, cache_key, shared))
+        else:
+            metrics.inc("llm_coalesced_requests_total")
+
+        text, token_info = await asyncio.shield(shared.task)
+        if shared.billed:
+            current_usage().add_cache_hit()
+            return text, None
+        # The first caller to receive the response is billed for it.
+        shared.billed = True
+        current_usage().add(
+            token_info["input_tokens"],
+            token_info["output_tokens"],
+            token_info.get("cached_input_tokens", 0),
+        )
+        return text, token_info
+
+    def _forget(self, cache_key: str, shared: _SharedCall, task: asyncio.Task) -> None:
+        if self._inflight.get(cache_key) is shared:
+            del self._inflight[cache_key]
+        if not task.cancelled():
+            # Mark as retrieved so a failure nobody waited for is not logged.
+            task.exception()
+
+    async def _remember(self, cache_key: str, response_text: str) -> None:
+        """Cache a response once it has been parsed successfully."""
+        if self._response_cache is not None:
+            await cache_set(self._response_cache, cache_key, response_text.encode())
+
+    def estimate_tokens(self, lines: Sequence[OCRLine]) -> int:
+        """Rough input-token estimate for a page (about four characters per token)."""
+        return len(self._format_ocr_text(lines)) // 4 + 1
+
+    async def parse(self, lines: Sequence[OCRLine], page_number: int = 1) -> tuple[List[BillItem], str]:
         """
         Parse OCR lines using LLM and return bill items with page type.
 
@@ -191,81 +465,277 @@ class LLMParser:
             logger.warning(f"Empty OCR text for page {page_number}")
             return [], "Bill Detail"
 
-        prompt = LLM_PROMPT_TEMPLATE.format(ocr_text=ocr_text)
+        content = LLM_PAGE_CONTENT.format(ocr_text=ocr_text)
+        max_tokens = self._settings.llm_max_tokens
+        cache_key = self._cache_key(LLM_PAGE_INSTRUCTIONS, content, max_tokens)
 
         try:
-            provider = self._settings.llm_provider
-            if provider == "openai":
-                response_text, token_info = await self._call_openai(prompt)
-            elif provider == "anthropic":
-                response_text, token_info = await self._call_anthropic(prompt)
-            else:
-                raise ValueError(f"Unsupported provider: {provider}")
-
-            # Track token usage
-            self._token_usage.add(token_info["input_tokens"], token_info["output_tokens"])
+            with span("llm_call", page=page_number):
+                response_text, token_info = await self._complete(
+                    LLM_PAGE_INSTRUCTIONS, content, cache_key, max_tokens
+                )
+            if token_info is not None:
+                metrics.observe(
+                    "page_llm_tokens", token_info["input_tokens"] + token_info["output_tokens"]
+                )
+            response_json = _load_json(response_text)
+            if token_info is not None:
+                await self._remember(cache_key, response_text)
 
-            # Parse JSON response
-            try:
-                response_json = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse LLM JSON response: {e}\nResponse: {response_text[:500]}")
-                # Try to extract JSON from markdown code blocks
-                if "```json" in response_text:
-                    start = response_text.find("```json") + 7
-                    end = response_text.find("```", start)
-                    if end > start:
-                        response_text = response_text[start:end].strip()
-                        response_json = json.loads(response_text)
-                elif "```" in response_text:
-                    start = response_text.find("```") + 3
-                    end = response_text.find("```", start)
-                    if end > start:
-                        response_text = response_text[start:end].strip()
-                        response_json = json.loads(response_text)
-                else:
-                    raise
-
-            # Extract bill items
-            bill_items = []
+            bill_items = _bill_items(response_json.get("bill_items", []))
             page_type = response_json.get("page_type", "Bill Detail")
 
-            for item_data in response_json.get("bill_items", []):
-                try:
-                    bill_item = BillItem(
-                        item_name=item_data.get("item_name", "").strip(),
-                        item_amount=float(item_data["item_amount"])
-                        if item_data.get("item_amount") is not None
-                        else None,
-                        item_rate=float(item_data["item_rate"])
-                        if item_data.get("item_rate") is not None
-                        else None,
-                        item_quantity=float(item_data["item_quantity"])
-                        if item_data.get("item_quantity") is not None
-                        else None,
-                    )
-                    # Validate that item_amount is present (required field)
-                    if bill_item.item_amount is not None:
-                        bill_items.append(bill_item)
-                except (ValueError, KeyError) as e:
-                    logger.warning(f"Skipping invalid bill item: {item_data}, error: {e}")
-                    continue
-
-            logger.info(
-                f"LLM extracted {len(bill_items)} items from page {page_number} "
-                f"(tokens: {token_info['input_tokens']} in, {token_info['output_tokens']} out)"
-            )
+            if token_info is None:
+                logger.info(f"LLM extracted {len(bill_items)} items from page {page_number} (cached)")
+            else:
+                logger.info(
+                    f"LLM extracted {len(bill_items)} items from page {page_number} "
+                    f"(tokens: {token_info['input_tokens']} in, {token_info['output_tokens']} out)"
+                )
             return bill_items, page_type
 
         except Exception as e:
             logger.error(f"LLM parsing failed for page {page_number}: {e}")
             raise
 
+    async def parse_batch(
+        self, pages: Dict[int, Sequence[OCRLine]]
+    ) -> Dict[int, tuple[List[BillItem], str]]:
+        """Parse several pages with one request, keyed by page number.
+
+        The output budget is ``llm_max_tokens`` per page, capped at the model's
+        ``llm_max_output_tokens``. A response that cannot be parsed, or a
+        request the provider rejects outright (e.g. as too large), is retried
+        as two smaller batches, down to single pages; pages missing from a
+        response are retried on their own.
+        """
+        if not self._client:
+            raise RuntimeError("LLM client not initialized. Check parser_backend setting.")
+
+        results: Dict[int, tuple[List[BillItem], str]] = {}
+        texts: Dict[int, str] = {}
+        for page_no, lines in pages.items():
+            text = self._format_ocr_text(lines)
+            if text.strip():
+                texts[page_no] = text
+            else:
+                results[page_no] = ([], "Bill Detail")
+        if len(texts) == 1:
+            (page_no,) = texts
+            results[page_no] = await self.parse(pages[page_no], page_number=page_no)
+            return results
+        if not texts:
+            return results
+
+        content = "\n\n".join(
+            f"{_PAGE_DELIMITER.format(page_no=page_no)}\n{text}" for page_no, text in texts.items()
+        )
+        max_tokens = min(
+            self._settings.llm_max_tokens * len(texts), self._settings.llm_max_output_tokens
+        )
+        cache_key = self._cache_key(LLM_BATCH_INSTRUCTIONS, content, max_tokens)
+        try:
+            with span("llm_call"):
+                response_text, token_info = await self._complete(
+                    LLM_BATCH_INSTRUCTIONS, content, cache_key, max_tokens
+                )
+        except Exception as exc:
+            if not is_client_error(exc):
+                raise
+            metrics.inc("llm_batch_splits_total")
+            logger.warning(f"LLM rejected batch of pages {list(texts)} ({exc}); splitting batch")
+            return {**results, **await self._split_batch(pages, list(texts))}
+        metrics.inc("llm_batch_requests_total")
+        metrics.observe("llm_batch_pages", len(texts))
+        if token_info is not None:
+            # Batched pages share one bill; attribute the tokens evenly.
+            per_page = (token_info["input_tokens"] + token_info["output_tokens"]) / len(texts)
+            for _ in texts:
+                metrics.observe("page_llm_tokens", per_page)
+
+        parsed = _batch_pages(response_text, texts)
+        if parsed is None:
+            metrics.inc("llm_batch_splits_total")
+            logger.warning(f"Unparseable LLM batch response for pages {list(texts)}; splitting batch")
+            return {**results, **await self._split_batch(pages, list(texts))}
+
+        if token_info is not None:
+            await self._remember(cache_key, response_text)
+        results.update(parsed)
+        missing = [page_no for page_no in texts if page_no not in parsed]
+        if missing:
+            logger.warning(f"LLM batch response omitted pages {missing}; retrying them")
+            results.update(await self.parse_batch({n: pages[n] for n in missing}))
+        logger.info(
+            f"LLM extracted {sum(len(items) for items, _ in parsed.values())} items "
+            f"from pages {sorted(parsed)} in one request"
+        )
+        return results
+
+    async def _split_batch(
+        self, pages: Dict[int, Sequence[OCRLine]], page_numbers: List[int]
+    ) -> Dict[int, tuple[List[BillItem], str]]:
+        # One half after the other: the caller holds a single concurrency slot.
+        middle = len(page_numbers) // 2
+        results = await self.parse_batch({n: pages[n] for n in page_numbers[:middle]})
+        results.update(await self.parse_batch({n: pages[n] for n in page_numbers[middle:]}))
+        return results
+
     def get_token_usage(self) -> dict[str, int]:
-        """Get cumulative token usage statistics."""
-        return self._token_usage.to_dict()
+        """Get token usage statistics for the active request."""
+        return current_usage().to_dict()
 
     def reset_token_usage(self) -> None:
-        """Reset token usage counters."""
-        self._token_usage = TokenUsage()
+        """Start a fresh token usage tracker for the active request."""
+        _current_usage.set(TokenUsage())
+
+
+
+class PageBatcher:
+    """Groups one document's pages into multi-page LLM requests.
+
+    Waiting pages are sent once they fill ``token_budget`` or ``max_pages``,
+    once all ``expected_pages`` have arrived, or ``linger`` seconds after the
+    first of them arrived. ``limiter`` bounds concurrent requests.
+    """
+
+    def __init__(
+        self,
+        parser: LLMParser,
+        expected_pages: int,
+        token_budget: int,
+        max_pages: int,
+        linger: float,
+        limiter: asyncio.Semaphore,
+    ) -> None:
+        self._parser = parser
+        self._remaining = expected_pages
+        self._token_budget = token_budget
+        self._max_pages = max(1, max_pages)
+        self._linger = linger
+        self._limiter = limiter
+        self._pending: Dict[int, tuple[Sequence[OCRLine], asyncio.Future]] = {}
+        self._pending_tokens = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._requests: set[asyncio.Task[None]] = set()
+
+    async def parse(self, lines: Sequence[OCRLine], page_number: int = 1) -> tuple[List[BillItem], str]:
+        tokens = self._parser.estimate_tokens(lines)
+        self._remaining -= 1
+        if self._pending and self._pending_tokens + tokens > self._token_budget:
+            self._flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[page_number] = (lines, future)
+        self._pending_tokens += tokens
+        if (
+            len(self._pending) >= self._max_pages
+            or self._pending_tokens >= self._token_budget
+            or self._remaining <= 0
+        ):
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._linger, self._flush)
+        return await future
+
+    def skip(self) -> None:
+        """Record that an expected page will not be sent, e.g. it was routed elsewhere."""
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self._flush()
+
+    def close(self) -> None:
+        """Cancel requests still in flight, e.g. when the document failed."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for request in self._requests:
+            request.cancel()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_tokens = self._pending, {}, 0
+        request = asyncio.create_task(self._send(batch))
+        self._requests.add(request)
+        request.add_done_callback(self._requests.discard)
+
+    async def _send(self, batch: Dict[int, tuple[Sequence[OCRLine], asyncio.Future]]) -> None:
+        try:
+            async with self._limiter:
+                results = await self._parser.parse_batch(
+                    {page_no: lines for page_no, (lines, _) in batch.items()}
+                )
+        except BaseException as exc:
+            for _, future in batch.values():
+                if not future.done():
+                    if isinstance(exc, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(exc)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            return
+        for page_no, (_, future) in batch.items():
+            if not future.done():
+                future.set_result(results[page_no])
+
+
+def _bill_items(items: List[dict]) -> List[BillItem]:
+    bill_items = []
+    for item_data in items:
+        try:
+            bill_item = BillItem(
+                item_name=item_data.get("item_name", "").strip(),
+                item_amount=float(item_data["item_amount"])
+                if item_data.get("item_amount") is not None
+                else None,
+                item_rate=float(item_data["item_rate"])
+                if item_data.get("item_rate") is not None
+                else None,
+                item_quantity=float(item_data["item_quantity"])
+                if item_data.get("item_quantity") is not None
+                else None,
+            )
+            # Validate that item_amount is present (required field)
+            if bill_item.item_amount is not None:
+                bill_items.append(bill_item)
+        except (ValueError, KeyError, AttributeError) as e:
+            logger.warning(f"Skipping invalid bill item: {item_data}, error: {e}")
+            continue
+    return bill_items
+
+
+def _batch_pages(
+    response_text: str, texts: Dict[int, str]
+) -> Dict[int, tuple[List[BillItem], str]] | None:
+    """Map a multi-page response back to requested pages, or ``None`` if unusable."""
+    try:
+        response_json = _load_json(response_text)
+    except (json.JSONDecodeError, ValueError):
+        return None
+    entries = response_json.get("pages") if isinstance(response_json, dict) else None
+    if not isinstance(entries, list):
+        return None
+    pages: Dict[int, tuple[List[BillItem], str]] = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            page_no = int(entry.get("page_no"))
+        except (TypeError, ValueError):
+            continue
+        if page_no in texts and page_no not in pages:
+            pages[page_no] = (
+                _bill_items(entry.get("bill_items") or []),
+                entry.get("page_type", "Bill Detail"),
+            )
+    return pages or None
+
 
+def _rejects_response_format(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None)
+    return status in (400, 422) and "response_format" in str(exc).lower()
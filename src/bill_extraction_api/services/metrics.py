@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, Tuple
+
+# Histogram bucket upper bounds; ``*_seconds`` metrics use latency buckets,
+# ``*_ratio`` metrics (values in [0, 1]) steps of 0.1 and everything else
+# (pages, pixels, lines, tokens) a 1-2-5 series.
+_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+_SIZE_BUCKETS: Tuple[float, ...] = tuple(
+    base * 10**exponent for exponent in range(0, 8) for base in (1, 2, 5)
+)
+_RATIO_BUCKETS: Tuple[float, ...] = tuple(step / 10 for step in range(1, 11))
+_PREFIX = "bill_api_"
+_INVALID_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _buckets_for(name: str) -> Tuple[float, ...]:
+    if name.endswith("_seconds"):
+        return _LATENCY_BUCKETS
+    if name.endswith("_ratio"):
+        return _RATIO_BUCKETS
+    return _SIZE_BUCKETS
+
+
+@dataclass
+class _Summary:
+    buckets: Tuple[float, ...] = _SIZE_BUCKETS
+    bucket_counts: list = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+    maximum: float = 0.0
+
+    def add(self, value: float) -> None:
+        if not self.bucket_counts:
+            self.bucket_counts = [0] * len(self.buckets)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+
+class MetricsRegistry:
+    """Thread-safe in-process counters, histograms and gauges.
+
+    Stages running in worker threads record into the same registry as the
+    event loop, so updates are guarded by a lock. With ``enabled`` false,
+    recording is a no-op.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._summaries: dict[str, _Summary] = {}
+        self._gauges: dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = self._summaries[name] = _Summary(buckets=_buckets_for(name))
+            summary.add(value)
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Register a value read at scrape time, such as a queue depth."""
+        with self._lock:
+            self._gauges[name] = read
+
+    def _read_gauges(self) -> Dict[str, float]:
+        with self._lock:
+            gauges = dict(self._gauges)
+        values = {}
+        for name, read in gauges.items():
+            try:
+                values[name] = float(read())
+            except Exception:
+                continue
+        return values
+
+    def _hit_ratios(self, counters: Dict[str, float]) -> Dict[str, float]:
+        ratios = {}
+        for name, hits in counters.items():
+            if not name.endswith("_hits_total"):
+                continue
+            base = name[: -len("_hits_total")]
+            lookups = hits + counters.get(f"{base}_misses_total", 0.0)
+            if lookups:
+                ratios[f"{base}_hit_ratio"] = hits / lookups
+        return ratios
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            summaries = {
+                name: {
+                    "count": summary.count,
+                    "sum": summary.total,
+                    "avg": summary.total / summary.count if summary.count else 0.0,
+                    "max": summary.maximum,
+                }
+                for name, summary in self._summaries.items()
+            }
+        gauges = self._read_gauges()
+        gauges.update(self._hit_ratios(counters))
+        return {"counters": counters, "summaries": summaries, "gauges": gauges}
+
+    def prometheus(self) -> str:
+        """Render everything in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            summaries = {
+                name: (summary.buckets, list(summary.bucket_counts), summary.count, summary.total)
+                for name, summary in self._summaries.items()
+            }
+        gauges = self._read_gauges()
+        gauges.update(self._hit_ratios(counters))
+
+        out = []
+        for name, value in sorted(counters.items()):
+            metric = _metric_name(name)
+            out.append(f"# TYPE {metric} counter")
+            out.append(f"{metric} {_number(value)}")
+        for name, (buckets, bucket_counts, count, total) in sorted(summaries.items()):
+            metric = _metric_name(name)
+            out.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, bucket_counts or [0] * len(buckets)):
+                cumulative += bucket_count
+                out.append(f'{metric}_bucket{{le="{_number(bound)}"}} {cumulative}')
+            out.append(f'{metric}_bucket{{le="+Inf"}} {count}')
+            out.append(f"{metric}_sum {_number(total)}")
+            out.append(f"{metric}_count {count}")
+        for name, value in sorted(gauges.items()):
+            metric = _metric_name(name)
+            out.append(f"# TYPE {metric} gauge")
+            out.append(f"{metric} {_number(value)}")
+        return "\n".join(out) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+
+def _metric_name(name: str) -> str:
+    return _PREFIX + _INVALID_NAME_RE.sub("_", name)
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+metrics = MetricsRegistry()
+
+
+class RequestTimings:
+    """Stage timings collected for one request, per stage and per page."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.pages: Dict[int, Dict[str, float]] = {}
+
+    def add(self, stage: str, seconds: float, page: int | None) -> None:
+        with self._lock:
+            totals = self.stages.setdefault(stage, {"count": 0, "seconds": 0.0})
+            totals["count"] += 1
+            totals["seconds"] += seconds
+            if page is not None:
+                page_stages = self.pages.setdefault(page, {})
+                page_stages[stage] = page_stages.get(stage, 0.0) + seconds
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "total_seconds": round(time.perf_counter() - self._started, 6),
+                "stages": {
+                    stage: {"count": int(totals["count"]), "seconds": round(totals["seconds"], 6)}
+                    for stage, totals in self.stages.items()
+                },
+                "pages": {
+                    str(page): {stage: round(seconds, 6) for stage, seconds in stages.items()}
+                    for page, stages in sorted(self.pages.items())
+                },
+            }
+
+
+_current_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timing_scope() -> Iterator[RequestTimings]:
+    """Collect stage timings for everything awaited inside the block."""
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def span(stage: str, page: int | None = None) -> Iterator[None]:
+    """Time a pipeline stage into ``stage_<stage>_seconds`` and the request's timings."""
+    timings = _current_timings.get()
+    if timings is None and not metrics.enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe(f"stage_{stage}_seconds", elapsed)
+        if timings is not None:
+            timings.add(stage, elapsed, page)
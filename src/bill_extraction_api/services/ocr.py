@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import zlib
 from dataclasses import dataclass
-from typing import List, Protocol
+from typing import Iterator, List, Protocol, Sequence, overload
 
 import numpy as np
 from PIL import Image
@@ -16,8 +19,158 @@ class OCRLine:
     confidence: float
 
 
+class OCRPage(Sequence[OCRLine]):
+    """OCR output for one page, stored column-wise.
+
+    Texts are a list, boxes an ``(N, 4, 2)`` float32 array of corner points
+    and confidences an ``(N,)`` float32 array, so a dense page is three
+    objects rather than thousands. Indexing returns an :class:`OCRLine` built
+    on access, so code written against lists of lines keeps working; hot
+    paths read ``texts``, ``boxes`` and ``confidences`` directly. ``height``
+    is the height of the page the boxes were measured on, when known.
+    """
+
+    __slots__ = ("texts", "boxes", "confidences", "height")
+
+    def __init__(
+        self,
+        texts: List[str],
+        boxes: np.ndarray,
+        confidences: np.ndarray,
+        height: float | None = None,
+    ) -> None:
+        self.texts = texts
+        self.height = height
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(len(texts), 4, 2)
+        self.confidences = np.asarray(confidences, dtype=np.float32).reshape(len(texts))
+
+    @classmethod
+    def empty(cls, height: float | None = None) -> "OCRPage":
+        return cls(
+            [], np.empty((0, 4, 2), dtype=np.float32), np.empty(0, dtype=np.float32), height=height
+        )
+
+    @classmethod
+    def from_lines(cls, lines: Sequence[OCRLine], height: float | None = None) -> "OCRPage":
+        if isinstance(lines, OCRPage):
+            return lines
+        if not lines:
+            return cls.empty(height)
+        return cls(
+            [line.text for line in lines],
+            np.array([line.bbox for line in lines], dtype=np.float32),
+            np.fromiter((line.confidence for line in lines), dtype=np.float32, count=len(lines)),
+            height=height,
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @overload
+    def __getitem__(self, index: int) -> OCRLine: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "OCRPage": ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return OCRPage(
+                self.texts[index], self.boxes[index], self.confidences[index], height=self.height
+            )
+        return OCRLine(
+            text=self.texts[index],
+            bbox=self.boxes[index].tolist(),
+            confidence=float(self.confidences[index]),
+        )
+
+    def __iter__(self) -> Iterator[OCRLine]:
+        for index in range(len(self.texts)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f"OCRPage({len(self.texts)} lines)"
+
+    def __reduce__(self):
+        # Arrays pickle as raw buffers (out-of-band with protocol 5).
+        return OCRPage, (self.texts, self.boxes, self.confidences, self.height)
+
+    def select(self, indices: Sequence[int] | np.ndarray) -> "OCRPage":
+        """Lines at ``indices`` (or where a boolean mask is true), in that order."""
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        texts = self.texts
+        return OCRPage(
+            [texts[i] for i in indices.tolist()],
+            self.boxes[indices],
+            self.confidences[indices],
+            height=self.height,
+        )
+
+
+def line_texts(lines: Sequence[OCRLine]) -> List[str]:
+    """Texts of ``lines`` without building line views for an :class:`OCRPage`."""
+    if isinstance(lines, OCRPage):
+        return lines.texts
+    return [line.text for line in lines]
+
+
+def reading_order(lines: Sequence[OCRLine]) -> np.ndarray:
+    """Indices of ``lines`` sorted top to bottom by the mean y of their bbox points.
+
+    The y coordinates are summed point by point, in order, so ties resolve
+    exactly as a per-line ``sum(...) / len(...)`` would.
+    """
+    if isinstance(lines, OCRPage):
+        ys = lines.boxes[:, :, 1].astype(np.float64)
+    else:
+        sizes = set(map(len, [line.bbox for line in lines]))
+        if len(sizes) != 1 or 0 in sizes:
+            # Boxes with differing point counts; fall back to one line at a time.
+            centroids = np.fromiter(
+                (sum(pt[1] for pt in line.bbox) / len(line.bbox) for line in lines),
+                dtype=np.float64,
+                count=len(lines),
+            )
+            return np.argsort(centroids, kind="stable")
+        (points,) = sizes
+        ys = np.fromiter(
+            (pt[1] for line in lines for pt in line.bbox), dtype=np.float64, count=len(lines) * points
+        ).reshape(len(lines), points)
+    centroids = ys[:, 0].copy()
+    for point in range(1, ys.shape[1]):
+        centroids += ys[:, point]
+    centroids /= ys.shape[1]
+    return np.argsort(centroids, kind="stable")
+
+
+def encode_lines(lines: Sequence[OCRLine]) -> bytes:
+    """Compact serialisation of OCR output for caching (coordinates to 0.1 px)."""
+    page = OCRPage.from_lines(lines)
+    coordinates = page.boxes.reshape(len(page), 8).astype(np.float64).round(1).tolist()
+    confidences = page.confidences.astype(np.float64).round(4).tolist()
+    rows = [list(row) for row in zip(page.texts, coordinates, confidences)]
+    return zlib.compress(json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode())
+
+
+def decode_lines(data: bytes) -> OCRPage:
+    rows = json.loads(zlib.decompress(data))
+    if not rows:
+        return OCRPage.empty()
+    texts, coordinates, confidences = zip(*rows)
+    return OCRPage(list(texts), np.array(coordinates, dtype=np.float32), np.array(confidences))
+
+
+def page_digest(image: Image.Image) -> str:
+    """Content hash of a preprocessed page, used to reuse OCR for identical pages."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{image.mode}:{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
 class OCREngine(Protocol):
-    def extract(self, image: Image.Image) -> List[OCRLine]:
+    def extract(self, image: Image.Image) -> OCRPage:
         ...
 
 
@@ -32,24 +185,25 @@ class RapidOCREngine:
 
         self._ocr = RapidOCR()
 
-    def extract(self, image: Image.Image) -> List[OCRLine]:
+    def extract(self, image: Image.Image) -> OCRPage:
         np_img = np.array(image.convert("RGB"))
         result, _ = self._ocr(np_img)
-        lines: List[OCRLine] = []
         if not result:
-            return lines
-        for box, text, score in result:
-            if not text:
-                continue
-            lines.append(OCRLine(text=text.strip(), bbox=box, confidence=float(score)))
-        return lines
+            return OCRPage.empty(image.height)
+        kept = [(box, text.strip(), score) for box, text, score in result if text]
+        if not kept:
+            return OCRPage.empty(image.height)
+        boxes, texts, scores = zip(*kept)
+        return OCRPage(
+            list(texts), np.array(boxes, dtype=np.float32), np.array(scores), height=image.height
+        )
 
 
 class DummyOCREngine:
     """Fallback that returns an empty result set."""
 
-    def extract(self, image: Image.Image) -> List[OCRLine]:  # pragma: no cover - trivial
-        return []
+    def extract(self, image: Image.Image) -> OCRPage:  # pragma: no cover - trivial
+        return OCRPage.empty(image.height)
 
 
 def resolve_engine(settings: AppSettings) -> OCREngine:
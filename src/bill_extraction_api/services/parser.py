@@ -3,72 +3,76 @@ from __future__ import annotations
 import re
 from typing import List, Sequence
 
+from pydantic import TypeAdapter
+
 from bill_extraction_api.app.schemas import BillItem
-from bill_extraction_api.services.ocr import OCRLine
+from bill_extraction_api.services.ocr import OCRLine, line_texts, reading_order
 
 _AMOUNT_RE = re.compile(r"(?<!\d)(\d{1,3}(?:,\d{3})*(?:\.\d+)?|\d+\.\d+)(?!\d)")
 _SECTION_HINTS = {"charges", "services", "fee", "room", "surgery", "pharmacy", "summary"}
+_BILL_ITEMS = TypeAdapter(List[BillItem])
 
 
-def _to_float(token: str) -> float:
-    token = token.replace(",", "")
-    try:
-        return float(token)
-    except ValueError:
-        return 0.0
+def has_amount(text: str) -> bool:
+    """Whether ``text`` contains a number the parser would read as an amount."""
+    return _AMOUNT_RE.search(text) is not None
 
 
 def _looks_like_section(text: str) -> bool:
+    """Section headings name a hint word; callers only ask for lines without amounts."""
     lower = text.lower()
-    return any(hint in lower for hint in _SECTION_HINTS) and not _AMOUNT_RE.search(text)
-
-
-def _strip_numbers(text: str, matches: Sequence[re.Match[str]]) -> str:
-    cleaned = text
-    for match in reversed(matches):
-        cleaned = cleaned[: match.start()] + cleaned[match.end() :]
-    return " ".join(cleaned.split()).strip("-|: ")
+    return any(hint in lower for hint in _SECTION_HINTS)
 
 
 class LineItemParser:
-    """Best-effort parser that converts OCR lines into structured rows."""
+    """Best-effort parser that converts OCR lines into structured rows.
+
+    Lines are ordered by their bbox centroids in one NumPy pass (read straight
+    from the box array of an :class:`OCRPage`), each line is scanned by the
+    amount pattern once, and the rows are validated as one batch.
+    """
 
     def parse(self, lines: Sequence[OCRLine]) -> List[BillItem]:
-        sorted_lines = sorted(lines, key=lambda line: sum(pt[1] for pt in line.bbox) / len(line.bbox))
+        if not lines:
+            return []
+        texts = line_texts(lines)
         section_prefix = ""
-        items: List[BillItem] = []
-        for line in sorted_lines:
-            text = line.text.strip()
+        rows: List[dict] = []
+        for index in reading_order(lines).tolist():
+            text = texts[index].strip()
             if not text:
                 continue
 
-            matches = list(_AMOUNT_RE.finditer(text))
-            if not matches:
+            # One regex pass: even parts are the description, odd parts the amounts.
+            parts = _AMOUNT_RE.split(text)
+            if len(parts) == 1:
                 if _looks_like_section(text):
-                    section_prefix = text.strip()
+                    section_prefix = text
                 continue
 
-            amount = _to_float(matches[-1].group())
-            rate = _to_float(matches[-2].group()) if len(matches) >= 2 else None
-            quantity = _to_float(matches[-3].group()) if len(matches) >= 3 else None
+            # Matched amounts are digits, separators and a decimal point only.
+            amount = float(parts[-2].replace(",", ""))
+            rate = float(parts[-4].replace(",", "")) if len(parts) >= 5 else None
+            quantity = float(parts[-6].replace(",", "")) if len(parts) >= 7 else None
 
             if quantity is not None and quantity == 0:
                 quantity = None
             if rate is not None and rate == 0:
                 rate = None
 
-            descriptor = _strip_numbers(text, matches).strip()
+            descriptor = " ".join("".join(parts[::2]).split()).strip("-|: ")
             if not descriptor:
                 descriptor = "Line Item"
             if section_prefix:
                 descriptor = f"{section_prefix} | {descriptor}"
 
-            items.append(
-                BillItem(
-                    item_name=descriptor,
-                    item_amount=round(amount, 2),
-                    item_rate=round(rate, 2) if rate is not None else None,
-                    item_quantity=round(quantity, 2) if quantity is not None else None,
-                )
+            rows.append(
+                {
+                    "item_name": descriptor,
+                    "item_amount": round(amount, 2),
+                    "item_rate": round(rate, 2) if rate is not None else None,
+                    "item_quantity": round(quantity, 2) if quantity is not None else None,
+                }
             )
-        return items
+        # Rows are validated as one batch rather than a model call per row.
+        return _BILL_ITEMS.validate_python(rows)
@@ -1,31 +1,289 @@
 from __future__ import annotations
 
+import importlib.util
+import math
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Literal, Protocol, Sequence, Tuple
 
+import cv2
 import numpy as np
-from pdf2image import convert_from_path
+from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_bytes, pdfinfo_from_path
 from PIL import Image, ImageFilter
+from pypdf import PdfReader
 from skimage import exposure
 
+from bill_extraction_api.services.document_fetcher import Document
+from bill_extraction_api.services.metrics import span
+
+
+@dataclass(frozen=True)
+class ResolutionPolicy:
+    """Chooses how many pixels each page gets before OCR.
+
+    OCR cost grows with pixel count while RapidOCR's detector resizes large
+    inputs anyway, so pages are rendered just large enough for the smallest
+    expected text to stay legible.
+    """
+
+    target_long_edge_px: int = 2000
+    min_text_height_px: int = 16
+    assumed_text_height_pt: float = 7.0
+    max_pixels: int = 12_000_000
+    min_dpi: int = 120
+    max_dpi: int = 300
+
+    def pdf_dpi(self, width_pt: float, height_pt: float) -> int:
+        long_edge_in = max(width_pt, height_pt) / 72.0
+        dpi = max(
+            self.target_long_edge_px / long_edge_in,
+            self.min_text_height_px * 72.0 / self.assumed_text_height_pt,
+        )
+        dpi = min(max(dpi, self.min_dpi), self.max_dpi)
+        area_in = (width_pt / 72.0) * (height_pt / 72.0)
+        dpi = min(dpi, math.sqrt(self.max_pixels / area_in))
+        return max(1, int(dpi))
+
+    def image_scale(self, width: int, height: int, text_height_px: float | None) -> float:
+        """Downscale factor (never above 1.0) for a raster upload."""
+        scale = self.target_long_edge_px / max(width, height)
+        if text_height_px:
+            scale = max(scale, self.min_text_height_px / text_height_px)
+        scale = min(scale, 1.0, math.sqrt(self.max_pixels / (width * height)))
+        return scale
+
+
+def estimate_text_height(gray: np.ndarray) -> float | None:
+    """Median height in pixels of inked text rows, from a horizontal projection."""
+    ink_rows = (gray < 128).mean(axis=1) > 0.005
+    if not ink_rows.any():
+        return None
+    padded = np.concatenate(([False], ink_rows, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    runs = edges[1::2] - edges[::2]
+    runs = runs[runs >= 3]
+    if runs.size == 0:
+        return None
+    return float(np.median(runs))
+
+
+class PdfRasterizer(Protocol):
+    name: str
+
+    def render(self, document: Document, first_page: int, last_page: int, dpi: int) -> List[Image.Image]:
+        ...
+
+
+class Pdf2ImageRasterizer:
+    """Renders through poppler's ``pdftoppm`` subprocess."""
+
+    name = "pdf2image"
+
+    def render(self, document: Document, first_page: int, last_page: int, dpi: int) -> List[Image.Image]:
+        if document.data is not None:
+            return convert_from_bytes(
+                document.data, dpi=dpi, first_page=first_page, last_page=last_page
+            )
+        return convert_from_path(
+            document.path.as_posix(), dpi=dpi, first_page=first_page, last_page=last_page
+        )
+
+
+# PDFium is not thread-safe; parallel rendering needs separate processes.
+_PDFIUM_LOCK = threading.Lock()
+
+
+class PdfiumRasterizer:
+    """Renders in-process with PDFium straight into grayscale bitmaps."""
+
+    name = "pdfium"
+
+    def __init__(self) -> None:
+        # Checked up front but imported per call so the rasterizer stays picklable
+        # for process workers.
+        if importlib.util.find_spec("pypdfium2") is None:
+            raise RuntimeError("pypdfium2 is required for the pdfium renderer")
+
+    def render(self, document: Document, first_page: int, last_page: int, dpi: int) -> List[Image.Image]:
+        import pypdfium2  # type: ignore
+
+        source = document.data if document.data is not None else document.path.as_posix()
+        images: List[Image.Image] = []
+        with _PDFIUM_LOCK:
+            pdf = pypdfium2.PdfDocument(source)
+            try:
+                for index in range(first_page - 1, min(last_page, len(pdf))):
+                    page = pdf[index]
+                    try:
+                        bitmap = page.render(scale=dpi / 72.0, grayscale=True)
+                        images.append(Image.fromarray(bitmap.to_numpy()))
+                        bitmap.close()
+                    finally:
+                        page.close()
+            finally:
+                pdf.close()
+        return images
+
+
+def resolve_rasterizer(name: Literal["auto", "pdfium", "pdf2image"] = "auto") -> PdfRasterizer:
+    if name == "pdfium" or (name == "auto" and importlib.util.find_spec("pypdfium2")):
+        return PdfiumRasterizer()
+    return Pdf2ImageRasterizer()
+
 
 class DocumentPreprocessor:
-    """Turns PDFs/images into a normalised list of PIL images."""
+    """Turns PDFs/images into a normalised list of PIL images.
 
-    def __init__(self, dpi: int = 300) -> None:
+    PDFs are rendered ``window_pages`` pages at a time so peak memory does not
+    grow with the page count; ``to_images`` is kept for callers that want a list.
+    With a ``policy`` pages are sized adaptively and ``dpi`` is only used for
+    full-resolution re-renders.
+    """
+
+    def __init__(
+        self,
+        dpi: int = 300,
+        window_pages: int = 1,
+        policy: ResolutionPolicy | None = None,
+        enhancement: Literal["skimage", "opencv", "none"] = "skimage",
+        skip_clean_pages: bool = False,
+        rasterizer: PdfRasterizer | None = None,
+    ) -> None:
         self._dpi = dpi
+        self._rasterizer = rasterizer or Pdf2ImageRasterizer()
+        self._window_pages = max(1, window_pages)
+        self._policy = policy
+        self._enhancement = enhancement
+        self._skip_clean_pages = skip_clean_pages
+
+    @property
+    def window_pages(self) -> int:
+        return self._window_pages
+
+    def page_count(self, document: Document | Path) -> int:
+        document = _as_document(document)
+        if not document.is_pdf:
+            return 1
+        try:
+            with document.open() as stream:
+                return len(PdfReader(stream).pages)
+        except Exception:
+            # pypdf can choke on damaged files that poppler still renders.
+            if document.data is not None:
+                return int(pdfinfo_from_bytes(document.data)["Pages"])
+            return int(pdfinfo_from_path(document.path.as_posix())["Pages"])
 
-    def to_images(self, document_path: Path) -> List[Image.Image]:
-        suffix = document_path.suffix.lower()
-        if suffix == ".pdf":
-            images = convert_from_path(document_path.as_posix(), dpi=self._dpi)
+    def page_sizes(self, document: Document | Path) -> List[Tuple[float, float]] | None:
+        """Every page's mediabox ``(width, height)`` in points, read in one pass.
+
+        Only adaptive resolution needs them, so this is ``None`` without a
+        policy, for images and for PDFs pypdf cannot read.
+        """
+        document = _as_document(document)
+        if self._policy is None or not document.is_pdf:
+            return None
+        try:
+            with document.open() as stream:
+                return [
+                    (float(page.mediabox.width), float(page.mediabox.height))
+                    for page in PdfReader(stream).pages
+                ]
+        except Exception:
+            return None
+
+    def render_pages(
+        self,
+        document: Document | Path,
+        first_page: int,
+        last_page: int,
+        full_resolution: bool = False,
+        window_sizes: Sequence[Tuple[float, float]] | None = None,
+    ) -> List[Image.Image]:
+        """Render and enhance pages ``first_page``..``last_page`` (1-based, inclusive).
+
+        ``window_sizes`` are those pages' sizes from :meth:`page_sizes`; they
+        are read from the document when not given. Each image records
+        ``render_pixels`` and ``full_pixels`` (what a full-resolution render
+        would have produced) in ``Image.info``.
+        """
+        document = _as_document(document)
+        if document.is_pdf:
+            dpi = self._dpi
+            if self._policy is not None and not full_resolution:
+                if window_sizes is None:
+                    window_sizes = self._window_sizes(document, first_page, last_page)
+                dpi = self._window_dpi(window_sizes)
+            with span("rasterize"):
+                images = self._rasterizer.render(document, first_page, last_page, dpi)
+            scale_to_full = (self._dpi / dpi) ** 2
+            full_pixels = [img.width * img.height * scale_to_full for img in images]
         else:
-            images = [Image.open(document_path).convert("RGB")]
-        return [self._enhance(img) for img in images]
+            with document.open() as stream:
+                image = Image.open(stream).convert("RGB")
+            full_pixels = [image.width * image.height]
+            if self._policy is not None and not full_resolution:
+                image = self._downscale(image)
+            images = [image]
+
+        enhanced: List[Image.Image] = []
+        for page_no, (img, full) in enumerate(zip(images, full_pixels), start=first_page):
+            with span("enhance", page=page_no):
+                out = self._enhance(img)
+            out.info["render_pixels"] = out.width * out.height
+            out.info["full_pixels"] = int(full)
+            enhanced.append(out)
+        return enhanced
+
+    def iter_images(self, document: Document | Path) -> Iterator[Image.Image]:
+        document = _as_document(document)
+        total = self.page_count(document)
+        sizes = self.page_sizes(document)
+        for first in range(1, total + 1, self._window_pages):
+            last = min(first + self._window_pages - 1, total)
+            window_sizes = sizes[first - 1 : last] if sizes is not None else None
+            yield from self.render_pages(document, first, last, False, window_sizes)
+
+    def to_images(self, document: Document | Path) -> List[Image.Image]:
+        return list(self.iter_images(document))
+
+    @staticmethod
+    def _window_sizes(
+        document: Document, first_page: int, last_page: int
+    ) -> List[Tuple[float, float]]:
+        try:
+            with document.open() as stream:
+                pages = PdfReader(stream).pages[first_page - 1 : last_page]
+                return [(float(p.mediabox.width), float(p.mediabox.height)) for p in pages]
+        except Exception:
+            return []
+
+    def _window_dpi(self, sizes: Sequence[Tuple[float, float]]) -> int:
+        if not sizes:
+            return self._dpi
+        # One render call covers the whole window, so use the largest demand.
+        return max(self._policy.pdf_dpi(w, h) for w, h in sizes)
+
+    def _downscale(self, image: Image.Image) -> Image.Image:
+        text_height = estimate_text_height(np.asarray(image.convert("L")))
+        scale = self._policy.image_scale(image.width, image.height, text_height)
+        if scale >= 0.95:
+            return image
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        return image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
 
     def _enhance(self, image: Image.Image) -> Image.Image:
-        # Convert to grayscale for denoising
         gray = image.convert("L")
+        if self._enhancement == "none":
+            return gray
+        if self._skip_clean_pages and _is_clean(np.asarray(gray)):
+            return gray
+        if self._enhancement == "opencv":
+            return self._enhance_opencv(gray)
+        return self._enhance_skimage(gray)
+
+    @staticmethod
+    def _enhance_skimage(gray: Image.Image) -> Image.Image:
         arr = np.asarray(gray).astype("float32")
         # Normalize to 0-1 range for equalize_adapthist
         arr = arr / 255.0
@@ -35,3 +293,28 @@ class DocumentPreprocessor:
         enhanced = Image.fromarray(arr)
         enhanced = enhanced.filter(ImageFilter.MedianFilter(size=3))
         return enhanced
+
+    @staticmethod
+    def _enhance_opencv(gray: Image.Image) -> Image.Image:
+        # Same CLAHE as the skimage path but entirely in uint8. skimage's
+        # clip_limit is a fraction of the tile area; OpenCV's is a multiple of
+        # the mean bin height, hence the factor of 256 bins.
+        arr = np.asarray(gray)
+        clahe = cv2.createCLAHE(clipLimit=0.03 * 256, tileGridSize=(8, 8))
+        arr = clahe.apply(arr)
+        arr = cv2.medianBlur(arr, 3)
+        return Image.fromarray(arr)
+
+
+def _as_document(document: Document | Path) -> Document:
+    return document if isinstance(document, Document) else Document.from_path(document)
+
+
+def _is_clean(gray: np.ndarray) -> bool:
+    """Cheap check for born-digital pages: dark ink on paper with almost no midtones."""
+    sample = gray[::4, ::4]
+    if sample.size == 0:
+        return False
+    has_ink = np.count_nonzero(sample < 96) > 0
+    midtones = np.count_nonzero((sample > 64) & (sample < 192)) / sample.size
+    return has_ink and midtones < 0.02
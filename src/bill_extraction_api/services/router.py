@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Deque, Dict, List, Literal, Sequence
+
+from loguru import logger
+
+from bill_extraction_api.app.schemas import BillItem
+from bill_extraction_api.services.metrics import metrics
+from bill_extraction_api.services.ocr import OCRLine, OCRPage, line_texts
+
+# Relative weight of each signal; signals that do not apply to a page are
+# left out and the remaining weights renormalised.
+_WEIGHTS = {
+    "reconciled": 0.35,
+    "ocr_confidence": 0.25,
+    "named_items": 0.2,
+    "totals_match": 0.2,
+}
+
+
+@dataclass
+class RouteDecision:
+    page_no: int
+    score: float
+    route: Literal["regex", "llm"]
+    signals: Dict[str, float | None] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _amounts_match(expected: float, actual: float) -> bool:
+    return abs(expected - actual) <= max(0.01 * abs(actual), 0.5)
+
+
+def _description(item: BillItem) -> str:
+    """Item name without the ``<section> | `` prefix the regex parser adds."""
+    return item.item_name.rsplit(" | ", 1)[-1]
+
+
+def _mean_text_confidence(lines: Sequence[OCRLine]) -> float | None:
+    """Mean OCR confidence over lines with visible text."""
+    texts = line_texts(lines)
+    if isinstance(lines, OCRPage):
+        confidences = lines.confidences.tolist()
+    else:
+        confidences = [line.confidence for line in lines]
+    scored = [conf for text, conf in zip(texts, confidences) if text.strip()]
+    return sum(scored) / len(scored) if scored else None
+
+
+def score_page(
+    lines: Sequence[OCRLine], items: Sequence[BillItem], text_layer: bool = False
+) -> tuple[float, Dict[str, float | None]]:
+    """Score how trustworthy a regex parse looks, from 0 (re-parse) to 1 (keep).
+
+    Signals:
+      - ``reconciled``: share of items with quantity and rate where
+        quantity x rate equals the amount.
+      - ``ocr_confidence``: mean OCR confidence of the page; left out for
+        pages read from a PDF text layer (``text_layer``), whose lines carry
+        no recognition confidence.
+      - ``named_items``: share of items with a real description rather than
+        the ``Line Item`` placeholder, ignoring any section prefix.
+      - ``totals_match``: 1 if a total line equals the sum of the items above
+        it, 0 if a total line disagrees.
+    """
+    if not items:
+        # Nothing that looks like an amount, so there is nothing to re-parse.
+        return 1.0, {}
+
+    priced = [item for item in items if item.item_rate and item.item_quantity]
+    reconciled = (
+        sum(_amounts_match(item.item_rate * item.item_quantity, item.item_amount) for item in priced)
+        / len(priced)
+        if priced
+        else None
+    )
+    confidence = None if text_layer else _mean_text_confidence(lines)
+    descriptions = [_description(item) for item in items]
+    named = sum(
+        1
+        for name in descriptions
+        if name != "Line Item" and sum(ch.isalpha() for ch in name) >= 3
+    ) / len(items)
+
+    totals_match = None
+    running = 0.0
+    for item, name in zip(items, descriptions):
+        if "total" in name.lower():
+            totals_match = 1.0 if _amounts_match(running, item.item_amount) else 0.0
+            running = 0.0
+        else:
+            running += item.item_amount
+
+    signals: Dict[str, float | None] = {
+        "reconciled": reconciled,
+        "ocr_confidence": confidence,
+        "named_items": named,
+        "totals_match": totals_match,
+    }
+    weighted = [(_WEIGHTS[name], value) for name, value in signals.items() if value is not None]
+    total_weight = sum(weight for weight, _ in weighted)
+    score = sum(weight * value for weight, value in weighted) / total_weight
+    return round(score, 4), signals
+
+
+class HybridRouter:
+    """Sends pages whose regex parse scores below ``threshold`` to the LLM.
+
+    Every decision is counted in the metrics registry and the most recent
+    ``history`` decisions are kept for inspection when tuning the threshold.
+    """
+
+    def __init__(self, threshold: float, history: int = 200) -> None:
+        self._threshold = threshold
+        self._recent: Deque[RouteDecision] = deque(maxlen=max(1, history))
+        self._lock = threading.Lock()
+
+    def decide(
+        self,
+        page_no: int,
+        lines: Sequence[OCRLine],
+        items: Sequence[BillItem],
+        text_layer: bool = False,
+    ) -> RouteDecision:
+        score, signals = score_page(lines, items, text_layer=text_layer)
+        route: Literal["regex", "llm"] = "llm" if score < self._threshold else "regex"
+        decision = RouteDecision(page_no=page_no, score=score, route=route, signals=signals)
+
+        metrics.inc(f"hybrid_routed_{route}_total")
+        metrics.observe(f"hybrid_route_score_{route}_ratio", score)
+        logger.info(
+            f"Page {page_no} routed to {route} (score {score:.2f}, threshold {self._threshold:.2f})"
+        )
+        with self._lock:
+            self._recent.append(decision)
+        return decision
+
+    def recent(self) -> List[RouteDecision]:
+        with self._lock:
+            return list(self._recent)
@@ -1,25 +1,123 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import time
+from collections import deque
 from contextlib import suppress
-from typing import List
+from dataclasses import dataclass
+from functools import partial
+from typing import AsyncIterator, Callable, Collection, Deque, Dict, Iterator, List, Sequence
 
+import numpy as np
 from loguru import logger
+from PIL import Image
+from pydantic import BaseModel
 
-from bill_extraction_api.app.schemas import ExtractionData, PageLineItems
-from bill_extraction_api.services.document_fetcher import DocumentFetcher
-from bill_extraction_api.services.llm_parser import LLMParser
-from bill_extraction_api.services.ocr import resolve_engine
+from bill_extraction_api.app.schemas import BillItem, ExtractionData, PageLineItems
+from bill_extraction_api.services.cache import (
+    CacheBackend,
+    MemoryCache,
+    SQLiteCache,
+    TieredCache,
+    build_cache,
+    cache_get,
+    cache_set,
+)
+from bill_extraction_api.services.document_fetcher import Document, DocumentFetcher
+from bill_extraction_api.services.engine_pool import OCREnginePool
+from bill_extraction_api.services.executor import WorkerPool, ocr_in_worker
+from bill_extraction_api.services.layout import BoilerplateFilter
+from bill_extraction_api.services.llm_parser import LLMParser, PageBatcher, current_usage
+from bill_extraction_api.services.ocr import (
+    OCRLine,
+    OCRPage,
+    decode_lines,
+    encode_lines,
+    line_texts,
+    page_digest,
+)
 from bill_extraction_api.services.parser import LineItemParser
-from bill_extraction_api.services.preprocess import DocumentPreprocessor
+from bill_extraction_api.services.metrics import metrics, span
+from bill_extraction_api.services.preprocess import (
+    DocumentPreprocessor,
+    ResolutionPolicy,
+    resolve_rasterizer,
+)
+from bill_extraction_api.services.router import HybridRouter, RouteDecision
+from bill_extraction_api.services.text_layer import PdfTextLayer
 from bill_extraction_api.settings import AppSettings
 
+PageCallback = Callable[[int, int, "PageLineItems | None"], None]
+
+
+class _CachedResult(BaseModel):
+    """Result cache entry; the page count lets a hit report every page."""
+
+    total_pages: int
+    data: ExtractionData
+
+
+@dataclass
+class _PageParsing:
+    """Per-document parsing state shared by that document's page tasks."""
+
+    limiter: asyncio.Semaphore
+    batcher: PageBatcher | None = None
+    boilerplate: BoilerplateFilter | None = None
+    text_layer_pages: Collection[int] = ()
+    # Set when a page fell back to a worse parse; such results are not cached.
+    degraded: bool = False
+
 
 class ExtractionService:
+    """Long-lived extraction pipeline shared by all requests.
+
+    Heavy resources (OCR engines, LLM clients) are created once; per-request
+    state such as token usage is kept in the request's context instead.
+    """
+
     def __init__(self, settings: AppSettings) -> None:
         self._settings = settings
+        metrics.enabled = settings.metrics_enabled
         self._fetcher = DocumentFetcher(settings)
-        self._preprocessor = DocumentPreprocessor()
-        self._ocr = resolve_engine(settings)
+        policy = None
+        if settings.adaptive_resolution:
+            policy = ResolutionPolicy(
+                target_long_edge_px=settings.target_long_edge_px,
+                min_text_height_px=settings.min_text_height_px,
+                max_pixels=settings.max_page_pixels,
+                max_dpi=settings.render_dpi,
+            )
+        self._preprocessor = DocumentPreprocessor(
+            dpi=settings.render_dpi,
+            window_pages=settings.render_window_pages,
+            policy=policy,
+            enhancement=settings.enhancement_backend,
+            skip_clean_pages=settings.skip_clean_pages,
+            rasterizer=resolve_rasterizer(settings.pdf_renderer),
+        )
+        self._text_layer = (
+            PdfTextLayer(
+                min_chars=settings.text_layer_min_chars,
+                max_image_coverage=settings.text_layer_max_image_coverage,
+            )
+            if settings.use_pdf_text_layer
+            else None
+        )
+        self._workers = WorkerPool(settings)
+        self._result_cache = build_cache(
+            settings.result_cache_backend,
+            max_entries=settings.result_cache_max_entries,
+            ttl_seconds=settings.result_cache_ttl_seconds,
+            max_bytes=settings.result_cache_max_mb * 1024 * 1024,
+            path=settings.result_cache_path,
+        )
+        self._settings_fingerprint = _settings_fingerprint(settings)
+        self._page_cache = _build_page_cache(settings)
+        # Process workers own their engines, so only keep a local pool otherwise.
+        self._ocr_pool = OCREnginePool(settings) if self._workers.mode != "process" else None
         
         # Initialize parser based on backend setting
         if settings.parser_backend in ("llm", "hybrid"):
@@ -32,63 +130,452 @@ class ExtractionService:
         else:
             self._regex_parser = None
 
-    async def extract(self, document_url: str) -> ExtractionData:
-        temp_path = await self._fetcher.fetch(document_url)
+        if settings.parser_backend == "hybrid":
+            self._router = HybridRouter(settings.hybrid_llm_threshold)
+        else:
+            self._router = None
+        self._register_gauges()
+
+    def _register_gauges(self) -> None:
+        metrics.gauge("worker_pending_documents", lambda: self._workers.pending)
+        if self._ocr_pool is not None:
+            metrics.gauge("ocr_engines_available", self._ocr_pool.available)
+        if self._llm_parser is not None:
+            limiter = self._llm_parser.limiter
+            metrics.gauge("llm_limiter_limit", lambda: limiter.limit)
+            metrics.gauge("llm_limiter_in_flight", lambda: limiter.in_flight)
+
+    async def extract(
+        self, document_url: str, on_page: PageCallback | None = None
+    ) -> ExtractionData:
+        """Extract line items from the document at ``document_url``.
+
+        ``on_page(page_no, total_pages, page)`` is called as each page finishes;
+        ``page`` is ``None`` for pages without line items. When the result
+        comes from the cache it is called for every page before returning.
+        """
+        with self._workers.admission():
+            return await self._extract(document_url, on_page)
+
+    async def _extract(self, document_url: str, on_page: PageCallback | None) -> ExtractionData:
+        with span("fetch"):
+            document = await self._fetcher.fetch(document_url)
         try:
-            images = self._preprocessor.to_images(temp_path)
-            pages: List[PageLineItems] = []
-            
-            # Reset token usage at start of extraction
-            if self._llm_parser:
-                self._llm_parser.reset_token_usage()
-            
-            for idx, image in enumerate(images, start=1):
-                lines = self._ocr.extract(image)
-                
-                # Use appropriate parser based on backend
-                if self._settings.parser_backend == "llm":
-                    bill_items, page_type = await self._llm_parser.parse(lines, page_number=idx)
-                elif self._settings.parser_backend == "regex":
-                    bill_items = self._regex_parser.parse(lines)
-                    page_type = self._infer_page_type(lines)
-                elif self._settings.parser_backend == "hybrid":
-                    # Try LLM first, fallback to regex on error
-                    try:
-                        bill_items, page_type = await self._llm_parser.parse(lines, page_number=idx)
-                    except Exception as e:
-                        logger.warning(f"LLM parsing failed for page {idx}, falling back to regex: {e}")
-                        bill_items = self._regex_parser.parse(lines)
-                        page_type = self._infer_page_type(lines)
-                else:
-                    raise ValueError(f"Unknown parser_backend: {self._settings.parser_backend}")
-                
-                if not bill_items:
-                    continue
-                    
-                pages.append(
-                    PageLineItems(
-                        page_no=str(idx),
-                        page_type=page_type,
-                        bill_items=bill_items,
+            cache_key = None
+            if self._result_cache is not None:
+                # hashlib releases the GIL, and a thread avoids pickling the
+                # document into a worker process just to hash it.
+                with span("digest"):
+                    digest = await asyncio.to_thread(_file_digest, document)
+                cache_key = f"{digest}:{self._settings_fingerprint}"
+                cached = await cache_get(self._result_cache, cache_key)
+                if cached is not None:
+                    metrics.inc("result_cache_hits_total")
+                    entry = _CachedResult.model_validate_json(cached)
+                    if on_page is not None:
+                        pages = {int(page.page_no): page for page in entry.data.pagewise_line_items}
+                        for page_no in range(1, entry.total_pages + 1):
+                            on_page(page_no, entry.total_pages, pages.get(page_no))
+                    return entry.data
+                metrics.inc("result_cache_misses_total")
+
+            # Bind the request's usage tracker before page tasks copy the context.
+            current_usage()
+            # Rendered pages waiting for OCR hold full-resolution bitmaps, so
+            # rendering only runs ahead of OCR by a bounded number of pages.
+            # Concurrent renders hold their slots until yielded, so the budget
+            # must cover every window being rendered at once.
+            render_slots = self._preprocessor.window_pages * max(1, self._settings.render_concurrency)
+            in_flight = asyncio.Semaphore(max(self._settings.max_pages_in_flight, render_slots))
+            with span("page_count"):
+                total_pages = await self._workers.run(self._preprocessor.page_count, document)
+                # Read once: looking sizes up per window walks the page tree each time.
+                page_sizes = await self._workers.run(self._preprocessor.page_sizes, document)
+            metrics.observe("document_pages", total_pages)
+            text_pages = await self._read_text_layer(document)
+            parsing = self._page_parsing(total_pages)
+            parsing.text_layer_pages = frozenset(text_pages)
+            tasks: dict[int, asyncio.Task[PageLineItems | None]] = {}
+
+            def track(idx: int, task: asyncio.Task[PageLineItems | None]) -> None:
+                tasks[idx] = task
+                if on_page is not None:
+                    task.add_done_callback(partial(_report_page, on_page, idx, total_pages))
+
+            try:
+                # Born-digital pages skip rendering and OCR entirely.
+                for idx, lines in text_pages.items():
+                    track(
+                        idx,
+                        asyncio.create_task(
+                            self._parse_into_page(idx, lines, parsing)
+                        ),
                     )
-                )
+                async for idx, image in self._render_pages(
+                    document, total_pages, in_flight, text_pages, page_sizes
+                ):
+                    track(
+                        idx,
+                        asyncio.create_task(
+                            self._process_page(document, idx, image, in_flight, parsing)
+                        ),
+                    )
+                if parsing.boilerplate is not None and 1 not in tasks:
+                    # No page 1 to compare against; release pages waiting for it.
+                    parsing.boilerplate.observe(1, [])
+                await asyncio.gather(*tasks.values())
+            except BaseException:
+                for task in tasks.values():
+                    task.cancel()
+                if parsing.batcher is not None:
+                    parsing.batcher.close()
+                raise
+
+            results = [tasks[idx].result() for idx in sorted(tasks)]
+            pages = [page for page in results if page is not None]
             total_items = sum(len(page.bill_items) for page in pages)
-            return ExtractionData(pagewise_line_items=pages, total_item_count=total_items)
+            data = ExtractionData(pagewise_line_items=pages, total_item_count=total_items)
+            if cache_key is not None and not parsing.degraded:
+                entry = _CachedResult(total_pages=total_pages, data=data)
+                await cache_set(self._result_cache, cache_key, entry.model_dump_json().encode())
+            return data
         finally:
             with suppress(Exception):
-                DocumentFetcher.cleanup(temp_path)
+                DocumentFetcher.cleanup(document)
+
+    async def _read_text_layer(self, document: Document) -> Dict[int, OCRPage]:
+        if self._text_layer is None:
+            return {}
+        with span("text_layer"):
+            pages = await self._workers.run(self._text_layer.extract, document)
+        if pages:
+            logger.info(f"Using PDF text layer for {len(pages)} page(s)")
+            metrics.inc("text_layer_pages_total", len(pages))
+        return pages
+
+    async def _render_pages(
+        self,
+        document: Document,
+        total_pages: int,
+        in_flight: asyncio.Semaphore,
+        skip: Collection[int] = (),
+        page_sizes: Sequence[tuple[float, float]] | None = None,
+    ) -> AsyncIterator[tuple[int, Image.Image]]:
+        """Render a window of pages at a time; each page yielded holds an ``in_flight`` slot."""
+        pending = [page_no for page_no in range(1, total_pages + 1) if page_no not in skip]
+        concurrency = max(1, self._settings.render_concurrency)
+        renders: Deque[tuple[int, int, asyncio.Task[List[Image.Image]]]] = deque()
+        try:
+            for first, last in _page_windows(pending, self._preprocessor.window_pages):
+                for _ in range(first, last + 1):
+                    await in_flight.acquire()
+                window_sizes = page_sizes[first - 1 : last] if page_sizes is not None else None
+                task = asyncio.create_task(
+                    self._workers.run(
+                        self._preprocessor.render_pages, document, first, last, False, window_sizes
+                    )
+                )
+                renders.append((first, last, task))
+                if len(renders) >= concurrency:
+                    async for page in self._collect_render(renders.popleft(), in_flight):
+                        yield page
+            while renders:
+                async for page in self._collect_render(renders.popleft(), in_flight):
+                    yield page
+        finally:
+            for first, last, task in renders:
+                task.cancel()
+                for _ in range(first, last + 1):
+                    in_flight.release()
+
+    @staticmethod
+    async def _collect_render(
+        render: tuple[int, int, asyncio.Task[List[Image.Image]]],
+        in_flight: asyncio.Semaphore,
+    ) -> AsyncIterator[tuple[int, Image.Image]]:
+        first, last, task = render
+        try:
+            images = await task
+        except BaseException:
+            for _ in range(first, last + 1):
+                in_flight.release()
+            raise
+        # Return slots for pages the renderer reported but did not produce.
+        for _ in range(last - first + 1 - len(images)):
+            in_flight.release()
+        for page_no, image in enumerate(images, start=first):
+            yield page_no, image
+
+    async def _process_page(
+        self,
+        document: Document,
+        idx: int,
+        image: Image.Image,
+        in_flight: asyncio.Semaphore,
+        parsing: _PageParsing,
+    ) -> PageLineItems | None:
+        """OCR and parse one page; pages run concurrently with each other."""
+        try:
+            lines = await self._ocr_page(document, idx, image)
+        finally:
+            del image
+            in_flight.release()
+        return await self._parse_into_page(idx, lines, parsing)
+
+    def _page_parsing(self, total_pages: int) -> _PageParsing:
+        settings = self._settings
+        concurrency = settings.llm_max_concurrency
+        if settings.llm_provider == "local" and self._llm_parser is not None:
+            # Local servers batch concurrent requests themselves (continuous
+            # batching), so keep more single-page requests in flight.
+            concurrency = settings.llm_local_parallel_requests
+        parsing = _PageParsing(limiter=asyncio.Semaphore(max(1, concurrency)))
+        if self._llm_parser is None:
+            return parsing
+        if settings.llm_batch_token_budget > 0:
+            parsing.batcher = PageBatcher(
+                self._llm_parser,
+                expected_pages=total_pages,
+                token_budget=settings.llm_batch_token_budget,
+                max_pages=settings.llm_batch_max_pages,
+                linger=settings.llm_batch_linger_ms / 1000,
+                limiter=parsing.limiter,
+            )
+        if settings.llm_drop_boilerplate:
+            parsing.boilerplate = BoilerplateFilter()
+        return parsing
+
+    async def _parse_into_page(
+        self, idx: int, lines: Sequence[OCRLine], parsing: _PageParsing
+    ) -> PageLineItems | None:
+        metrics.observe("page_ocr_lines", len(lines))
+        if parsing.boilerplate is not None:
+            # Regex-routed pages still provide page 1's header/footer.
+            parsing.boilerplate.observe(idx, lines)
+        with span("parse", page=idx):
+            if parsing.batcher is not None:
+                # Pages wait in the batcher, which applies the limiter per request.
+                bill_items, page_type = await self._parse_page(idx, lines, parsing)
+            else:
+                async with parsing.limiter:
+                    bill_items, page_type = await self._parse_page(idx, lines, parsing)
+
+        if not bill_items:
+            return None
+        return PageLineItems(
+            page_no=str(idx),
+            page_type=page_type,
+            bill_items=bill_items,
+        )
+
+    async def _parse_page(
+        self, idx: int, lines: Sequence[OCRLine], parsing: _PageParsing
+    ) -> tuple[List[BillItem], str]:
+        # Use appropriate parser based on backend
+        if self._settings.parser_backend == "llm":
+            return await self._parse_with_llm(idx, lines, parsing)
+        if self._settings.parser_backend == "regex":
+            return self._regex_parser.parse(lines), self._infer_page_type(lines)
+        if self._settings.parser_backend == "hybrid":
+            # Regex first; only pages whose parse looks unreliable go to the LLM.
+            items = self._regex_parser.parse(lines)
+            decision = self._router.decide(
+                idx, lines, items, text_layer=idx in parsing.text_layer_pages
+            )
+            if decision.route == "regex":
+                if parsing.batcher is not None:
+                    parsing.batcher.skip()
+                return items, self._infer_page_type(lines)
+            try:
+                return await self._parse_with_llm(idx, lines, parsing)
+            except Exception as e:
+                logger.warning(f"LLM parsing failed for page {idx}, falling back to regex: {e}")
+                metrics.inc("hybrid_llm_fallbacks_total")
+                parsing.degraded = True
+                return items, self._infer_page_type(lines)
+        raise ValueError(f"Unknown parser_backend: {self._settings.parser_backend}")
+
+    async def _parse_with_llm(
+        self, idx: int, lines: Sequence[OCRLine], parsing: _PageParsing
+    ) -> tuple[List[BillItem], str]:
+        if parsing.boilerplate is not None:
+            lines = await parsing.boilerplate.filter(lines, idx)
+        llm_parser = parsing.batcher if parsing.batcher is not None else self._llm_parser
+        return await llm_parser.parse(lines, page_number=idx)
+
+    def routing_decisions(self) -> List[RouteDecision]:
+        """Recent hybrid routing decisions, oldest first."""
+        return self._router.recent() if self._router is not None else []
+
+    async def _ocr_page(self, document: Document, idx: int, image: Image.Image) -> OCRPage:
+        """OCR a page, re-rendering at full resolution if confidence is poor."""
+        started = time.perf_counter()
+        with span("ocr", page=idx):
+            lines = await self._run_ocr(image)
+        elapsed = time.perf_counter() - started
+
+        render_pixels = image.info.get("render_pixels", image.width * image.height)
+        full_pixels = image.info.get("full_pixels", render_pixels)
+        metrics.observe("page_pixels", render_pixels)
+        if full_pixels <= render_pixels:
+            return lines
+
+        confidence = float(lines.confidences.mean(dtype=np.float64)) if len(lines) else 1.0
+        if confidence < self._settings.ocr_retry_confidence:
+            logger.info(
+                f"Page {idx} OCR confidence {confidence:.2f} below threshold, "
+                "retrying at full resolution"
+            )
+            metrics.inc("ocr_resolution_retries_total")
+            retry = await self._workers.run(
+                self._preprocessor.render_pages, document, idx, idx, True
+            )
+            if retry:
+                with span("ocr", page=idx):
+                    return await self._run_ocr(retry[0])
+            return lines
+
+        # OCR time scales roughly linearly with pixels, so estimate what the
+        # full-resolution page would have cost.
+        saved = elapsed * (full_pixels / render_pixels - 1)
+        metrics.inc("ocr_pixels_saved_total", full_pixels - render_pixels)
+        metrics.observe("ocr_seconds_saved_per_page", saved)
+        return lines
+
+    async def _run_ocr(self, image: Image.Image) -> OCRPage:
+        if self._page_cache is None:
+            return await self._run_engine(image)
+
+        # hashlib releases the GIL on large buffers, so hashing overlaps other work.
+        key = f"{self._settings.ocr_backend}:{await asyncio.to_thread(page_digest, image)}"
+        cached = await cache_get(self._page_cache, key)
+        if cached is not None:
+            metrics.inc("page_ocr_cache_hits_total")
+            lines = decode_lines(cached)
+            lines.height = image.height
+            return lines
+        metrics.inc("page_ocr_cache_misses_total")
+        lines = await self._run_engine(image)
+        await cache_set(self._page_cache, key, encode_lines(lines))
+        return lines
+
+    async def _run_engine(self, image: Image.Image) -> OCRPage:
+        if self._ocr_pool is None:
+            lines = await self._workers.run(ocr_in_worker, image)
+        else:
+            async with self._ocr_pool.checkout() as engine:
+                lines = await self._workers.run(engine.extract, image)
+        page = OCRPage.from_lines(lines)
+        # from_lines returns pages as they are, so set the height explicitly.
+        page.height = image.height
+        return page
+
+    def warm_up(self) -> None:
+        """Preload OCR sessions so the first request does not pay for them."""
+        if self._ocr_pool is not None:
+            self._ocr_pool.warm_up()
+        self._workers.warm_up()
+
+    async def aclose(self) -> None:
+        await self._fetcher.aclose()
+        self._workers.shutdown()
 
     def get_token_usage(self) -> dict[str, int]:
-        """Get token usage from LLM parser if available."""
-        if self._llm_parser:
-            return self._llm_parser.get_token_usage()
-        return {"total_tokens": 0, "input_tokens": 0, "output_tokens": 0}
+        """Get token usage for the active request."""
+        return current_usage().to_dict()
 
     @staticmethod
-    def _infer_page_type(lines):
-        joined = " ".join(line.text.lower() for line in lines)
+    def _infer_page_type(lines: Sequence[OCRLine]) -> str:
+        joined = " ".join(line_texts(lines)).lower()
         if "final bill" in joined or "discharge summary" in joined:
             return "Final Bill"
         if "pharmacy" in joined:
             return "Pharmacy"
         return "Bill Detail"
+
+
+# Settings that change what an extraction returns for the same bytes.
+_RESULT_AFFECTING_SETTINGS = (
+    "ocr_backend",
+    "parser_backend",
+    "llm_provider",
+    "llm_model",
+    "llm_base_url",
+    "llm_response_format",
+    "llm_temperature",
+    "llm_max_tokens",
+    "llm_max_output_tokens",
+    "llm_batch_token_budget",
+    "llm_batch_max_pages",
+    "llm_text_format",
+    "llm_min_line_confidence",
+    "llm_drop_boilerplate",
+    "hybrid_llm_threshold",
+    "use_pdf_text_layer",
+    "text_layer_min_chars",
+    "text_layer_max_image_coverage",
+    "render_dpi",
+    "pdf_renderer",
+    "adaptive_resolution",
+    "target_long_edge_px",
+    "min_text_height_px",
+    "max_page_pixels",
+    "ocr_retry_confidence",
+    "enhancement_backend",
+    "skip_clean_pages",
+)
+
+
+# Bump when the result cache entry format changes.
+_RESULT_CACHE_FORMAT = 2
+
+
+def _settings_fingerprint(settings: AppSettings) -> str:
+    relevant = {name: getattr(settings, name) for name in _RESULT_AFFECTING_SETTINGS}
+    relevant["result_cache_format"] = _RESULT_CACHE_FORMAT
+    encoded = json.dumps(relevant, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def _build_page_cache(settings: AppSettings) -> CacheBackend | None:
+    if settings.page_ocr_cache_entries <= 0:
+        return None
+    memory = MemoryCache(
+        max_entries=settings.page_ocr_cache_entries,
+        max_bytes=settings.page_ocr_cache_max_mb * 1024 * 1024,
+    )
+    if not settings.page_ocr_cache_path:
+        return memory
+    disk = SQLiteCache(settings.page_ocr_cache_path, max_entries=settings.page_ocr_cache_disk_entries)
+    return TieredCache(memory, disk)
+
+
+def _file_digest(document: Document) -> str:
+    if document.data is not None:
+        return hashlib.sha256(document.data).hexdigest()
+    digest = hashlib.sha256()
+    with document.open() as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _report_page(
+    on_page: PageCallback, idx: int, total_pages: int, task: asyncio.Task[PageLineItems | None]
+) -> None:
+    if not task.cancelled() and task.exception() is None:
+        on_page(idx, total_pages, task.result())
+
+
+def _page_windows(page_numbers: List[int], window: int) -> Iterator[tuple[int, int]]:
+    """Group ascending page numbers into contiguous ``(first, last)`` runs of at most ``window``."""
+    first = last = None
+    for page_no in page_numbers:
+        if first is not None and page_no == last + 1 and page_no - first < window:
+            last = page_no
+            continue
+        if first is not None:
+            yield first, last
+        first = last = page_no
+    if first is not None:
+        yield first, last
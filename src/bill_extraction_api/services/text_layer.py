@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from loguru import logger
+from pypdf import PageObject, PdfReader
+from pypdf.generic import ContentStream, DictionaryObject
+
+from bill_extraction_api.services.document_fetcher import Document
+from bill_extraction_api.services.ocr import OCRLine, OCRPage
+
+# Average glyph advance as a fraction of the font size; only used to give
+# spans a plausible width since pypdf does not report one.
+_AVG_CHAR_WIDTH = 0.5
+# Form XObjects nested deeper than this are not searched for images.
+_MAX_FORM_DEPTH = 8
+
+Matrix = Sequence[float]
+_IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def _multiply(m: Matrix, n: Matrix) -> tuple:
+    """``m`` then ``n``, in PDF's row-vector convention."""
+    return (
+        m[0] * n[0] + m[1] * n[2],
+        m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2],
+        m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4],
+        m[4] * n[1] + m[5] * n[3] + n[5],
+    )
+
+
+class _PageGeometry:
+    """Maps PDF user space to the displayed page with a top-left origin.
+
+    Accounts for a mediabox that does not start at the origin and for the
+    page's ``/Rotate``, so boxes line up with what the rasterizer renders.
+    """
+
+    def __init__(self, page: PageObject) -> None:
+        box = page.mediabox
+        self.left, self.bottom = float(box.left), float(box.bottom)
+        self.width, self.height = float(box.width), float(box.height)
+        self.rotation = page.rotation % 360
+        if self.rotation in (90, 270):
+            self.display_height = self.width
+        else:
+            self.display_height = self.height
+
+    def to_display(self, x: float, y: float) -> tuple[float, float]:
+        # Unrotated, top-left origin.
+        x, y = x - self.left, self.height - (y - self.bottom)
+        if self.rotation == 90:
+            return self.height - y, x
+        if self.rotation == 180:
+            return self.width - x, self.height - y
+        if self.rotation == 270:
+            return y, self.width - x
+        return x, y
+
+
+def _page_lines(page: PageObject) -> OCRPage:
+    geometry = _PageGeometry(page)
+    lines: List[OCRLine] = []
+
+    def visitor(text: str, cm: list, tm: list, font_dict: dict, font_size: float) -> None:
+        # Text space -> user space; the baseline and glyph-up directions
+        # follow the matrices, so rotated text gets an upright box too.
+        a, b, c, d, e, f = _multiply(tm, cm)
+        advance = math.hypot(a, b) or 1.0
+        rise = math.hypot(c, d) or 1.0
+        height = abs(font_size) * rise or font_size
+        for row, part in enumerate(text.split("\n")):
+            part = part.strip()
+            if not part:
+                continue
+            width = _AVG_CHAR_WIDTH * abs(font_size) * advance * len(part)
+            # Continuation lines sit one line height below the first.
+            ox, oy = e - c / rise * height * row, f - d / rise * height * row
+            ux, uy = a / advance * width, b / advance * width
+            vx, vy = c / rise * height, d / rise * height
+            corners = [
+                geometry.to_display(ox + dx, oy + dy)
+                for dx, dy in ((0, 0), (ux, uy), (vx, vy), (ux + vx, uy + vy))
+            ]
+            xs = [x for x, _ in corners]
+            ys = [y for _, y in corners]
+            left, right, top, bottom = min(xs), max(xs), min(ys), max(ys)
+            lines.append(
+                OCRLine(
+                    text=part,
+                    bbox=[[left, top], [right, top], [right, bottom], [left, bottom]],
+                    confidence=1.0,
+                )
+            )
+
+    page.extract_text(visitor_text=visitor)
+    return OCRPage.from_lines(lines, height=geometry.display_height)
+
+
+def _image_coverage(page: PageObject) -> float:
+    """Share of the page area covered by drawn images (bounding boxes, capped at 1)."""
+    area = float(page.mediabox.width) * float(page.mediabox.height)
+    if area <= 0:
+        return 0.0
+    resources = page.get("/Resources")
+    contents = page.get_contents()
+    if contents is None:
+        return 0.0
+    covered = _drawn_image_area(page.pdf, contents, resources, _IDENTITY, 0)
+    return min(covered / area, 1.0)
+
+
+def _drawn_image_area(pdf, contents, resources, ctm: Matrix, depth: int) -> float:
+    resources = resources.get_object() if resources is not None else DictionaryObject()
+    xobjects = resources.get("/XObject")
+    xobjects = xobjects.get_object() if xobjects is not None else DictionaryObject()
+    stack: List[Matrix] = []
+    covered = 0.0
+    for operands, operator in contents.operations:
+        if operator == b"q":
+            stack.append(ctm)
+        elif operator == b"Q":
+            ctm = stack.pop() if stack else _IDENTITY
+        elif operator == b"cm":
+            ctm = _multiply([float(value) for value in operands], ctm)
+        elif operator == b"INLINE IMAGE":
+            covered += _unit_square_area(ctm)
+        elif operator == b"Do" and operands:
+            xobject = xobjects.get(operands[0])
+            if xobject is None:
+                continue
+            xobject = xobject.get_object()
+            subtype = xobject.get("/Subtype")
+            if subtype == "/Image":
+                covered += _unit_square_area(ctm)
+            elif subtype == "/Form" and depth < _MAX_FORM_DEPTH:
+                matrix = [float(value) for value in xobject.get("/Matrix", _IDENTITY)]
+                covered += _drawn_image_area(
+                    pdf,
+                    ContentStream(xobject, pdf),
+                    xobject.get("/Resources", resources),
+                    _multiply(matrix, ctm),
+                    depth + 1,
+                )
+    return covered
+
+
+def _unit_square_area(ctm: Matrix) -> float:
+    """Area of the bounding box of the unit square (an image's space) under ``ctm``."""
+    xs = [ctm[4], ctm[0] + ctm[4], ctm[2] + ctm[4], ctm[0] + ctm[2] + ctm[4]]
+    ys = [ctm[5], ctm[1] + ctm[5], ctm[3] + ctm[5], ctm[1] + ctm[3] + ctm[5]]
+    return (max(xs) - min(xs)) * (max(ys) - min(ys))
+
+
+class PdfTextLayer:
+    """Reads positioned text spans from born-digital PDFs.
+
+    Pages whose text layer has fewer than ``min_chars`` visible characters,
+    or that are mostly an image (more than ``max_image_coverage`` of the page,
+    as with scans that carry a partial or invisible OCR layer), are left out
+    so the caller can fall back to raster OCR for them.
+    """
+
+    def __init__(self, min_chars: int = 20, max_image_coverage: float = 0.5) -> None:
+        self._min_chars = min_chars
+        self._max_image_coverage = max_image_coverage
+
+    def extract(self, document: Document | Path) -> Dict[int, OCRPage]:
+        """Return ``{page_no: lines}`` (1-based) for pages with usable text."""
+        if isinstance(document, Path):
+            document = Document.from_path(document)
+        if not document.is_pdf:
+            return {}
+        with document.open() as stream:
+            try:
+                reader = PdfReader(stream)
+            except Exception as exc:
+                logger.warning(f"Could not read PDF text layer: {exc}")
+                return {}
+
+            pages: Dict[int, OCRPage] = {}
+            for page_no, page in enumerate(reader.pages, start=1):
+                try:
+                    lines = _page_lines(page)
+                except Exception as exc:
+                    logger.warning(f"Text layer extraction failed for page {page_no}: {exc}")
+                    continue
+                if sum(len(text.replace(" ", "")) for text in lines.texts) < self._min_chars:
+                    continue
+                try:
+                    coverage = _image_coverage(page)
+                except Exception as exc:
+                    logger.warning(f"Could not measure images on page {page_no}: {exc}")
+                    continue
+                if coverage > self._max_image_coverage:
+                    logger.info(
+                        f"Page {page_no} is {coverage:.0%} image; using OCR instead of its text layer"
+                    )
+                    continue
+                pages[page_no] = lines
+        return pages
@@ -13,16 +13,101 @@ class AppSettings(BaseSettings):
     ocr_backend: Literal["rapidocr", "dummy"] = "rapidocr"
     request_timeout_seconds: int = 120
     max_document_size_mb: int = 50
+    fetch_http2: bool = True  # Used when the optional h2 package is installed
+    fetch_max_connections: int = 32
+    fetch_chunk_size: int = 64 * 1024
+    spill_to_disk_mb: int = 8  # Larger documents are written to a temp file
     enable_debug_artifacts: bool = False
+
+    # Observability (GET /metrics)
+    metrics_enabled: bool = True  # Counters, histograms and stage spans
+    response_timings: bool = False  # Always include per-stage timings in responses
+
+    # Engine pool
+    ocr_pool_size: int = 2  # Preloaded OCR engines shared by concurrent requests
+    warmup_on_startup: bool = True
+
+    # CPU worker pool (preprocessing + OCR run off the event loop)
+    worker_mode: Literal["thread", "process", "inline"] = "thread"
+    worker_count: int | None = None  # Defaults to min(4, CPU count)
+    max_pending_documents: int = 16  # Beyond this, requests are rejected with 503
+
+    # Batch endpoint
+    batch_max_concurrency: int = 4  # Documents extracted at once across all batches
+    batch_max_documents: int = 500
+
+    # Asynchronous jobs (POST /jobs, GET /jobs/{id})
+    job_workers: int = 2
+    job_queue_backend: Literal["memory", "sqlite"] = "memory"  # sqlite survives restarts
+    job_db_path: str = ".cache/jobs.sqlite3"  # One consuming process per file
+    job_result_ttl_seconds: int = 3600  # Finished jobs are forgotten after this
+    job_max_retained: int = 1000
+    job_max_queued: int = 100  # POST /jobs answers 503 while this many jobs wait to start
+
+    # Born-digital PDFs: read the text layer instead of OCR where possible
+    use_pdf_text_layer: bool = True
+    text_layer_min_chars: int = 20  # Pages with less text fall back to raster OCR
+    text_layer_max_image_coverage: float = 0.5  # Pages more image than this (scans) fall back to OCR
+
+    # Whole-document result cache, keyed by content hash + result-affecting settings
+    result_cache_backend: Literal["none", "memory", "sqlite"] = "memory"
+    result_cache_max_entries: int = 512
+    result_cache_max_mb: int = 64  # Memory backend only
+    result_cache_ttl_seconds: int = 3600
+    result_cache_path: str = ".cache/results.sqlite3"
+
+    # Per-page OCR cache, keyed by a hash of the preprocessed page image
+    page_ocr_cache_entries: int = 2048  # 0 disables the cache
+    page_ocr_cache_max_mb: int = 64
+    page_ocr_cache_path: str | None = None  # Optional SQLite tier behind memory
+    page_ocr_cache_disk_entries: int = 50_000
+
+    # Rendering
+    render_dpi: int = 300  # Full-resolution DPI (and adaptive upper bound)
+    pdf_renderer: Literal["auto", "pdfium", "pdf2image"] = "auto"  # auto: pdfium if installed
+    render_concurrency: int = 1  # PDF windows rendered at once (useful with process workers)
+    adaptive_resolution: bool = True
+    target_long_edge_px: int = 2000
+    min_text_height_px: int = 16
+    max_page_pixels: int = 12_000_000
+    ocr_retry_confidence: float = 0.75  # Mean confidence below this re-renders at render_dpi
+    enhancement_backend: Literal["skimage", "opencv", "none"] = "skimage"
+    skip_clean_pages: bool = False  # Skip enhancement on high-contrast, noise-free pages
+    render_window_pages: int = 1  # PDF pages rasterized per render call
+    max_pages_in_flight: int = 4  # Rendered pages allowed to wait for OCR
     
     # LLM Configuration
     parser_backend: Literal["regex", "llm", "hybrid"] = "regex"
+    hybrid_llm_threshold: float = 0.7  # hybrid: pages whose regex parse scores below this go to the LLM
     llm_provider: Literal["openai", "anthropic", "local"] = "openai"
     llm_model: str = "gpt-4o-mini"  # Default model
+    llm_base_url: str | None = None  # OpenAI-compatible endpoint; local defaults to http://127.0.0.1:8000/v1
+    llm_response_format: Literal["json_object", "none"] = "json_object"  # none: server lacks JSON mode
+    llm_local_parallel_requests: int = 8  # local: concurrent page requests per document
     openai_api_key: str | None = None
     anthropic_api_key: str | None = None
     llm_temperature: float = 0.0  # Deterministic output
-    llm_max_tokens: int = 2000
+    llm_max_tokens: int = 2000  # Output budget per page
+    llm_max_output_tokens: int = 4096  # Model's output limit; caps a batch's llm_max_tokens x pages
+    llm_max_concurrency: int = 4  # Pages (or page batches) parsed concurrently per document
+    llm_batch_token_budget: int = 0  # >0 packs several pages into one request up to this many input tokens
+    llm_batch_max_pages: int = 8
+    llm_batch_linger_ms: int = 500  # How long a page may wait for others to fill its batch
+    llm_text_format: Literal["plain", "compact"] = "compact"  # compact: rows/columns as delimited cells
+    llm_min_line_confidence: float = 0.5  # OCR lines below this are left out of the prompt
+    llm_drop_boilerplate: bool = False  # Skip header/footer lines repeated verbatim from page 1
+    llm_prompt_caching: bool = True  # Mark the static instructions cacheable (Anthropic)
+    llm_timeout_seconds: float = 60.0  # Per attempt
+    llm_deadline_seconds: float = 180.0  # Per call, including retries and backoff
+    llm_max_retries: int = 4  # Retries on timeouts, connection errors, 429 and 5xx
+    llm_retry_base_seconds: float = 0.5  # Jittered exponential backoff base
+    llm_retry_max_seconds: float = 20.0
+    llm_global_concurrency: int = 16  # Upper bound for the adaptive limiter shared by all requests
+    llm_hedge_after_seconds: float = 0.0  # >0 sends a duplicate request when an attempt is this slow
+    llm_cache_backend: Literal["none", "memory", "sqlite"] = "memory"
+    llm_cache_max_entries: int = 4096
+    llm_cache_ttl_seconds: int = 86_400
+    llm_cache_path: str = ".cache/llm.sqlite3"
 
 
 @lru_cache()
@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+COMPLETION = {
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [
+        {
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {
+                "role": "assistant",
+                "content": json.dumps(
+                    {
+                        "page_type": "Bill Detail",
+                        "bill_items": [{"item_name": "Consultation", "item_amount": 1950.0}],
+                    }
+                ),
+            },
+        }
+    ],
+    "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+}
+
+
+class StubServer:
+    """OpenAI-compatible chat endpoint that replays scripted behaviours.
+
+    Each request takes the next script entry: ``("ok", delay)``,
+    ``("429", retry_after)`` or ``("400", None)``; the last entry repeats.
+    With ``json_mode=False`` requests that set ``response_format`` get a 400,
+    like servers without JSON mode.
+    """
+
+    def __init__(self, script, json_mode=True):
+        self.script = list(script)
+        self.json_mode = json_mode
+        self.requests = 0
+        self.bodies = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with stub._lock:
+                    stub.bodies.append(body)
+                    index = min(stub.requests, len(stub.script) - 1)
+                    stub.requests += 1
+                kind, value = stub.script[index]
+                if not stub.json_mode and "response_format" in body:
+                    kind, value = "400", "response_format is not supported"
+                try:
+                    if kind == "ok":
+                        time.sleep(value)
+                        self._send(200, COMPLETION, {"x-ratelimit-remaining-requests": "99"})
+                    elif kind == "429":
+                        self._send(429, {"error": {"message": "slow down"}}, {"retry-after": str(value)})
+                    else:
+                        self._send(400, {"error": {"message": value or "bad request"}}, {})
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _send(self, status, body, headers):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def llm_server():
+    """Start OpenAI-compatible stub servers; they are shut down after the test."""
+    servers = []
+
+    def start(script, **options):
+        server = StubServer(script, **options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def _build_pdf(pages):
+    """PDF bytes for ``(content, (width, height))`` pages, with Helvetica as /F1."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # The page tree, filled in once the pages are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for content, (width, height) in pages:
+        stream = zlib.compress(content)
+        objects.append(
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >>"
+            b" /Contents %d 0 R >>" % (width, height, len(objects))
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+@pytest.fixture
+def make_pdf():
+    """Build small PDFs from ``(content, (width, height))`` page specs."""
+    return _build_pdf
@@ -1,7 +1,15 @@
+import asyncio
+import json
+import time
+
 from fastapi.testclient import TestClient
 
+from bill_extraction_api.app import main
 from bill_extraction_api.app.main import app, get_service
 from bill_extraction_api.app.schemas import BillItem, ExtractionData, PageLineItems
+from bill_extraction_api.services.executor import WorkerPoolSaturated
+from bill_extraction_api.services.llm_parser import current_usage
+from bill_extraction_api.services.metrics import metrics, span
 
 
 class StubExtractionService:
@@ -43,3 +51,181 @@ def test_extract_bill_data(monkeypatch):
     assert payload["data"]["pagewise_line_items"][0]["bill_items"][0]["item_name"] == "Consultation"
 
     app.dependency_overrides.clear()
+
+
+class SaturatedExtractionService:
+    async def extract(self, document_url: str, on_page=None) -> ExtractionData:
+        raise WorkerPoolSaturated("Server busy")
+
+
+def test_extract_bill_data_when_saturated():
+    app.dependency_overrides[get_service] = lambda: SaturatedExtractionService()
+    client = TestClient(app)
+
+    response = client.post(
+        "/extract-bill-data", json={"document": "https://example.com/doc.pdf"}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+    app.dependency_overrides.clear()
+
+
+class FlakyExtractionService(StubExtractionService):
+    async def extract(self, document_url: str) -> ExtractionData:
+        if "missing" in document_url:
+            raise ValueError("Unsupported document type: text/html")
+        return await super().extract(document_url)
+
+
+def test_extract_bill_data_batch_reports_per_item_failures():
+    app.dependency_overrides[get_service] = lambda: FlakyExtractionService()
+    client = TestClient(app)
+    documents = [
+        {"document": "https://example.com/a.pdf"},
+        {"document": "https://example.com/missing.pdf"},
+    ]
+
+    response = client.post("/extract-bill-data/batch", json={"documents": documents})
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["succeeded"] == 1
+    assert payload["failed"] == 1
+    first, second = payload["results"]
+    assert first["status_code"] == 200
+    assert first["response"]["data"]["total_item_count"] == 1
+    assert second["status_code"] == 400
+    assert second["response"] is None
+
+    streamed = client.post(
+        "/extract-bill-data/batch", params={"stream": "true"}, json={"documents": documents}
+    )
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1]
+
+    app.dependency_overrides.clear()
+
+
+class JobExtractionService(StubExtractionService):
+    def __init__(self, settings=None) -> None:
+        pass
+
+    def warm_up(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+    async def extract(self, document_url: str, on_page=None) -> ExtractionData:
+        data = await super().extract(document_url)
+        if on_page is not None:
+            on_page(1, 1, data.pagewise_line_items[0])
+        return data
+
+
+def test_jobs_run_in_background(monkeypatch):
+    monkeypatch.setattr(main, "ExtractionService", JobExtractionService)
+    with TestClient(app) as client:
+        submitted = client.post("/jobs", json={"document": "https://example.com/doc.pdf"})
+        assert submitted.status_code == 202
+        job_id = submitted.json()["id"]
+
+        for _ in range(50):
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] == "succeeded":
+                break
+            time.sleep(0.02)
+        assert job["status"] == "succeeded"
+        assert job["completed_pages"] == job["total_pages"] == 1
+        assert job["result"]["data"]["total_item_count"] == 1
+
+        assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_extract_bill_data_stream():
+    app.dependency_overrides[get_service] = lambda: JobExtractionService()
+    client = TestClient(app)
+
+    response = client.post("/extract-bill-data/stream", json={"document": "https://example.com/doc.pdf"})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    page, summary = [json.loads(line) for line in response.text.splitlines()]
+    assert page["event"] == "page"
+    assert page["page"]["bill_items"][0]["item_name"] == "Consultation"
+    assert summary == {
+        "event": "summary",
+        "is_success": True,
+        "total_item_count": 1,
+        "token_usage": {
+            "total_tokens": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cached_input_tokens": 0,
+        },
+        "llm_cache_hits": 0,
+    }
+
+    sse = client.post(
+        "/extract-bill-data/stream",
+        json={"document": "https://example.com/doc.pdf"},
+        headers={"Accept": "text/event-stream"},
+    )
+    assert sse.text.startswith("event: page\ndata: ")
+
+    app.dependency_overrides[get_service] = lambda: SaturatedExtractionService()
+    busy = client.post("/extract-bill-data/stream", json={"document": "https://example.com/doc.pdf"})
+    assert busy.status_code == 503
+
+    app.dependency_overrides.clear()
+
+
+class CachedLLMExtractionService(JobExtractionService):
+    async def extract(self, document_url: str, on_page=None) -> ExtractionData:
+        current_usage().add_cache_hit()
+        return await super().extract(document_url, on_page=on_page)
+
+
+def test_llm_cache_hits_are_reported():
+    app.dependency_overrides[get_service] = lambda: CachedLLMExtractionService()
+    client = TestClient(app)
+    document = {"document": "https://example.com/doc.pdf"}
+
+    response = client.post("/extract-bill-data", json=document)
+    stream = client.post("/extract-bill-data/stream", json=document)
+
+    assert response.json()["llm_cache_hits"] == 1
+    assert json.loads(stream.text.splitlines()[-1])["llm_cache_hits"] == 1
+
+    app.dependency_overrides.clear()
+
+
+class TimedExtractionService(StubExtractionService):
+    async def extract(self, document_url: str) -> ExtractionData:
+        with span("ocr", page=1):
+            await asyncio.sleep(0.01)
+        metrics.observe("document_pages", 1)
+        return await super().extract(document_url)
+
+
+def test_timings_and_prometheus_metrics():
+    app.dependency_overrides[get_service] = lambda: TimedExtractionService()
+    client = TestClient(app)
+
+    plain = client.post("/extract-bill-data", json={"document": "https://example.com/doc.pdf"})
+    timed = client.post(
+        "/extract-bill-data?timings=true", json={"document": "https://example.com/doc.pdf"}
+    )
+
+    assert plain.json()["timings"] is None
+    timings = timed.json()["timings"]
+    assert timings["stages"]["ocr"]["count"] == 1
+    assert timings["pages"]["1"]["ocr"] >= 0.01
+
+    exposition = client.get("/metrics").text
+    assert "# TYPE bill_api_stage_ocr_seconds histogram" in exposition
+    assert 'bill_api_document_pages_bucket{le="+Inf"}' in exposition
+    assert "stage_ocr_seconds" in client.get("/metrics?format=json").json()["summaries"]
+
+    app.dependency_overrides.clear()
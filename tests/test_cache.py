@@ -0,0 +1,128 @@
+from bill_extraction_api.services import cache as cache_module
+from bill_extraction_api.services.cache import MemoryCache, SQLiteCache, TieredCache
+from bill_extraction_api.services.document_fetcher import Document
+from bill_extraction_api.services.ocr import OCRLine, OCRPage
+from bill_extraction_api.services.summarizer import ExtractionService
+from bill_extraction_api.settings import AppSettings
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"  # "b" is now the least recently used
+
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1" and cache.get("c") == b"3"
+    assert len(cache) == 2
+
+
+def test_memory_cache_evicts_by_bytes():
+    cache = MemoryCache(max_entries=10, max_bytes=10)
+    cache.set("a", b"x" * 4)
+    cache.set("b", b"x" * 4)
+    cache.set("c", b"x" * 4)
+    cache.set("huge", b"x" * 11)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    assert cache.get("huge") is None
+
+
+def test_memory_cache_expires_entries(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    cache = MemoryCache(ttl_seconds=60)
+    cache.set("a", b"1")
+
+    clock.now += 59
+    assert cache.get("a") == b"1"
+    clock.now += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_evicts_and_expires(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    path = tmp_path / "cache.sqlite3"
+    cache = SQLiteCache(path, max_entries=2, ttl_seconds=60)
+    cache.set("a", b"1")
+    clock.now += 1
+    cache.set("b", b"2")
+    clock.now += 1
+    assert cache.get("a") == b"1"  # refreshes "a"
+    clock.now += 1
+    cache.set("c", b"3")
+    cache.close()
+
+    reopened = SQLiteCache(path, max_entries=2, ttl_seconds=60)
+    assert reopened.get("b") is None
+    assert reopened.get("a") == b"1" and reopened.get("c") == b"3"
+    clock.now += 120
+    assert reopened.get("c") is None
+    reopened.close()
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    disk = SQLiteCache(tmp_path / "cache.sqlite3")
+    disk.set("a", b"1")
+    memory = MemoryCache()
+    cache = TieredCache(memory, disk)
+
+    assert cache.get("a") == b"1"
+    assert memory.get("a") == b"1"
+    disk.close()
+
+
+def test_sqlite_cache_reads_do_not_write(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite3")
+    cache.set("a", b"1")
+    changes = cache._conn.total_changes
+
+    for _ in range(10):
+        assert cache.get("a") == b"1"
+
+    assert cache._conn.total_changes == changes
+    cache.close()
+
+
+async def test_cached_results_report_every_page(monkeypatch):
+    service = ExtractionService(
+        AppSettings(ocr_backend="dummy", parser_backend="regex", worker_mode="inline")
+    )
+
+    async def fetch(url):
+        return Document(mime_type="application/pdf", data=b"%PDF-1.4 two pages")
+
+    box = [[0, 0], [100, 0], [100, 10], [0, 10]]
+    text_pages = {
+        1: OCRPage.from_lines([OCRLine("Consultation 1 500.00 500.00", box, 1.0)]),
+        2: OCRPage.from_lines([OCRLine("Thank you for visiting", box, 1.0)]),
+    }
+    monkeypatch.setattr(service._fetcher, "fetch", fetch)
+    monkeypatch.setattr(service._preprocessor, "page_count", lambda document: 2)
+    monkeypatch.setattr(service._text_layer, "extract", lambda document: text_pages)
+
+    reports = []
+    for _ in range(2):
+        calls = []
+        data = await service.extract("http://bills/two-pages.pdf", lambda *args: calls.append(args))
+        reports.append(sorted(calls, key=lambda call: call[0]))
+    await service.aclose()
+
+    fresh, cached = reports
+    # Page 2 has no line items, so only the page count says it exists.
+    assert [(page_no, total) for page_no, total, _ in cached] == [(1, 2), (2, 2)]
+    assert cached == fresh
+    assert data.total_item_count == 1
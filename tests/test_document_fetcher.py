@@ -0,0 +1,163 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bill_extraction_api.services.document_fetcher import DocumentFetcher
+from bill_extraction_api.settings import AppSettings
+
+MB = 1024 * 1024
+PDF = b"%PDF-1.4\n" + b"0" * 100
+PNG = b"\x89PNG\r\n\x1a\n" + b"0" * 100
+JPEG = b"\xff\xd8\xff\xe0" + b"0" * 100
+WEBP = b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"0" * 100
+
+
+class FileServer:
+    """Serves scripted documents and records how many body bytes went out.
+
+    Routes map a path to ``(body, content_type, mode)``: ``"length"`` sends a
+    Content-Length, ``"chunked"`` none, and ``"hold"`` declares ``len(body)``
+    but sends only the first 12 bytes until the server is closed.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.sent = {}
+        self._release = threading.Event()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body, content_type, mode = server.routes[self.path]
+                server.sent[self.path] = 0
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                if mode == "chunked":
+                    self.send_header("Transfer-Encoding", "chunked")
+                else:
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    if mode == "hold":
+                        self._write(body[:12])
+                        server._release.wait(10)
+                        return
+                    for start in range(0, len(body), 64 * 1024):
+                        chunk = body[start : start + 64 * 1024]
+                        if mode == "chunked":
+                            self.wfile.write(b"%x\r\n" % len(chunk))
+                        self._write(chunk)
+                        if mode == "chunked":
+                            self.wfile.write(b"\r\n")
+                    if mode == "chunked":
+                        self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def _write(self, data):
+                self.wfile.write(data)
+                self.wfile.flush()
+                server.sent[self.path] += len(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def serve(self, path, body, content_type="application/octet-stream", mode="length"):
+        self.routes[path] = (body, content_type, mode)
+        return self.url + path
+
+    def close(self):
+        self._release.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def file_server():
+    server = FileServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+async def fetcher():
+    fetcher = DocumentFetcher(
+        AppSettings(
+            max_document_size_mb=4,
+            spill_to_disk_mb=1,
+            request_timeout_seconds=1,
+            fetch_http2=False,
+        )
+    )
+    yield fetcher
+    await fetcher.aclose()
+
+
+async def test_rejects_declared_oversize_before_reading_the_body(file_server, fetcher):
+    # The body is never sent, so reading it would time out instead.
+    url = file_server.serve("/big.pdf", PDF + b"0" * (8 * MB), mode="hold")
+
+    with pytest.raises(ValueError, match="exceeds"):
+        await fetcher.fetch(url)
+
+
+async def test_aborts_undeclared_oversize_while_streaming(file_server, fetcher, tmp_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    url = file_server.serve("/big.pdf", PDF + b"0" * (64 * MB), mode="chunked")
+
+    with pytest.raises(ValueError, match="exceeds"):
+        await fetcher.fetch(url)
+
+    # Only socket buffers' worth beyond the limit went out, and the spilled
+    # temp file was removed.
+    assert file_server.sent["/big.pdf"] < 32 * MB
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_large_documents_spill_to_disk(file_server, fetcher, tmp_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    body = PDF + bytes(range(256)) * (6 * 1024)
+    small = await fetcher.fetch(file_server.serve("/small.pdf", PDF))
+    large = await fetcher.fetch(file_server.serve("/large.pdf", body, mode="chunked"))
+
+    assert small.data == PDF and small.path is None
+    assert large.data is None and large.path.suffix == ".pdf"
+    assert large.path.parent.parent == tmp_path
+    assert large.read_bytes() == body
+
+    DocumentFetcher.cleanup(large)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize(
+    "body, content_type, expected",
+    [
+        (PDF, "application/octet-stream", "application/pdf"),
+        (PNG, "text/plain", "image/png"),
+        (JPEG, "application/pdf", "image/jpeg"),
+        (WEBP, "application/octet-stream", "image/webp"),
+        (b"%PDF-1.4", "application/octet-stream", "application/pdf"),
+        (b"GIF89a" + b"0" * 100, "image/png; charset=binary", "image/png"),
+    ],
+    ids=["pdf", "png", "jpeg", "webp", "shorter-than-sniff", "header-fallback"],
+)
+async def test_sniffs_type_from_content(file_server, fetcher, body, content_type, expected):
+    document = await fetcher.fetch(file_server.serve("/document", body, content_type))
+
+    assert document.mime_type == expected
+    assert document.data == body
+
+
+async def test_rejects_unsupported_documents(file_server, fetcher):
+    url = file_server.serve("/page.pdf", b"<html>not a bill</html>", "text/html")
+
+    with pytest.raises(ValueError, match="Unsupported document type: text/html"):
+        await fetcher.fetch(url)
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from dataclasses import replace
+
+import pytest
+
+from bill_extraction_api.services.jobs import (
+    SUCCEEDED,
+    Job,
+    JobManager,
+    JobQueueFull,
+    SQLiteJobQueue,
+    SQLiteJobStore,
+)
+from bill_extraction_api.settings import AppSettings
+
+
+async def test_sqlite_store_keeps_the_latest_state(tmp_path):
+    store = SQLiteJobStore(tmp_path / "jobs.sqlite3")
+    now = time.time()
+    job = Job(id="a", document="https://example.com/doc.pdf", updated_at=now)
+    done = replace(job, status=SUCCEEDED, updated_at=now + 1)
+
+    await store.save(done)
+    await store.save(job)  # a progress update that finished late
+
+    loaded = await store.load("a")
+    assert loaded is not None and loaded.status == SUCCEEDED
+    assert await store.load("missing") is None
+
+
+async def test_sqlite_queue_requeues_unacknowledged_jobs(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    queue = SQLiteJobQueue(path, poll_interval=0.01)
+    await queue.put("a")
+    await queue.put("b")
+
+    assert await queue.get() == "a"
+    await queue.ack("a")
+    assert await queue.get() == "b"
+
+    restarted = SQLiteJobQueue(path, poll_interval=0.01)
+    assert await restarted.get() == "b"
+
+
+async def test_sqlite_queue_claims_each_job_once(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    queues = [SQLiteJobQueue(path, poll_interval=0.01) for _ in range(2)]
+    jobs = [f"job-{n}" for n in range(40)]
+    for job_id in jobs:
+        await queues[0].put(job_id)
+
+    claimed = await asyncio.gather(*(queues[n % 2].get() for n in range(len(jobs))))
+
+    assert sorted(claimed) == sorted(jobs)
+    assert await queues[1].depth() == 0
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_submit_rejects_when_queue_is_full(tmp_path, backend):
+    settings = AppSettings(
+        job_queue_backend=backend, job_db_path=str(tmp_path / "jobs.sqlite3"), job_max_queued=2
+    )
+    # Workers are not started, so submitted jobs stay queued.
+    manager = JobManager(service=None, settings=settings)
+    first = await manager.submit("https://example.com/1.pdf")
+    await manager.submit("https://example.com/2.pdf")
+
+    with pytest.raises(JobQueueFull):
+        await manager.submit("https://example.com/3.pdf")
+    assert (await manager.get(first.id)).status == "queued"
@@ -0,0 +1,59 @@
+import asyncio
+
+from bill_extraction_api.services.layout import BoilerplateFilter
+from bill_extraction_api.services.ocr import OCRLine, OCRPage
+
+
+def _line(text, y, height=18.0):
+    bbox = [[40.0, y], [600.0, y], [600.0, y + height], [40.0, y + height]]
+    return OCRLine(text=text, bbox=bbox, confidence=0.9)
+
+
+def _bill_page(rows, page_height=1000.0):
+    lines = [_line("City Hospital Pharmacy", 10.0), _line("Thank you, get well soon", 970.0)]
+    lines += [_line(text, 40.0 + index * 25.0) for index, text in enumerate(rows)]
+    return OCRPage.from_lines(lines, height=page_height)
+
+
+async def test_boilerplate_drops_only_exact_repeats_without_amounts():
+    boilerplate = BoilerplateFilter()
+    first = _bill_page(["Paracetamol 500mg Tab 2 12.50 25.00"])
+    # Same item name at the top of the next page with a different amount, and
+    # the last text row sitting well inside the page.
+    second = _bill_page(["Paracetamol 500mg Tab 4 12.50 50.00", "Syringe 5ml 1 8.00 8.00"])
+
+    boilerplate.observe(2, second)
+    pending = asyncio.ensure_future(boilerplate.filter(second, 2))
+    await asyncio.sleep(0)
+    assert not pending.done()  # waits for page 1 regardless of arrival order
+
+    boilerplate.observe(1, first)
+    assert (await boilerplate.filter(first, 1)) is first
+    kept = (await pending).texts
+    assert kept == [
+        "Paracetamol 500mg Tab 4 12.50 50.00",
+        "Syringe 5ml 1 8.00 8.00",
+    ]
+
+
+async def test_boilerplate_keeps_repeated_items_in_margin():
+    boilerplate = BoilerplateFilter()
+    item = "Room Rent 1 1,500.00 1,500.00"
+    first = OCRPage.from_lines([_line(item, 10.0), _line("Discharge summary", 30.0)], height=1000.0)
+    second = OCRPage.from_lines(
+        [_line(item, 10.0), _line("Room Rent 1 1,500.00 1,800.00", 975.0)], height=1000.0
+    )
+
+    boilerplate.observe(1, first)
+
+    assert (await boilerplate.filter(second, 2)).texts == second.texts
+
+
+async def test_boilerplate_keeps_lines_when_page_height_unknown():
+    boilerplate = BoilerplateFilter()
+    first = [_line("City Hospital Pharmacy", 10.0)]
+    boilerplate.observe(1, first)
+
+    assert await boilerplate.filter([_line("City Hospital Pharmacy", 10.0)], 2) == [
+        _line("City Hospital Pharmacy", 10.0)
+    ]
@@ -0,0 +1,208 @@
+import asyncio
+import json
+
+import pytest
+
+from bill_extraction_api.services.llm_parser import LLMParser, PageBatcher, usage_scope
+from bill_extraction_api.services.ocr import OCRLine
+from bill_extraction_api.settings import AppSettings
+
+
+def _lines(page_no):
+    bbox = [[0, 0], [10, 0], [10, 5], [0, 5]]
+    return [OCRLine(text=f"Consultation {page_no} 1950.00", bbox=bbox, confidence=0.9)]
+
+
+class RejectedError(Exception):
+    status_code = 400
+
+
+class FakeProvider:
+    """Answers batch prompts for every page named in them, except ``omit``.
+
+    ``max_active`` records the most calls that were in flight at once.
+    """
+
+    def __init__(self, omit=(), reject_above=None):
+        self.omit = set(omit)
+        self.reject_above = reject_above
+        self.calls = []
+        self.active = self.max_active = 0
+
+    async def __call__(self, instructions, content, max_tokens):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            return self._answer(content, max_tokens)
+        finally:
+            self.active -= 1
+
+    def _answer(self, content, max_tokens):
+        page_numbers = [
+            int(line.split()[2]) for line in content.splitlines() if line.startswith("=== PAGE")
+        ]
+        self.calls.append((page_numbers, max_tokens))
+        usage = {"input_tokens": 10, "output_tokens": 5}
+        item = {"item_name": "Consultation", "item_amount": 1950.0}
+        if self.reject_above is not None and max(len(page_numbers), 1) > self.reject_above:
+            raise RejectedError("max_tokens is too large for this model")
+        if not page_numbers:
+            return json.dumps({"page_type": "Bill Detail", "bill_items": [item]}), usage
+        pages = [
+            {"page_no": n, "page_type": "Bill Detail", "bill_items": [item]}
+            for n in page_numbers
+            if n not in self.omit
+        ]
+        self.omit.clear()
+        return json.dumps({"pages": pages}), usage
+
+
+def _parser(provider, **overrides):
+    parser = LLMParser(
+        AppSettings(
+            parser_backend="llm",
+            llm_provider="local",
+            llm_base_url="http://127.0.0.1:9/v1",
+            llm_cache_backend="none",
+            **overrides,
+        )
+    )
+    parser._call_provider = provider
+    return parser
+
+
+async def test_batch_output_budget_is_capped():
+    provider = FakeProvider()
+    parser = _parser(provider, llm_max_tokens=2000, llm_max_output_tokens=4096)
+
+    results = await parser.parse_batch({n: _lines(n) for n in range(1, 5)})
+
+    assert sorted(results) == [1, 2, 3, 4]
+    assert provider.calls == [([1, 2, 3, 4], 4096)]
+
+
+async def test_rejected_batch_is_split():
+    provider = FakeProvider(reject_above=2)
+    parser = _parser(provider)
+
+    results = await parser.parse_batch({n: _lines(n) for n in range(1, 5)})
+
+    assert sorted(results) == [1, 2, 3, 4]
+    assert [pages for pages, _ in provider.calls] == [[1, 2, 3, 4], [1, 2], [3, 4]]
+    # The halves share the rejected batch's single concurrency slot.
+    assert provider.max_active == 1
+
+
+async def test_pages_missing_from_response_are_retried():
+    provider = FakeProvider(omit={2, 3})
+    parser = _parser(provider)
+
+    results = await parser.parse_batch({n: _lines(n) for n in range(1, 4)})
+
+    assert all(items[0].item_name == "Consultation" for items, _ in results.values())
+    assert [pages for pages, _ in provider.calls] == [[1, 2, 3], [2, 3]]
+
+
+async def test_single_page_rejection_is_raised():
+    provider = FakeProvider(reject_above=0)
+    parser = _parser(provider)
+
+    with pytest.raises(RejectedError):
+        await parser.parse_batch({1: _lines(1), 2: _lines(2)})
+
+
+async def test_cancelled_caller_does_not_cancel_a_shared_call():
+    provider = FakeProvider()
+    release = asyncio.Event()
+
+    async def slow_provider(instructions, content, max_tokens):
+        await release.wait()
+        return await provider(instructions, content, max_tokens)
+
+    parser = _parser(slow_provider)
+
+    async def parse():
+        with usage_scope() as usage:
+            items, _ = await parser.parse(_lines(1))
+            return items, usage.to_dict()
+
+    first = asyncio.create_task(parse())
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(parse())
+    await asyncio.sleep(0.01)
+    first.cancel()
+    await asyncio.sleep(0.01)
+    release.set()
+
+    items, usage = await second
+    assert first.cancelled()
+    assert items[0].item_name == "Consultation"
+    assert len(provider.calls) == 1
+    # The cancelled caller never received the response, so this one is billed.
+    assert usage["input_tokens"] == 10 and usage["cache_hits"] == 0
+
+
+class FakeBatchParser:
+    def __init__(self):
+        self.batches = []
+
+    def estimate_tokens(self, lines):
+        return 100
+
+    async def parse_batch(self, pages):
+        self.batches.append(sorted(pages))
+        return {page_no: ([], "Bill Detail") for page_no in pages}
+
+
+def _batcher(parser, expected_pages, linger=10.0, max_pages=8, token_budget=10_000):
+    return PageBatcher(
+        parser,
+        expected_pages=expected_pages,
+        token_budget=token_budget,
+        max_pages=max_pages,
+        linger=linger,
+        limiter=asyncio.Semaphore(4),
+    )
+
+
+async def test_batcher_sends_once_expected_pages_arrive():
+    parser = FakeBatchParser()
+    batcher = _batcher(parser, expected_pages=3)
+
+    await asyncio.gather(*(batcher.parse(_lines(n), page_number=n) for n in (1, 2, 3)))
+
+    assert parser.batches == [[1, 2, 3]]
+
+
+async def test_batcher_sends_after_linger():
+    parser = FakeBatchParser()
+    batcher = _batcher(parser, expected_pages=5, linger=0.05)
+
+    await asyncio.wait_for(
+        asyncio.gather(*(batcher.parse(_lines(n), page_number=n) for n in (1, 2))), timeout=2
+    )
+
+    assert parser.batches == [[1, 2]]
+
+
+async def test_batcher_skip_counts_towards_expected_pages():
+    parser = FakeBatchParser()
+    batcher = _batcher(parser, expected_pages=3)
+
+    pending = asyncio.gather(*(batcher.parse(_lines(n), page_number=n) for n in (1, 3)))
+    await asyncio.sleep(0)
+    assert parser.batches == []
+    batcher.skip()
+    await asyncio.wait_for(pending, timeout=2)
+
+    assert parser.batches == [[1, 3]]
+
+
+async def test_batcher_flushes_at_page_and_token_limits():
+    parser = FakeBatchParser()
+    batcher = _batcher(parser, expected_pages=5, max_pages=2, token_budget=250)
+
+    await asyncio.gather(*(batcher.parse(_lines(n), page_number=n) for n in range(1, 6)))
+
+    assert parser.batches == [[1, 2], [3, 4], [5]]
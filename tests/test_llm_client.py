@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import pytest
+
+from bill_extraction_api.services.llm_client import AdaptiveLimiter, ResilientCaller, parse_reset
+from bill_extraction_api.services.llm_parser import LLMParser
+from bill_extraction_api.services.ocr import OCRLine
+from bill_extraction_api.settings import AppSettings
+
+
+@pytest.fixture
+def stub_llm(llm_server):
+    def start(script, **overrides):
+        server = llm_server(script)
+        settings = AppSettings(
+            parser_backend="llm",
+            llm_provider="openai",
+            openai_api_key="test",
+            llm_base_url=server.url,
+            llm_cache_backend="none",
+            llm_retry_base_seconds=0.01,
+            **overrides,
+        )
+        return server, LLMParser(settings)
+
+    return start
+
+
+LINES = [OCRLine(text="Consultation 1950.00", bbox=[[0, 0], [10, 0], [10, 5], [0, 5]], confidence=0.9)]
+
+
+async def test_retries_after_rate_limit(stub_llm):
+    server, parser = stub_llm([("429", 0), ("ok", 0)])
+
+    items, _ = await parser.parse(LINES)
+
+    assert [item.item_name for item in items] == ["Consultation"]
+    assert server.requests == 2
+    assert parser._caller.limiter.limit < 16
+
+
+async def test_slow_attempt_times_out_and_retries(stub_llm):
+    server, parser = stub_llm([("ok", 1.0), ("ok", 0)], llm_timeout_seconds=0.3)
+
+    items, _ = await parser.parse(LINES)
+
+    assert len(items) == 1
+    assert server.requests == 2
+
+
+async def test_hedged_request_beats_slow_attempt(stub_llm):
+    server, parser = stub_llm([("ok", 1.5), ("ok", 0)], llm_hedge_after_seconds=0.1)
+
+    started = time.monotonic()
+    items, _ = await parser.parse(LINES)
+
+    assert len(items) == 1
+    assert time.monotonic() - started < 1.0
+    assert server.requests == 2
+
+
+async def test_limiter_wait_does_not_count_against_attempt_timeout(stub_llm):
+    server, parser = stub_llm(
+        [("ok", 0.4)], llm_global_concurrency=1, llm_timeout_seconds=0.6, llm_max_retries=0
+    )
+
+    pages = [
+        [OCRLine(text=f"Consultation {n} 1950.00", bbox=LINES[0].bbox, confidence=0.9)] for n in (1, 2)
+    ]
+    results = await asyncio.gather(*(parser.parse(lines, page_number=n) for n, lines in enumerate(pages, 1)))
+
+    assert all(len(items) == 1 for items, _ in results)
+    assert server.requests == 2
+
+
+async def test_limiter_wait_is_bounded_by_deadline():
+    caller = ResilientCaller(
+        AppSettings(llm_global_concurrency=1, llm_deadline_seconds=0.2, llm_max_retries=0)
+    )
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        return None, {}
+
+    await caller.limiter.acquire()
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await caller.call(fn)
+
+    assert time.monotonic() - started < 1.0
+    assert calls == []
+    caller.limiter.release()
+    assert await caller.call(fn) is None
+
+
+async def test_cancelled_waiter_passes_its_wakeup_on():
+    limiter = AdaptiveLimiter(1)
+    await limiter.acquire()
+    woken = asyncio.create_task(limiter.acquire())
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # Wake the first waiter, then cancel it before it runs.
+    limiter.release()
+    woken.cancel()
+    await asyncio.wait_for(waiting, 1)
+
+    assert woken.cancelled()
+    assert limiter.in_flight == 1
+
+
+async def test_client_errors_are_not_retried(stub_llm):
+    server, parser = stub_llm([("400", None)])
+
+    with pytest.raises(Exception):
+        await parser.parse(LINES)
+    assert server.requests == 1
+
+
+def test_parse_reset_formats():
+    assert parse_reset("2") == 2.0
+    assert parse_reset("1m30s") == 90.0
+    assert parse_reset("250ms") == 0.25
+    assert parse_reset("2000-01-01T00:00:00Z") == 0.0
+    assert parse_reset("soon") is None
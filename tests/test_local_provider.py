@@ -0,0 +1,60 @@
+import asyncio
+
+from bill_extraction_api.services.llm_parser import LLMParser
+from bill_extraction_api.services.ocr import OCRLine
+from bill_extraction_api.settings import AppSettings
+
+LINES = [OCRLine(text="Consultation 1950.00", bbox=[[0, 0], [10, 0], [10, 5], [0, 5]], confidence=0.9)]
+
+
+def local_parser(url: str, **overrides) -> LLMParser:
+    return LLMParser(
+        AppSettings(
+            parser_backend="llm",
+            llm_provider="local",
+            llm_base_url=url,
+            llm_model="local-model",
+            llm_cache_backend="none",
+            **overrides,
+        )
+    )
+
+
+async def test_local_provider_uses_openai_compatible_server(llm_server):
+    server = llm_server([("ok", 0)])
+    parser = local_parser(server.url)
+
+    pages = [
+        [OCRLine(text=f"Consultation {n} 1950.00", bbox=LINES[0].bbox, confidence=0.9)]
+        for n in range(1, 5)
+    ]
+    results = await asyncio.gather(*(parser.parse(lines, page_number=n) for n, lines in enumerate(pages, 1)))
+
+    assert all(items[0].item_name == "Consultation" for items, _ in results)
+    assert server.requests == 4
+    assert server.bodies[0]["model"] == "local-model"
+    assert server.bodies[0]["response_format"] == {"type": "json_object"}
+
+
+async def test_local_provider_falls_back_without_json_mode(llm_server):
+    server = llm_server([("ok", 0)], json_mode=False)
+    parser = local_parser(server.url)
+
+    first, _ = await parser.parse(LINES)
+    second, _ = await parser.parse(
+        [OCRLine(text="X-Ray 900.00", bbox=LINES[0].bbox, confidence=0.9)], page_number=2
+    )
+
+    assert len(first) == len(second) == 1
+    # One rejected request, then every request goes without response_format.
+    assert server.requests == 3
+    assert all("response_format" not in body for body in server.bodies[1:])
+
+
+async def test_response_format_can_be_disabled(llm_server):
+    server = llm_server([("ok", 0)])
+    parser = local_parser(server.url, llm_response_format="none")
+
+    await parser.parse(LINES)
+
+    assert "response_format" not in server.bodies[0]
@@ -0,0 +1,49 @@
+import pickle
+import random
+
+from bill_extraction_api.services.layout import compact_text
+from bill_extraction_api.services.ocr import OCRLine, OCRPage, decode_lines, encode_lines
+from bill_extraction_api.services.parser import LineItemParser
+
+
+def _page(count=60, seed=3):
+    rng = random.Random(seed)
+    lines = []
+    for row in range(count):
+        y = 10.0 + (row // 2) * 24.5
+        x = 40.0 if row % 2 == 0 else 620.0
+        text = f"Item {row} Charges" if row % 2 == 0 else f"{rng.randint(1, 9)}  {rng.randint(10, 999)}.50"
+        if row == 0:
+            text = "Page 1 of 3"
+        bbox = [[x, y], [x + 300.5, y], [x + 300.5, y + 18.25], [x, y + 18.25]]
+        lines.append(OCRLine(text=text, bbox=bbox, confidence=rng.uniform(0.3, 1.0)))
+    rng.shuffle(lines)
+    # Views hold the float32-rounded coordinates the page stores.
+    page = OCRPage.from_lines(lines)
+    return page, list(page)
+
+
+def test_page_and_line_views_parse_identically():
+    page, lines = _page()
+
+    assert LineItemParser().parse(page) == LineItemParser().parse(lines)
+    assert compact_text(page, min_confidence=0.5) == compact_text(lines, min_confidence=0.5)
+    assert isinstance(page[2:5], OCRPage) and len(page[2:5]) == 3
+
+
+def test_page_transfer_round_trips():
+    page, _ = _page()
+    page.height = 1190.0
+    page.texts[1] = "Ünïcode · ₹ 1,250.00"
+
+    for protocol in (4, 5):
+        copy = pickle.loads(pickle.dumps(page, protocol=protocol))
+        assert copy.texts == page.texts
+        assert (copy.boxes == page.boxes).all()
+        assert (copy.confidences == page.confidences).all()
+        assert copy.height == page.height
+
+    decoded = decode_lines(encode_lines(page))
+    assert decoded.texts == page.texts
+    assert abs(decoded.boxes - page.boxes).max() <= 0.051
+    assert len(decode_lines(encode_lines(OCRPage.empty()))) == 0
@@ -0,0 +1,54 @@
+from bill_extraction_api.services.ocr import OCRLine
+from bill_extraction_api.services.parser import LineItemParser
+
+
+def _line(text, y, points=4):
+    bbox = [[0.0, y], [100.0, y], [100.0, y + 10], [0.0, y + 10]][:points]
+    return OCRLine(text=text, bbox=bbox, confidence=0.9)
+
+
+def test_parses_rows_in_reading_order_with_section_prefix():
+    lines = [
+        _line("Paracetamol 500mg 2 1,250.50 2,501.00", 40),
+        _line("Pharmacy Charges", 20),
+        _line("   ", 30),
+        _line("Dressing -- 0 0.00 150", 60),
+        _line("12.5", 80),
+    ]
+
+    items = LineItemParser().parse(lines)
+
+    assert [item.model_dump() for item in items] == [
+        {
+            "item_name": "Pharmacy Charges | Paracetamol mg",
+            "item_amount": 2501.0,
+            "item_rate": 1250.5,
+            "item_quantity": 2.0,
+        },
+        {
+            "item_name": "Pharmacy Charges | Dressing",
+            "item_amount": 150.0,
+            "item_rate": None,
+            "item_quantity": None,
+        },
+        {
+            "item_name": "Pharmacy Charges | Line Item",
+            "item_amount": 12.5,
+            "item_rate": None,
+            "item_quantity": None,
+        },
+    ]
+
+
+def test_mixed_bbox_shapes_sort_by_mean_y():
+    lines = [
+        _line("Room Rent 1 900.00 900.00", 10, points=4),
+        _line("ECG 300.00", 10, points=2),
+        _line("CBC 450.00", 10, points=2),
+    ]
+
+    items = LineItemParser().parse(lines)
+
+    # Two-point boxes centre at y=10, four-point ones at y=15; ties keep input order.
+    assert [item.item_name for item in items] == ["ECG", "CBC", "Room Rent"]
+    assert LineItemParser().parse([]) == []
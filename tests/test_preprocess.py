@@ -0,0 +1,96 @@
+import importlib.util
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from bill_extraction_api.services.document_fetcher import Document
+from bill_extraction_api.services.preprocess import (
+    DocumentPreprocessor,
+    Pdf2ImageRasterizer,
+    PdfiumRasterizer,
+    ResolutionPolicy,
+    _is_clean,
+    resolve_rasterizer,
+)
+
+ROWS = b"".join(
+    b"BT /F1 11 Tf 40 %d Td (Consultation charges 1 500.00 500.00) Tj ET\n" % y
+    for y in range(700, 100, -30)
+)
+
+
+def _document(make_pdf, sizes, content=b""):
+    return Document(mime_type="application/pdf", data=make_pdf([(content, size) for size in sizes]))
+
+
+def test_adaptive_dpi_uses_page_sizes_read_once(make_pdf):
+    policy = ResolutionPolicy(target_long_edge_px=400, min_text_height_px=1, min_dpi=10)
+    preprocessor = DocumentPreprocessor(policy=policy, enhancement="none", rasterizer=PdfiumRasterizer())
+    document = _document(make_pdf, [(144, 72), (288, 144)])
+
+    sizes = preprocessor.page_sizes(document)
+    assert sizes == [(144.0, 72.0), (288.0, 144.0)]
+    assert DocumentPreprocessor(enhancement="none").page_sizes(document) is None
+
+    # The window's largest page sets the DPI; read from the document or passed in.
+    (page,) = preprocessor.render_pages(document, 1, 1)
+    assert page.size == (400, 200)
+    (page,) = preprocessor.render_pages(document, 1, 1, False, sizes[1:2])
+    assert page.size == (200, 100)
+
+
+@pytest.fixture
+def text_page(make_pdf):
+    """A born-digital bill page rendered at 100 dpi, in grayscale."""
+    (page,) = PdfiumRasterizer().render(_document(make_pdf, [(612, 792)], ROWS), 1, 1, 100)
+    return page.convert("L")
+
+
+def _noisy_scan(page):
+    # Grey paper, faded ink and sensor noise.
+    rng = np.random.default_rng(0)
+    noisy = np.asarray(page) * 0.6 + 60 + rng.normal(0, 25, np.asarray(page).shape)
+    return Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8))
+
+
+def test_opencv_enhancement_matches_skimage(text_page):
+    for page in (text_page, _noisy_scan(text_page)):
+        fast = DocumentPreprocessor._enhance_opencv(page)
+        reference = DocumentPreprocessor._enhance_skimage(page)
+
+        assert fast.mode == "L" and fast.size == page.size
+        assert np.asarray(fast).dtype == np.uint8
+        difference = np.abs(np.asarray(fast, dtype=np.int16) - np.asarray(reference, dtype=np.int16))
+        assert difference.mean() < 4
+
+
+def test_clean_page_check(text_page):
+    assert _is_clean(np.asarray(text_page))
+    assert not _is_clean(np.asarray(_noisy_scan(text_page)))
+    assert not _is_clean(np.full((200, 200), 255, dtype=np.uint8))  # no ink at all
+
+
+def test_pdfium_renders_a_window_at_the_requested_dpi(make_pdf):
+    document = _document(make_pdf, [(144, 72), (72, 144), (144, 144), (72, 72)])
+
+    pages = PdfiumRasterizer().render(document, 2, 3, dpi=150)
+
+    assert [page.size for page in pages] == [(150, 300), (300, 300)]
+    assert all(page.mode == "L" for page in pages)
+    # A window running past the last page stops there.
+    assert len(PdfiumRasterizer().render(document, 4, 6, dpi=72)) == 1
+
+
+def test_auto_rasterizer_falls_back_without_pypdfium2(monkeypatch):
+    find_spec = importlib.util.find_spec
+
+    def without_pdfium(name, *args):
+        return None if name == "pypdfium2" else find_spec(name, *args)
+
+    assert resolve_rasterizer("auto").name == "pdfium"
+    monkeypatch.setattr(importlib.util, "find_spec", without_pdfium)
+
+    assert isinstance(resolve_rasterizer("auto"), Pdf2ImageRasterizer)
+    with pytest.raises(RuntimeError, match="pypdfium2"):
+        resolve_rasterizer("pdfium")
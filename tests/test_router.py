@@ -0,0 +1,78 @@
+from bill_extraction_api.app.schemas import BillItem
+from bill_extraction_api.services.metrics import metrics
+from bill_extraction_api.services.ocr import OCRLine
+from bill_extraction_api.services.parser import LineItemParser
+from bill_extraction_api.services.router import HybridRouter, score_page
+
+
+def _lines(rows, confidence=0.95):
+    return [
+        OCRLine(
+            text=text,
+            bbox=[[40.0, y], [600.0, y], [600.0, y + 18.0], [40.0, y + 18.0]],
+            confidence=confidence,
+        )
+        for y, text in zip(range(10, 10 + 25 * len(rows), 25), rows)
+    ]
+
+
+def test_placeholder_names_under_a_section_count_as_unnamed():
+    lines = _lines(["Pharmacy Charges", "2 12.50 25.00", "1 40.00 40.00"])
+    items = LineItemParser().parse(lines)
+    assert [item.item_name for item in items] == ["Pharmacy Charges | Line Item"] * 2
+
+    _, signals = score_page(lines, items)
+
+    assert signals["named_items"] == 0.0
+
+
+def test_section_prefix_does_not_name_short_descriptions():
+    items = [BillItem(item_name="Room Charges | X1", item_amount=10.0)]
+
+    _, signals = score_page(_lines(["Room Charges", "X1 10.00"]), items)
+
+    assert signals["named_items"] == 0.0
+
+
+def test_total_section_heading_does_not_make_every_row_a_total():
+    lines = _lines(
+        [
+            "Total Charges Breakdown",
+            "Consultation 1 500.00 500.00",
+            "Dressing 2 45.00 90.00",
+            "Total 590.00",
+        ]
+    )
+    items = LineItemParser().parse(lines)
+    assert items[0].item_name == "Total Charges Breakdown | Consultation"
+
+    _, signals = score_page(lines, items)
+
+    assert signals["totals_match"] == 1.0
+
+
+def test_text_layer_pages_leave_out_ocr_confidence():
+    lines = _lines(["Consultation 1 500.00 500.00", "Dressing 2 50.00 90.00"], confidence=1.0)
+    items = LineItemParser().parse(lines)
+
+    ocr_score, ocr_signals = score_page(lines, items)
+    text_score, text_signals = score_page(lines, items, text_layer=True)
+
+    assert ocr_signals["ocr_confidence"] == 1.0
+    assert text_signals["ocr_confidence"] is None
+    assert text_score < ocr_score
+
+
+def test_router_sends_low_scoring_pages_to_llm():
+    router = HybridRouter(threshold=0.8)
+    good = _lines(["Consultation 1 500.00 500.00", "Total 500.00"])
+    poor = _lines(["Pharmacy Charges", "2 12.50 31.00", "1 40.00 40.00"], confidence=0.6)
+
+    assert router.decide(1, good, LineItemParser().parse(good)).route == "regex"
+    decision = router.decide(2, poor, LineItemParser().parse(poor), text_layer=True)
+
+    assert decision.route == "llm"
+    assert decision.signals["ocr_confidence"] is None
+    assert [d.page_no for d in router.recent()] == [1, 2]
+    # Scores get 0.1-wide buckets so the threshold can be tuned from them.
+    assert 'bill_api_hybrid_route_score_llm_ratio_bucket{le="0.5"}' in metrics.prometheus()
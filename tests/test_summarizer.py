@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from bill_extraction_api.services.document_fetcher import Document
+from bill_extraction_api.services.metrics import metrics
+from bill_extraction_api.services.ocr import DummyOCREngine, OCRLine, OCRPage
+from bill_extraction_api.services.summarizer import ExtractionService
+from bill_extraction_api.settings import AppSettings
+
+PAGES = 5
+BOX = [[0, 0], [100, 0], [100, 10], [0, 10]]
+
+
+def _page_width(page_no):
+    # Rendered at 72 dpi, so the OCR stub can tell pages apart by width.
+    return 100 + 20 * page_no
+
+
+def _ocr_by_width(self, image):
+    page_no = (image.width - 100) // 20
+    return OCRPage.from_lines([OCRLine(f"Consultation {page_no}.00", BOX, 0.9)], height=image.height)
+
+
+class RecordingRasterizer:
+    """Wraps a rasterizer, recording windows and optionally dropping each window's last page."""
+
+    name = "recording"
+
+    def __init__(self, inner, truncate=False):
+        self.inner = inner
+        self.truncate = truncate
+        self.windows = []
+
+    def render(self, document, first_page, last_page, dpi):
+        self.windows.append((first_page, last_page))
+        images = self.inner.render(document, first_page, last_page, dpi)
+        if self.truncate and len(images) > 1:
+            images = images[:-1]
+        return images
+
+
+@pytest.mark.parametrize(
+    "overrides, text_pages, truncate, windows, produced",
+    [
+        ({"render_window_pages": 2}, (), False, [(1, 2), (3, 4), (5, 5)], [1, 2, 3, 4, 5]),
+        (
+            {"render_window_pages": 2, "render_concurrency": 3, "max_pages_in_flight": 1},
+            (),
+            False,
+            [(1, 2), (3, 4), (5, 5)],
+            [1, 2, 3, 4, 5],
+        ),
+        ({"render_window_pages": 3}, (3,), False, [(1, 2), (4, 5)], [1, 2, 3, 4, 5]),
+        (
+            {"render_window_pages": 2, "max_pages_in_flight": 1},
+            (),
+            True,
+            [(1, 2), (3, 4), (5, 5)],
+            [1, 3, 5],
+        ),
+    ],
+    ids=["windows", "concurrent-windows", "text-layer-split", "short-render"],
+)
+async def test_rendered_pages_come_back_in_order(
+    make_pdf, monkeypatch, overrides, text_pages, truncate, windows, produced
+):
+    monkeypatch.setattr(DummyOCREngine, "extract", _ocr_by_width)
+    service = ExtractionService(
+        AppSettings(
+            ocr_backend="dummy",
+            parser_backend="regex",
+            result_cache_backend="none",
+            page_ocr_cache_entries=0,
+            pdf_renderer="pdfium",
+            render_dpi=72,
+            adaptive_resolution=False,
+            enhancement_backend="none",
+            **overrides,
+        )
+    )
+    contents = [
+        b"BT /F1 12 Tf 10 20 Td (Consultation %d.00 ward visit) Tj ET" % n if n in text_pages else b""
+        for n in range(1, PAGES + 1)
+    ]
+    data = make_pdf([(content, (_page_width(n), 200)) for n, content in enumerate(contents, 1)])
+
+    async def fetch(url):
+        return Document(mime_type="application/pdf", data=data)
+
+    rasterizer = RecordingRasterizer(service._preprocessor._rasterizer, truncate)
+    monkeypatch.setattr(service._fetcher, "fetch", fetch)
+    monkeypatch.setattr(service._preprocessor, "_rasterizer", rasterizer)
+
+    calls = []
+    result = await asyncio.wait_for(
+        service.extract("http://bills/doc.pdf", lambda *args: calls.append(args)), 10
+    )
+    await service.aclose()
+
+    assert sorted(rasterizer.windows) == windows
+    assert [page.page_no for page in result.pagewise_line_items] == [str(n) for n in produced]
+    assert [page.bill_items[0].item_amount for page in result.pagewise_line_items] == produced
+    assert sorted((page_no, total) for page_no, total, _ in calls) == [(n, PAGES) for n in produced]
+
+
+async def test_identical_pages_reuse_cached_ocr(make_pdf, monkeypatch):
+    engine_calls = []
+
+    def ocr(self, image):
+        engine_calls.append(image.size)
+        return OCRPage.from_lines([OCRLine("Consultation 1 500.00 500.00", BOX, 0.9)])
+
+    monkeypatch.setattr(DummyOCREngine, "extract", ocr)
+    service = ExtractionService(
+        AppSettings(
+            ocr_backend="dummy",
+            parser_backend="regex",
+            result_cache_backend="none",
+            pdf_renderer="pdfium",
+            render_dpi=72,
+            adaptive_resolution=False,
+            enhancement_backend="none",
+            # One page at a time, so the second page finds the first one's entry.
+            max_pages_in_flight=1,
+        )
+    )
+    data = make_pdf([(b"", (200, 300))] * 2)
+
+    async def fetch(url):
+        return Document(mime_type="application/pdf", data=data)
+
+    parsed = {}
+    parse_into_page = service._parse_into_page
+
+    async def record(idx, lines, parsing):
+        parsed[idx] = lines
+        return await parse_into_page(idx, lines, parsing)
+
+    monkeypatch.setattr(service._fetcher, "fetch", fetch)
+    monkeypatch.setattr(service, "_parse_into_page", record)
+    before = metrics.snapshot()["counters"]
+
+    result = await service.extract("http://bills/doc.pdf")
+    await service.aclose()
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["page_ocr_cache_misses_total"] - before.get("page_ocr_cache_misses_total", 0) == 1
+    assert counters["page_ocr_cache_hits_total"] - before.get("page_ocr_cache_hits_total", 0) == 1
+    assert engine_calls == [(200, 300)]
+    assert result.total_item_count == 2
+    # The decoded entry gets the height of the page it was served for.
+    assert parsed[1].height == parsed[2].height == 300
+    assert parsed[2].texts == parsed[1].texts
+    assert abs(parsed[2].boxes - parsed[1].boxes).max() <= 0.051
@@ -0,0 +1,85 @@
+import zlib
+
+from bill_extraction_api.services.document_fetcher import Document
+from bill_extraction_api.services.text_layer import PdfTextLayer
+
+ROWS = [(72, 700, "Consultation Charges 1 500.00 500.00"), (72, 670, "Pharmacy 2 100.00 200.00")]
+
+
+def _text(rows):
+    return b"".join(b"BT /F1 12 Tf %d %d Td (%s) Tj ET\n" % (x, y, text.encode()) for x, y, text in rows)
+
+
+def _pdf(content, mediabox=(0, 0, 612, 792), rotate=0):
+    """Single-page PDF with Helvetica as /F1 and a 1x1 image as /Im1."""
+    stream = zlib.compress(content)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [%d %d %d %d] /Rotate %d"
+        b" /Resources << /Font << /F1 5 0 R >> /XObject << /Im1 6 0 R >> >> /Contents 4 0 R >>"
+        % (*mediabox, rotate),
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray"
+        b" /BitsPerComponent 8 /Length 1 >>\nstream\n\x80\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return Document(mime_type="application/pdf", data=bytes(out))
+
+
+def _boxes(page):
+    return {text: box for text, box in zip(page.texts, page.boxes.tolist())}
+
+
+def test_text_layer_reads_positioned_lines():
+    page = PdfTextLayer().extract(_pdf(_text(ROWS)))[1]
+
+    assert page.texts == [text for _, _, text in ROWS]
+    assert page.height == 792
+    first = _boxes(page)[ROWS[0][2]]
+    # Top-left origin: the baseline at y=700 of a 792pt page, minus the 12pt font.
+    assert first[0] == [72, 80] and first[2][1] == 92
+
+
+def test_text_layer_skips_pages_that_are_mostly_image():
+    scan = b"q 612 0 0 792 0 0 cm /Im1 Do Q\n" + _text(ROWS)
+    logo = b"q 120 0 0 60 72 720 cm /Im1 Do Q\n" + _text(ROWS)
+    nested = b"q 2 0 0 2 0 0 cm q 306 0 0 396 0 0 cm /Im1 Do Q Q\n" + _text(ROWS)
+
+    assert PdfTextLayer().extract(_pdf(scan)) == {}
+    assert 1 in PdfTextLayer().extract(_pdf(logo))
+    assert PdfTextLayer().extract(_pdf(nested)) == {}
+    assert 1 in PdfTextLayer(max_image_coverage=1.0).extract(_pdf(scan))
+
+
+def test_text_layer_handles_mediabox_origin():
+    shifted = [(x + 100, y - 792, text) for x, y, text in ROWS]
+    page = PdfTextLayer().extract(_pdf(_text(shifted), mediabox=(100, -792, 712, 0)))[1]
+    reference = PdfTextLayer().extract(_pdf(_text(ROWS)))[1]
+
+    assert page.texts == reference.texts
+    assert (abs(page.boxes - reference.boxes) < 1e-3).all()
+
+
+def test_text_layer_handles_rotated_pages():
+    # Drawn upright for a viewer of the rotated (792 x 612) page.
+    upright = b"q 0 1 -1 0 612 0 cm\n" + _text([(72, 560, ROWS[0][2]), (72, 520, ROWS[1][2])]) + b"Q\n"
+    page = PdfTextLayer().extract(_pdf(upright, rotate=90))[1]
+
+    assert page.height == 612
+    boxes = _boxes(page)
+    first, second = boxes[ROWS[0][2]], boxes[ROWS[1][2]]
+    # Displayed top-left coordinates: left edge at 72, first row above the second.
+    assert abs(first[0][0] - 72) < 1e-3 and first[0][1] < second[0][1]
+    assert abs(first[0][1] - 40) < 1e-3 and abs(first[2][1] - 52) < 1e-3
+    width, height = first[2][0] - first[0][0], first[2][1] - first[0][1]
+    assert width > height > 0